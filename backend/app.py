@@ -1,33 +1,58 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Request
+import time
+# Startup timings reported by /api/health are measured from here
+APP_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
-import uvicorn
+from fastapi.responses import FileResponse, Response, StreamingResponse
 import os
 import json
-import csv
-import io
 import uuid
-import tempfile
+import socket
+import hmac
+import importlib.util
+from dataclasses import asdict
 from datetime import datetime
 from typing import List, Optional
 from pathlib import Path
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import aiofiles
 
-from azure.cognitiveservices.vision.computervision import ComputerVisionClient
-from azure.cognitiveservices.vision.computervision.models import OperationStatusCodes
-from msrest.authentication import CognitiveServicesCredentials
 from dotenv import load_dotenv
-import requests
-from PIL import Image
 
-# Try to import python-docx for DOCX processing
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+from artifacts import artifact_exists, artifact_path, etag_for, read_artifact, write_artifacts
+from batching import DocumentBatcher
+from cache import ContentCache, PartialResult
+from chunking import chunk_pages, merge_chunk_rows
+from gemini_client import GeminiClient
+from event_index import TEXT_FIELDS, EventIndex
+from event_schema import FIELDS, iter_events, normalize_events
+from exports import accepts_gzip, gzip_chunks, iter_csv, iter_json_table, iter_ndjson
+from job_queue import JobQueue
+from job_store import create_job_store, normalize_bound
+from laytime import apply_durations, iter_with_durations, laytime_summary
+from logs import current_job_id, log_event
+from metrics import (
+    ACTIVE_JOBS, CONTENT_TYPE, EVENTS_TOTAL, EXECUTOR_BUSY, FAILURES_TOTAL, FILES_TOTAL, JOBS_TOTAL,
+    PAGES_TOTAL, PREPROCESS_BYTES_TOTAL, QUEUE_DEPTH, REGISTRY, STAGE_SECONDS,
+)
+from uploads import FileTooLargeError, StagedFile, job_staging_dir, remove_staging_dir, stage_upload
+from ocr import AzureOCR
+from pdf_text import extract_pdf_pages
+from preprocess import preprocess_image
+from profiler import SamplingProfiler
+from resilience import AdaptiveConcurrency, CircuitBreaker, ProviderGuard, RateLimiter
+from results_log import append_file_rows, read_file_rows, remove_results_log
+from retention import Compactor, RetentionPolicy, dir_usage
+from pubsub import TERMINAL_STATUSES, ProgressBroker, StoreBridge, format_sse
+from sof_parser import parse_document
+from warmup import WarmUp, ignore_interrupts, load_parsers
+
+# python-docx is needed for DOCX processing; it is imported on first use
+DOCX_AVAILABLE = importlib.util.find_spec("docx") is not None
+if not DOCX_AVAILABLE:
     print("Warning: python-docx not installed. DOCX files will not be processed.")
 
 # Load environment variables
@@ -35,6 +60,7 @@ load_dotenv()
 AZURE_API_KEY = os.getenv('AZURE_API_KEY')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 AZURE_ENDPOINT = os.getenv('AZURE_ENDPOINT', 'https://your-resource-name.cognitiveservices.azure.com/')
+AZURE_CONFIGURED = bool(AZURE_API_KEY and AZURE_ENDPOINT and 'your-resource-name' not in AZURE_ENDPOINT)
 
 # Create FastAPI app
 app = FastAPI(title="SoF Event Extractor API", version="2.0.0")
@@ -48,343 +74,631 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create directories for storing jobs and results
+# Create directories for storing results
 JOBS_DIR = Path("jobs")
 RESULTS_DIR = Path("results")
-JOBS_DIR.mkdir(exist_ok=True)
 RESULTS_DIR.mkdir(exist_ok=True)
 
-# Job storage (in production, use a database)
-jobs = {}
+# Uploads are spooled to UPLOADS_DIR/<job_id>/ until the job finishes
+UPLOADS_DIR = Path(os.getenv('UPLOADS_DIR', 'uploads'))
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+# Job status storage (legacy jobs/<id>.json files are migrated into it on startup)
+job_store = create_job_store(os.getenv('JOB_STORE', 'sqlite'), Path(os.getenv('JOB_DB_PATH', 'jobs.db')))
+
+# Search index over the events of completed jobs, in the same database (filled as results are published)
+event_index = EventIndex(Path(os.getenv('JOB_DB_PATH', 'jobs.db')))
+
+# Retention, in days since a job's last update (0 keeps forever): whole jobs, failed jobs, CSV
+# artifacts, and artifacts moved into gzip archives; a compactor applies it every RETENTION_INTERVAL
+# seconds (0 disables it). Staging files, logs and queue entries of jobs that stopped are removed after RETENTION_STALE_DAYS
+retention_policy = RetentionPolicy(
+    job_days=float(os.getenv('RETENTION_JOB_DAYS', '0')),
+    failed_days=float(os.getenv('RETENTION_FAILED_DAYS', '30')),
+    csv_days=float(os.getenv('RETENTION_CSV_DAYS', '7')),
+    archive_days=float(os.getenv('ARCHIVE_AFTER_DAYS', '30')),
+    stale_days=float(os.getenv('RETENTION_STALE_DAYS', '2')),
+)
+
+# Progress pushed to SSE clients; updates saved by worker processes arrive through the store bridge
+PROGRESS_KEEPALIVE = float(os.getenv('PROGRESS_KEEPALIVE', '15'))
+progress_broker = ProgressBroker()
+progress_bridge = StoreBridge(
+    progress_broker,
+    lambda since: [progress_event(job) for job in job_store.jobs_updated_since(since)],
+    interval=float(os.getenv('PROGRESS_POLL_INTERVAL', '0.5')),
+)
 
-# Thread pool for CPU-bound tasks
-executor = ThreadPoolExecutor(max_workers=4)
+# Durable job queue in the same database; jobs are run by worker.py processes and/or
+# EMBEDDED_WORKERS worker loops inside the API process
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '60'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))
+EMBEDDED_WORKERS = int(os.getenv('EMBEDDED_WORKERS', '2'))
+job_queue = JobQueue(Path(os.getenv('JOB_DB_PATH', 'jobs.db')), lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS)
+embedded_workers: List[asyncio.Task] = []
+QUEUE_DEPTH.set_function(lambda: {(state,): jobs for state, jobs in job_queue.depth().items()})
+compactor = Compactor(job_store, RESULTS_DIR, UPLOADS_DIR, JOBS_DIR, retention_policy,
+                      interval=float(os.getenv('RETENTION_INTERVAL', '3600')), job_queue=job_queue)
+
+# Admin endpoints (profiler) require this token in the X-Admin-Token header; unset disables them
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+profiler = SamplingProfiler()
+
+# Maximum number of files from one job that are processed at the same time
+MAX_CONCURRENT_FILES = max(1, int(os.getenv('MAX_CONCURRENT_FILES', '4')))
+
+# Calls to Azure and Gemini go through a guard per provider: an optional rate limit (0 = none),
+# a concurrency limit that shrinks on 429s, errors and slow calls and is shared fairly between
+# jobs, and a circuit breaker that pauses calls while the provider keeps failing. With
+# RATE_LIMIT_SHARED the rate limits live in the job database, shared by all worker processes
+RATE_LIMIT_DB = Path(os.getenv('JOB_DB_PATH', 'jobs.db')) if os.getenv('RATE_LIMIT_SHARED', 'false').lower() in ('1', 'true', 'yes') else None
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RESET_SECONDS = float(os.getenv('CIRCUIT_RESET_SECONDS', '30'))
+THROTTLE_MAX_WAIT = float(os.getenv('THROTTLE_MAX_WAIT', '300'))
+
+def provider_guard(name: str, rate: float, max_concurrency: int, latency_target: float) -> ProviderGuard:
+    """Rate limit, adaptive concurrency and circuit breaker for one provider (see resilience.py)"""
+    return ProviderGuard(
+        name,
+        AdaptiveConcurrency(max_concurrency, latency_target=latency_target, key=current_job_id.get),
+        CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS, name=name),
+        RateLimiter(name, rate, burst=max(1, int(rate)), path=RATE_LIMIT_DB) if rate > 0 else None,
+    )
+
+ocr_guard = provider_guard(
+    "azure_ocr",
+    float(os.getenv('OCR_TPS', '0')),
+    int(os.getenv('OCR_MAX_CONCURRENCY', os.getenv('OCR_MAX_WORKERS', '8'))),
+    float(os.getenv('OCR_LATENCY_TARGET', '5')),
+)
+gemini_guard = provider_guard(
+    "gemini",
+    float(os.getenv('GEMINI_RPM', '0')) / 60,
+    int(os.getenv('GEMINI_MAX_CONCURRENCY', os.getenv('GEMINI_MAX_CONNECTIONS', '20'))),
+    float(os.getenv('GEMINI_LATENCY_TARGET', '30')),
+)
 
-def save_job_status(job_id: str, status: str, progress: int = 0, message: str = "", results: dict = None, total_files: int = 1, filenames: list = None):
-    """Save job status to file"""
-    job_data = {
-        "job_id": job_id,
-        "status": status,
-        "progress": progress,
-        "message": message,
-        "created_at": datetime.now().isoformat(),
-        "total_files": total_files,
-        "filenames": filenames or [],
-        "results": results or {}
-    }
+# Shared Azure OCR client; SDK calls run on its own threads with adaptive polling
+azure_ocr = AzureOCR(
+    AZURE_ENDPOINT,
+    AZURE_API_KEY,
+    max_workers=int(os.getenv('OCR_MAX_WORKERS', '8')),
+    poll_initial=float(os.getenv('OCR_POLL_INITIAL', '0.25')),
+    poll_max=float(os.getenv('OCR_POLL_MAX', '2')),
+    deadline=float(os.getenv('OCR_DEADLINE', '120')),
+    guard=ocr_guard,
+    max_throttle_wait=THROTTLE_MAX_WAIT,
+)
 
-    with open(JOBS_DIR / f"{job_id}.json", "w") as f:
-        json.dump(job_data, f, indent=2)
+# PDF pages whose text layer has fewer letters/digits than this are sent to OCR
+PDF_MIN_TEXT_CHARS = int(os.getenv('PDF_MIN_TEXT_CHARS', '20'))
 
-    jobs[job_id] = job_data
+# Images are shrunk for OCR (upright, grayscale, long side capped) on the CPU pool
+PREPROCESS_ENABLED = os.getenv('PREPROCESS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+OCR_MAX_SIDE = int(os.getenv('OCR_MAX_SIDE', '3200'))
+OCR_JPEG_QUALITY = int(os.getenv('OCR_JPEG_QUALITY', '85'))
 
-def load_job_status(job_id: str) -> Optional[dict]:
-    """Load job status from file"""
-    job_file = JOBS_DIR / f"{job_id}.json"
-    if job_file.exists():
-        try:
-            with open(job_file, "r") as f:
-                return json.load(f)
-        except:
-            return None
-    return None
-
-def regenerate_csv_if_needed(job_id: str, results_data: dict):
-    """Regenerate CSV file if it contains invalid data"""
-    csv_path = RESULTS_DIR / f"{job_id}.csv"
-
-    # Check if CSV exists and contains valid CSV data
-    if csv_path.exists():
-        with open(csv_path, "r", encoding='utf-8') as f:
-            content = f.read().strip()
-            # If it starts with {, it's JSON, not CSV
-            if content.startswith('{'):
-                print(f"CSV file {job_id}.csv contains JSON data, regenerating...")
-                # Regenerate the CSV
-                all_rows = results_data.get("table", [])
-                if all_rows:
-                    # internal helper to extract a YYYY-MM-DD day value from a row
-                    def date_from_row_local(r):
-                        d = r.get('day') or ''
-                        if d:
-                            if isinstance(d, str) and len(d) >= 8 and '-' in d:
-                                return d
-                            try:
-                                dt = datetime.fromisoformat(str(d).replace(' ', 'T'))
-                                return dt.strftime('%Y-%m-%d')
-                            except Exception:
-                                return d
-
-                        s = r.get('start_time') or r.get('start') or ''
-                        if s:
-                            try:
-                                dt = datetime.fromisoformat(str(s).replace(' ', 'T'))
-                                return dt.strftime('%Y-%m-%d')
-                            except Exception:
-                                try:
-                                    return str(s).split(' ')[0]
-                                except Exception:
-                                    return ''
-
-                        return ''
-
-                    csv_buffer = io.StringIO()
-                    fieldnames = ['event', 'day', 'start', 'end', 'duration', 'ship_cargo', 'layoff_time', 'description', 'filename']
-                    writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames, quoting=csv.QUOTE_ALL, escapechar='\\')
-                    writer.writeheader()
-
-                    for row in all_rows:
-                        # ensure defaults and sanitize
-                        duration_val = row.get('duration', '')
-                        if isinstance(duration_val, str):
-                            duration_val = ' '.join(duration_val.split())
-
-                        ship = row.get('ship_cargo') or row.get('shipCargo') or 'N/A'
-                        lay = row.get('layoff_time') or row.get('layoff') or ''
-                        if not lay:
-                            lay = 'N/A'
-
-                        csv_row = {
-                            'event': row.get('event', ''),
-                            'day': date_from_row_local(row),
-                            'start': row.get('start_time', '') or row.get('start', ''),
-                            'end': row.get('end_time', '') or row.get('end', ''),
-                            'duration': duration_val,
-                            'ship_cargo': ship,
-                            'layoff_time': lay,
-                            'description': row.get('description', ''),
-                            'filename': row.get('filename', '')
-                        }
-                        writer.writerow(csv_row)
-
-                    with open(csv_path, "w", newline='', encoding='utf-8') as f:
-                        f.write(csv_buffer.getvalue())
-                    print(f"CSV file regenerated: {csv_path}")
-
-def process_with_gemini(text: str, filename: str) -> List[dict]:
-    """Process extracted text with Gemini to extract structured data."""
-    try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
+# Content-addressed cache for extracted text and Gemini rows
+CACHE_DIR = Path(os.getenv('CACHE_DIR', 'cache'))
+content_cache = ContentCache(
+    CACHE_DIR,
+    max_memory_bytes=int(os.getenv('CACHE_MEMORY_MB', '64')) * 1024 * 1024,
+    max_disk_bytes=int(os.getenv('CACHE_DISK_MB', '512')) * 1024 * 1024,
+)
 
-        prompt = f"""
-        Extract event data from this OCR text and return as JSON array.
+# Bump when the extraction prompt or row format changes so cached rows are not reused
+EXTRACTION_VERSION = 4
 
-        Text: {text}
+# Pages the local SoF parser reads with at least this confidence skip Gemini
+LOCAL_PARSER_ENABLED = os.getenv('LOCAL_PARSER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+LOCAL_PARSER_MIN_CONFIDENCE = float(os.getenv('LOCAL_PARSER_MIN_CONFIDENCE', '0.9'))
 
+# Process pool for CPU-bound work such as local parsing (0 runs it on a thread instead)
+CPU_WORKERS = int(os.getenv('CPU_WORKERS', '2'))
+cpu_executor = (
+    ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                        initializer=ignore_interrupts)
+    if CPU_WORKERS > 0 else None
+)
+
+async def run_cpu(func, *args):
+    """Run CPU-bound work on the process pool (a thread when CPU_WORKERS is 0)"""
+    loop = asyncio.get_running_loop()
+    with EXECUTOR_BUSY.track(executor="cpu"):
+        return await loop.run_in_executor(cpu_executor, func, *args)
+
+# Long documents are sent to Gemini as page-aligned chunks of at most this many characters
+GEMINI_CHUNK_CHARS = int(os.getenv('GEMINI_CHUNK_CHARS', '8000'))
+GEMINI_CHUNK_OVERLAP_LINES = int(os.getenv('GEMINI_CHUNK_OVERLAP_LINES', '3'))
+
+# Small documents of the same job are packed into one Gemini request up to these limits
+GEMINI_BATCH_ENABLED = os.getenv('GEMINI_BATCH_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+GEMINI_BATCH_DOC_CHARS = int(os.getenv('GEMINI_BATCH_DOC_CHARS', '4000'))
+GEMINI_BATCH_MAX_CHARS = int(os.getenv('GEMINI_BATCH_MAX_CHARS', '12000'))
+GEMINI_BATCH_MAX_DOCS = int(os.getenv('GEMINI_BATCH_MAX_DOCS', '8'))
+GEMINI_BATCH_LINGER = float(os.getenv('GEMINI_BATCH_LINGER', '2'))
+
+# Shared, pooled Gemini client (one keep-alive connection pool for all jobs)
+gemini_client = GeminiClient(
+    GEMINI_API_KEY,
+    base_url=os.getenv('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta'),
+    model=os.getenv('GEMINI_MODEL', 'gemini-1.5-flash'),
+    timeout=float(os.getenv('GEMINI_TIMEOUT', '60')),
+    max_retries=int(os.getenv('GEMINI_MAX_RETRIES', '4')),
+    max_connections=int(os.getenv('GEMINI_MAX_CONNECTIONS', '20')),
+    max_keepalive_connections=int(os.getenv('GEMINI_MAX_KEEPALIVE', '10')),
+    guard=gemini_guard,
+    max_throttle_wait=THROTTLE_MAX_WAIT,
+)
+
+# After startup, warm up in the background (/health answers meanwhile) so the first job does not
+# pay for it: load the parsers, start the CPU worker processes and connect to Azure and Gemini
+WARM_UP = os.getenv('WARM_UP', 'true').lower() in ('1', 'true', 'yes')
+warm_up_state = WarmUp()
+warm_up_tasks: List[asyncio.Task] = []
+startup_timings = {"import_seconds": None, "ready_seconds": None}
+
+def progress_event(job: dict) -> dict:
+    """The fields of a job pushed to progress subscribers"""
+    return {key: job.get(key) for key in ("job_id", "status", "progress", "message", "files_done", "updated_at")}
+
+def save_job_status(job_id: str, status: str, progress: int = 0, message: str = "", total_files: int = None, filenames: list = None, files_done: int = None):
+    """Save job status to the job store and push it to progress subscribers"""
+    job_store.save(job_id, status, progress, message, total_files=total_files, filenames=filenames, files_done=files_done)
+    progress_broker.publish(progress_event({
+        "job_id": job_id, "status": status, "progress": progress, "message": message, "files_done": files_done,
+        "updated_at": datetime.now().isoformat()
+    }))
+
+def load_job_status(job_id: str) -> Optional[dict]:
+    """Load job status (summary fields only, no results) from the job store"""
+    return job_store.load(job_id)
+
+def publish_job_results(job_id: str, rows: List[dict], message: str):
+    """Serialize a job's results once and mark the job completed.
+
+    Durations are computed from the event times here (see laytime.py). Writes
+    the JSON, CSV, frontend-view and laytime artifacts, records their ETags as a
+    new artifact version and indexes the events for search, and only then
+    flips the status so readers never see a completed job without its artifacts.
+    """
+    with STAGE_SECONDS.time(stage="serialize"):
+        records = normalize_events(rows)
+        apply_durations(records)
+        table = [record.as_dict() for record in records]
+        job = load_job_status(job_id) or {}
+        filenames = job.get("filenames", [])
+        view = {
+            "job_id": job_id,
+            "status": "completed",
+            "events": [record.as_frontend() for record in records],  # Frontend expects events array directly
+            "total_files": job.get("total_files", 1),
+            "filename": filenames[0] if filenames else "",
+            "filenames": filenames,
+            "message": message,
+            "created_at": job.get("created_at", "")
+        }
+        manifest = write_artifacts(RESULTS_DIR, job_id, {
+            "json": json.dumps({"table": table}, indent=2).encode("utf-8"),
+            "csv": b"".join(iter_csv(records, list(FIELDS))),
+            "view": json.dumps(view).encode("utf-8"),
+            "laytime": json.dumps(dict(job_id=job_id, **laytime_summary(records))).encode("utf-8"),
+        })
+    version = job_store.save_artifacts(job_id, manifest)
+    event_index.index_job(job_id, records)
+    save_job_status(job_id, "completed", 100, message)
+    print(f"Result artifacts v{version} written for job {job_id}")
+
+EXTRACTION_INSTRUCTIONS = """
         IMPORTANT INSTRUCTIONS:
-        1. Calculate DURATION: If you have start_time and end_time, calculate the duration in hours and minutes (e.g., "2h 30m", "1h 15m", "45m")
-        2. For durations ABOVE 24 hours: Use days and hours format (e.g., "2d 4h 30m", "1d 12h", "3d 2h 15m")
-        3. Make EVENT names descriptive and professional (e.g., "Cargo Loading Operation", "Ship Maintenance Activity", "Crew Briefing Session")
-        4. Make DESCRIPTION more detailed and meaningful, explaining what actually happened during the event
-        5. Use proper date formats: YYYY-MM-DD HH:MM for start_time and end_time
-        6. Extract all relevant information about ships, cargo, layoff times, etc.
-        7. For LAYOFF_TIME: Look for any time periods that could be layoff, break, rest, or pause times. Format it the same way as duration (e.g., "2h 0m", "30m"). If you find any time information that might be layoff time, extract it. Only use "N/A" if there's absolutely no time information that could be related to layoff/break periods.
-        8. For SHIP_CARGO: If no ship or cargo information is available, use "N/A"
+        1. Make EVENT names descriptive and professional (e.g., "Cargo Loading Operation", "Ship Maintenance Activity", "Crew Briefing Session")
+        2. Make DESCRIPTION more detailed and meaningful, explaining what actually happened during the event
+        3. Use proper date formats: YYYY-MM-DD HH:MM for start_time and end_time. Durations are calculated from these, so do not calculate them yourself
+        4. Extract all relevant information about ships, cargo, layoff times, etc.
+        5. For LAYOFF_TIME: Look for any time periods that could be layoff, break, rest, or pause times. Use hours and minutes (e.g., "2h 0m", "30m"), or days, hours and minutes above 24 hours (e.g., "1d 4h 30m"). If you find any time information that might be layoff time, extract it. Only use "N/A" if there's absolutely no time information that could be related to layoff/break periods.
+        6. For SHIP_CARGO: If no ship or cargo information is available, use "N/A"
 
         Return ONLY a JSON array of objects with these exact fields:
         - event: descriptive event name (not just short codes)
         - day: day of week
         - start_time: start time with date (YYYY-MM-DD HH:MM format)
         - end_time: end time with date (YYYY-MM-DD HH:MM format)
-        - duration: calculated duration from start and end times (e.g., "2h 30m" or "2d 4h 30m" for longer durations)
         - ship_cargo: ship/cargo information or "N/A" if not available
         - layoff_time: any layoff/break/rest time period in duration format (e.g., "2h 0m", "30m") or "N/A" if none found
-        - description: detailed description of what happened
+        - description: detailed description of what happened"""
+
+def parse_gemini_rows(generated_text: str) -> List[dict]:
+    """Extract the JSON array of row objects from a Gemini response"""
+    start = generated_text.find('[')
+    end = generated_text.rfind(']') + 1
+    if start == -1 or end == 0:
+        return []
+    rows = json.loads(generated_text[start:end])
+    return [row for row in rows if isinstance(row, dict)] if isinstance(rows, list) else []
+
+async def process_with_gemini(text: str, filename: str, part_note: str = "") -> List[dict]:
+    """Process extracted text with Gemini to extract structured data.
+
+    Raises on API or parse failures so callers can tell "no events" from "failed".
+    """
+    prompt = f"""
+        Extract event data from this OCR text and return as JSON array.
+        {part_note}
+        Text: {text}
+{EXTRACTION_INSTRUCTIONS}
         - filename: "{filename}"
 
         If no events found, return empty array [].
         """
 
-        payload = {
-            "contents": [{
-                "parts": [{"text": prompt}]
-            }]
-        }
+    generated_text = await gemini_client.generate(prompt)
+    return parse_gemini_rows(generated_text)
 
-        response = requests.post(url, json=payload, headers={"Content-Type": "application/json"})
-        response.raise_for_status()
+async def process_batch_with_gemini(documents: List[tuple]) -> List[List[dict]]:
+    """Extract events for several small (text, filename) documents in one Gemini request.
 
-        result = response.json()
-        generated_text = result['candidates'][0]['content']['parts'][0]['text']
+    Rows are split back per document through a ``document_id`` field; any
+    row that cannot be attributed makes the whole batch fail so the caller
+    can fall back to per-document requests.
+    """
+    sections = "\n".join(
+        f"=== DOCUMENT D{i + 1} (filename: {filename}) ===\n{text}\n=== END OF DOCUMENT D{i + 1} ===\n"
+        for i, (text, filename) in enumerate(documents)
+    )
+    prompt = f"""
+        Extract event data from each of the {len(documents)} OCR documents below and return ONE JSON array with the events of all documents.
+        Documents are delimited by "=== DOCUMENT Dn ===" and "=== END OF DOCUMENT Dn ===" lines. Never mix information between documents.
+
+{sections}
+{EXTRACTION_INSTRUCTIONS}
+        - document_id: the id of the document the event comes from (e.g. "D1")
 
-        # Extract JSON from response
-        start = generated_text.find('[')
-        end = generated_text.rfind(']') + 1
-        if start != -1 and end != -1:
-            json_str = generated_text[start:end]
-            return json.loads(json_str)
+        If no events found, return empty array [].
+        """
+
+    generated_text = await gemini_client.generate(prompt)
+    per_document = [[] for _ in documents]
+    for row in parse_gemini_rows(generated_text):
+        document_id = str(row.pop("document_id", "")).strip().upper().lstrip("D")
+        if not document_id.isdigit() or not 1 <= int(document_id) <= len(documents):
+            raise ValueError(f"Batched response has a row without a valid document_id: {row.get('event', '')}")
+        index = int(document_id) - 1
+        row["filename"] = documents[index][1]
+        per_document[index].append(row)
+    return per_document
+
+async def extract_events_from_pages(pages: List[str], filename: str, context_note: str = "") -> List[dict]:
+    """Run Gemini over page-aligned chunks of a document in parallel and merge the rows.
+
+    Short documents are a single chunk (one request, as before). If some
+    chunks fail, the rows of the others are returned as a PartialResult so
+    they are not cached; if every chunk fails the first error is raised.
+    """
+    chunks = chunk_pages(pages, GEMINI_CHUNK_CHARS, GEMINI_CHUNK_OVERLAP_LINES)
+    if len(chunks) > 1:
+        print(f"Split {filename} into {len(chunks)} chunks for Gemini")
+
+    def part_note(index: int) -> str:
+        if len(chunks) == 1:
+            return context_note
+        return (f"This text is part {index + 1} of {len(chunks)} of a longer document; "
+                f"it may start with a few lines repeated from the previous part. {context_note}").strip()
+
+    results = await asyncio.gather(
+        *(process_with_gemini(chunk, filename, part_note(i)) for i, chunk in enumerate(chunks)),
+        return_exceptions=True
+    )
+
+    failures = [result for result in results if isinstance(result, BaseException)]
+    for i, result in enumerate(results):
+        if isinstance(result, BaseException):
+            FAILURES_TOTAL.inc(stage="gemini")
+            log_event("gemini_failed", filename=filename, chunk=f"{i + 1}/{len(chunks)}", error=str(result))
+    if failures and len(failures) == len(results):
+        raise failures[0]
+
+    rows = merge_chunk_rows([[] if isinstance(result, BaseException) else result for result in results],
+                            GEMINI_CHUNK_OVERLAP_LINES)
+    if failures:
+        raise PartialResult(rows)
+    return rows
+
+async def extract_events(pages: List[str], filename: str, batcher: Optional[DocumentBatcher] = None) -> List[dict]:
+    """Extract events with the local SoF parser, sending only low-confidence pages to Gemini.
+
+    Consecutive low-confidence pages go to Gemini together, with a note on
+    the date and ship/cargo set by the pages before them. A document that
+    is low-confidence throughout takes the plain Gemini path (batched when
+    small). Rows keep page order.
+    """
+    text_length = sum(len(page) for page in pages)
+    if LOCAL_PARSER_ENABLED:
+        with STAGE_SECONDS.time(stage="local_parse"):
+            parsed = await run_cpu(parse_document, pages, filename)
+    else:
+        parsed = [([], 0.0, "") for _ in pages]
+
+    # Runs of pages in order: local rows, or (pages, context note) for Gemini
+    segments = []
+    for page, (rows, confidence, note) in zip(pages, parsed):
+        if confidence >= LOCAL_PARSER_MIN_CONFIDENCE:
+            segments.append(rows)
+        elif segments and isinstance(segments[-1], tuple):
+            segments[-1][0].append(page)
         else:
-            return []
+            segments.append(([page], note))
+
+    remote = [segment for segment in segments if isinstance(segment, tuple)]
+    local_events = sum(len(segment) for segment in segments if isinstance(segment, list))
+    EVENTS_TOTAL.inc(local_events, extractor="local")
+    if not remote:
+        print(f"Parsed {local_events} events locally for {filename}; skipping Gemini")
+        return [row for segment in segments for row in segment]
+
+    if len(remote) == 1 and len(remote[0][0]) == len(pages):
+        print(f"Processing {text_length} characters with Gemini for {filename}")
+        if batcher is not None and text_length <= GEMINI_BATCH_DOC_CHARS:
+            rows = await batcher.extract("".join(pages), filename)
+        else:
+            rows = await extract_events_from_pages(pages, filename)
+        EVENTS_TOTAL.inc(len(rows), extractor="gemini")
+        return rows
+
+    remote_pages = sum(len(segment[0]) for segment in remote)
+    print(f"Parsed {local_events} events locally for {filename}; "
+          f"sending {remote_pages} of {len(pages)} pages to Gemini")
+    results = await asyncio.gather(
+        *(extract_events_from_pages(run, filename, note) for run, note in remote),
+        return_exceptions=True
+    )
+
+    rows, failed = [], False
+    remote_results = iter(results)
+    for segment in segments:
+        if isinstance(segment, list):
+            rows.extend(segment)
+            continue
+        result = next(remote_results)
+        if isinstance(result, PartialResult):
+            failed = True
+            rows.extend(result.value)
+        elif isinstance(result, BaseException):
+            failed = True
+            print(f"Gemini processing failed for part of {filename}: {str(result)}")
+        else:
+            rows.extend(result)
+    EVENTS_TOTAL.inc(len(rows) - local_events, extractor="gemini")
+    if failed:
+        raise PartialResult(rows)
+    return rows
 
-    except Exception as e:
-        print(f"Gemini processing failed for {filename}: {str(e)}")
-        return []
+def extract_pages_from_docx(file_path: str) -> List[str]:
+    """Extract text from a DOCX file, split into pages.
 
-def extract_text_from_docx(file_path: str) -> str:
-    """Extract text from a DOCX file."""
+    A new page starts after an explicit or rendered page break and after a
+    section break; table text follows the body as its own page.
+    """
     if not DOCX_AVAILABLE:
         raise Exception("python-docx library not available. Please install with: pip install python-docx")
+    from docx import Document
 
     try:
         doc = Document(file_path)
-        text = []
+        pages, text = [], []
         for paragraph in doc.paragraphs:
             if paragraph.text.strip():
                 text.append(paragraph.text)
+            p = paragraph._p
+            breaks_page = (
+                bool(p.xpath('./w:r/w:br[@w:type="page"]'))
+                or paragraph.contains_page_break
+                or (p.pPr is not None and p.pPr.sectPr is not None)
+            )
+            if breaks_page and text:
+                pages.append('\n'.join(text) + '\n')
+                text = []
+        if text:
+            pages.append('\n'.join(text) + '\n')
 
         # Also extract text from tables
+        text = []
         for table in doc.tables:
             for row in table.rows:
                 for cell in row.cells:
                     if cell.text.strip():
                         text.append(cell.text)
+        if text:
+            pages.append('\n'.join(text) + '\n')
 
-        return '\n'.join(text)
+        return pages
     except Exception as e:
         print(f"Error extracting text from DOCX: {str(e)}")
         raise
 
-async def process_files_background(job_id: str, files: List[UploadFile], use_enhanced_processing: bool = False):
-    """Background task to process uploaded files"""
-    try:
-        print(f"DOCX_AVAILABLE: {DOCX_AVAILABLE}")
-        save_job_status(job_id, "processing", 10, "Initializing Azure OCR client...")
+async def extract_pages_from_pdf(file: StagedFile) -> List[str]:
+    """Use a PDF's embedded text layer, sending only pages without usable text to Azure OCR"""
+    with STAGE_SECONDS.time(stage="pdf_text"):
+        pages = await run_cpu(extract_pdf_pages, file.path, PDF_MIN_TEXT_CHARS)
+    missing = [i for i, page in enumerate(pages) if page is None]
+    if not pages or len(missing) == len(pages):
+        print(f"No usable text layer in {file.filename}; using OCR for all pages")
+        return await azure_ocr.read_pages(file.path)
+
+    print(f"Read {len(pages) - len(missing)} of {len(pages)} pages of {file.filename} from the PDF text layer")
+    PAGES_TOTAL.inc(len(pages) - len(missing), source="pdf_text")
+    if missing:
+        scanned = await azure_ocr.read_pages(file.path, pages=[str(i + 1) for i in missing])
+        for i, text in zip(missing, scanned):
+            pages[i] = text
+    return [page or "" for page in pages]
+
+async def extract_pages_from_file(file: StagedFile, job_id: Optional[str] = None) -> List[str]:
+    """Extract raw text, page by page, from a staged upload using python-docx, the PDF text layer or Azure OCR"""
+    # Check if this is a DOCX file
+    is_docx = (file.content_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' or
+              file.filename.lower().endswith('.docx'))
+
+    print(f"Processing file: {file.filename}, content_type: {file.content_type}, is_docx: {is_docx}")
+
+    if is_docx:
+        # Process DOCX file
+        if not DOCX_AVAILABLE:
+            print(f"Skipping {file.filename}: python-docx not installed")
+            return []
+
+        pages = extract_pages_from_docx(file.path)
+        PAGES_TOTAL.inc(len(pages), source="docx")
+        extracted_text = "".join(pages)
+        print(f"Extracted {len(extracted_text)} characters in {len(pages)} pages from DOCX: {file.filename}")
+        print(f"First 200 chars: {extracted_text[:200]}")
+        return pages
+
+    if file.content_type == 'application/pdf' or file.filename.lower().endswith('.pdf'):
+        return await extract_pages_from_pdf(file)
+
+    # Process image file with Azure OCR; the staged file is streamed to Azure
+    print(f"Processing as image: {file.filename}")
+    if not PREPROCESS_ENABLED:
+        return await azure_ocr.read_pages(file.path)
+
+    with STAGE_SECONDS.time(stage="preprocess"):
+        prepared = await run_cpu(preprocess_image, file.path, OCR_MAX_SIDE, OCR_JPEG_QUALITY)
+    PREPROCESS_BYTES_TOTAL.inc(prepared["original_bytes"], stage="original")
+    PREPROCESS_BYTES_TOTAL.inc(prepared["processed_bytes"], stage="processed")
+    log_event("image_preprocessed", job_id=job_id, filename=file.filename, pages=len(prepared["paths"]),
+              original_bytes=prepared["original_bytes"], processed_bytes=prepared["processed_bytes"],
+              bytes_saved=prepared["original_bytes"] - prepared["processed_bytes"])
+
+    # Pages split from a multi-page image are read concurrently and kept in order
+    per_page = await asyncio.gather(*(azure_ocr.read_pages(path) for path in prepared["paths"]))
+    return [text for pages in per_page for text in pages]
+
+async def process_single_file(job_id: str, file: StagedFile, batcher: Optional[DocumentBatcher] = None) -> List[dict]:
+    """Run text extraction and event extraction for one staged file and return its rows.
+
+    Both stages are cached by the SHA-256 of the file contents (computed while
+    staging), so re-uploads of the same document skip Azure and Gemini entirely.
+    Small documents go through the job's batcher when one is given.
+    """
+    digest = file.sha256
 
-        # Initialize Azure client
-        computervision_client = ComputerVisionClient(
-            AZURE_ENDPOINT,
-            CognitiveServicesCredentials(AZURE_API_KEY)
+    async def extract_rows() -> List[dict]:
+        pages = await content_cache.get_or_compute(
+            "text", digest, lambda: extract_pages_from_file(file, job_id)
         )
+        if isinstance(pages, str):
+            # Entry cached before text was kept per page
+            pages = [pages]
 
-        all_rows = []
-        total_files = len(files)
+        # Extract events if text was extracted
+        if not any(page.strip() for page in pages):
+            print(f"No text extracted from {file.filename}")
+            return []
 
-        for i, file in enumerate(files):
-            try:
-                progress = 10 + (i / total_files) * 80
-                save_job_status(job_id, "processing", int(progress), f"Processing {file.filename}...")
+        events = await extract_events(pages, file.filename, batcher)
+        if events:
+            print(f"Extracted {len(events)} events for {file.filename}")
+            return events
+
+        print(f"No events found for {file.filename}")
+        return []
 
-                # Save uploaded file to temp
-                with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
-                    content = await file.read()
-                    tmp.write(content)
-                    temp_path = tmp.name
+    rows = await content_cache.get_or_compute("rows", f"{digest}-v{EXTRACTION_VERSION}", extract_rows)
 
-                try:
-                    # Check if this is a DOCX file
-                    is_docx = (file.content_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' or
-                              file.filename.lower().endswith('.docx'))
-
-                    print(f"Processing file: {file.filename}, content_type: {file.content_type}, is_docx: {is_docx}")
-
-                    if is_docx:
-                        # Process DOCX file
-                        if not DOCX_AVAILABLE:
-                            print(f"Skipping {file.filename}: python-docx not installed")
-                            continue
-
-                        try:
-                            extracted_text = extract_text_from_docx(temp_path)
-                            print(f"Extracted {len(extracted_text)} characters from DOCX: {file.filename}")
-                            print(f"First 200 chars: {extracted_text[:200]}")
-                        except Exception as e:
-                            print(f"Error extracting text from DOCX {file.filename}: {str(e)}")
-                            continue
-                    else:
-                        # Process image file with Azure OCR
-                        print(f"Processing as image: {file.filename}")
-                        with open(temp_path, "rb") as image_file:
-                            # Call Azure OCR
-                            ocr_result = computervision_client.read_in_stream(image_file, raw=True)
-                        operation_id = ocr_result.headers['Operation-Location'].split('/')[-1]
-
-                        # Wait for result
-                        while True:
-                            result = computervision_client.get_read_result(operation_id)
-                            if result.status not in [OperationStatusCodes.running, OperationStatusCodes.not_started]:
-                                break
-                            await asyncio.sleep(1)
-
-                        extracted_text = ""
-                        if result.status == OperationStatusCodes.succeeded:
-                            for page in result.analyze_result.read_results:
-                                for line in page.lines:
-                                    extracted_text += line.text + "\n"
-
-                    # Process with Gemini if text was extracted
-                    if extracted_text.strip():
-                        print(f"Processing {len(extracted_text)} characters with Gemini for {file.filename}")
-                        gemini_result = await asyncio.get_event_loop().run_in_executor(
-                            executor, process_with_gemini, extracted_text, file.filename
-                        )
-                        if gemini_result:
-                            all_rows.extend(gemini_result)
-                            print(f"Gemini returned {len(gemini_result)} events for {file.filename}")
-                        else:
-                            print(f"Gemini returned no events for {file.filename}")
-                    else:
-                        print(f"No text extracted from {file.filename}")
+    # Cached rows may come from an upload with a different filename
+    return [dict(row, filename=file.filename) for row in rows]
+
+async def process_files_background(job_id: str, files: List[StagedFile], use_enhanced_processing: bool = False):
+    """Background task to process uploaded files"""
+    # Log lines of this job (and the tasks it starts) carry its ID
+    current_job_id.set(job_id)
+    with ACTIVE_JOBS.track(), STAGE_SECONDS.time(stage="job"):
+        await process_job_files(job_id, files)
+
+    # Not in a finally: an interrupted job keeps its staged files and results log for the worker that resumes it
+    remove_staging_dir(job_staging_dir(UPLOADS_DIR, job_id))
+    remove_results_log(RESULTS_DIR, job_id)
+
+async def process_job_files(job_id: str, files: List[StagedFile]):
+    """Extract every file of a job and publish the results, or mark the job failed"""
+    started = time.perf_counter()
+    try:
+        log_event("job_started", files=len(files), docx_available=DOCX_AVAILABLE)
+        # The shared Azure client is created on first OCR use, off the event loop
+        save_job_status(job_id, "processing", 10, "Preparing files...")
 
+        total_files = len(files)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_FILES)
+
+        # Small documents of a multi-file job share Gemini requests
+        batcher = None
+        if GEMINI_BATCH_ENABLED and total_files > 1:
+            batcher = DocumentBatcher(
+                process_batch_with_gemini,
+                process_with_gemini,
+                max_chars=GEMINI_BATCH_MAX_CHARS,
+                max_docs=GEMINI_BATCH_MAX_DOCS,
+                linger=GEMINI_BATCH_LINGER
+            )
+
+        # Each finished file is appended to the job's results log; files already in it
+        # (from an earlier, interrupted run of this job) are not processed again
+        logged = read_file_rows(RESULTS_DIR, job_id)
+        if logged:
+            print(f"Resuming job {job_id}: {len(logged)} of {total_files} files already done")
+        completed = files_done = len(logged)
+
+        async def run_file(index: int, file: StagedFile):
+            nonlocal completed, files_done
+            async with semaphore:
+                if batcher is not None:
+                    batcher.file_started()
+                file_started = time.perf_counter()
+                try:
+                    save_job_status(job_id, "processing", int(10 + (completed / total_files) * 80), f"Processing {file.filename}...",
+                                    files_done=files_done)
+                    with STAGE_SECONDS.time(stage="file"):
+                        rows = await process_single_file(job_id, file, batcher)
+                    append_file_rows(RESULTS_DIR, job_id, index, file.filename, rows)
+                    files_done += 1
+                    FILES_TOTAL.inc(outcome="ok")
+                    log_event("file_done", filename=file.filename, events=len(rows),
+                              seconds=round(time.perf_counter() - file_started, 3))
+                except Exception as e:
+                    # One failing file must not take down the rest of the job
+                    FILES_TOTAL.inc(outcome="failed")
+                    FAILURES_TOTAL.inc(stage="file")
+                    log_event("file_failed", filename=file.filename, error=str(e))
                 finally:
-                    # Cleanup temp file
-                    try:
-                        os.unlink(temp_path)
-                    except:
-                        pass
+                    if batcher is not None:
+                        batcher.file_finished()
+                    completed += 1
+                    save_job_status(job_id, "processing", int(10 + (completed / total_files) * 80), f"Processed {completed} of {total_files} files",
+                                    files_done=files_done)
 
-            except Exception as e:
-                print(f"Error processing {file.filename}: {str(e)}")
-                continue
+        # Files run concurrently (bounded by the semaphore)
+        await asyncio.gather(*(run_file(index, file) for index, file in enumerate(files) if index not in logged))
+
+        # Final results are built from the log, in upload order
+        logged = read_file_rows(RESULTS_DIR, job_id)
+        all_rows = [row for index in sorted(logged) for row in logged[index]]
 
-        # Save results
+        # Save results: JSON, CSV and the frontend view are serialized once here
         if all_rows:
-            results_data = {"table": all_rows}
-
-            # Save JSON results
-            with open(RESULTS_DIR / f"{job_id}.json", "w") as f:
-                json.dump(results_data, f, indent=2)
-
-            # Save CSV results with frontend-compatible field names
-            csv_buffer = io.StringIO()
-            if all_rows:
-                # Use the same field names that are sent to frontend
-                fieldnames = ['event', 'day', 'start_time', 'end_time', 'duration', 'ship_cargo', 'layoff_time', 'description', 'filename']
-                writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames, quoting=csv.QUOTE_ALL, escapechar='\\')
-                writer.writeheader()
-
-                for row in all_rows:
-                    # Map backend field names to frontend field names for CSV export
-                    csv_row = {
-                        'event': row.get('event', ''),
-                        'day': row.get('day', ''),
-                        'start_time': row.get('start_time', ''),  # Keep full field name
-                        'end_time': row.get('end_time', ''),      # Keep full field name
-                        'duration': row.get('duration', ''),
-                        'ship_cargo': row.get('ship_cargo', ''),
-                        'layoff_time': row.get('layoff_time', ''),
-                        'description': row.get('description', ''),
-                        'filename': row.get('filename', '')
-                    }
-                    writer.writerow(csv_row)
-
-                # Get the CSV content
-                csv_content = csv_buffer.getvalue()
-                print(f"Generated CSV content length: {len(csv_content)}")  # Debug log
-
-                # Write CSV to file
-                with open(RESULTS_DIR / f"{job_id}.csv", "w", newline='', encoding='utf-8') as f:
-                    f.write(csv_content)
-
-                print(f"CSV file saved: {RESULTS_DIR / f'{job_id}.csv'}")  # Debug log
-
-            save_job_status(job_id, "completed", 100, f"Successfully processed {len(all_rows)} rows from {total_files} files", results_data)
-            print(f"Job {job_id} completed successfully with {len(all_rows)} events")
+            message = f"Successfully processed {len(all_rows)} rows from {total_files} files"
         else:
-            save_job_status(job_id, "completed", 100, f"Processed {total_files} files but no structured data found")
-            print(f"Job {job_id} completed but no events found")
+            message = f"Processed {total_files} files but no structured data found"
+        publish_job_results(job_id, all_rows, message)
+        JOBS_TOTAL.inc(status="completed")
+        log_event("job_completed", events=len(all_rows), files=total_files,
+                  seconds=round(time.perf_counter() - started, 3))
 
     except Exception as e:
         error_msg = str(e)
+        JOBS_TOTAL.inc(status="failed")
+        FAILURES_TOTAL.inc(stage="job")
+        log_event("job_failed", error=error_msg)
         if 'your-resource-name' in error_msg:
             save_job_status(job_id, "failed", 0, "Azure endpoint configuration error. Please update AZURE_ENDPOINT in .env file.")
         elif 'authentication' in error_msg.lower() or 'unauthorized' in error_msg.lower():
@@ -392,6 +706,202 @@ async def process_files_background(job_id: str, files: List[UploadFile], use_enh
         else:
             save_job_status(job_id, "failed", 0, f"Processing error: {error_msg}")
 
+async def run_queued_job(job: dict, worker_id: str):
+    """Process one claimed job, renewing its lease until it finishes.
+
+    If the lease is lost (another worker took the job over) processing is
+    cancelled; if this worker is cancelled, or heartbeats keep failing until
+    the lease runs out, processing is cancelled and the job goes back to the
+    queue.
+    """
+    job_id = job["job_id"]
+    payload = job["payload"]
+    files = [StagedFile(**file) for file in payload["files"]]
+    if job["attempts"] > 1:
+        print(f"Worker {worker_id} retrying job {job_id} (attempt {job['attempts']})")
+
+    task = asyncio.ensure_future(
+        process_files_background(job_id, files, payload.get("use_enhanced_processing", False))
+    )
+    lease_expires = time.monotonic() + JOB_LEASE_SECONDS
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=JOB_LEASE_SECONDS / 3)
+            if done:
+                break
+            try:
+                held = job_queue.heartbeat(job_id, worker_id)
+            except Exception as e:
+                # E.g. "database is locked": retry on the next beat while the lease still holds
+                if time.monotonic() >= lease_expires:
+                    raise
+                log_event("heartbeat_failed", job_id=job_id, worker_id=worker_id, error=repr(e))
+                continue
+            if not held:
+                print(f"Worker {worker_id} lost the lease on job {job_id}; stopping it")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return
+            lease_expires = time.monotonic() + JOB_LEASE_SECONDS
+    except BaseException as e:
+        # Never leave the job running behind a lease nobody renews
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        if isinstance(e, asyncio.CancelledError):
+            job_queue.release(job_id, worker_id)
+        else:
+            job_queue.requeue(job_id, worker_id)
+        raise
+
+    status = (load_job_status(job_id) or {}).get("status")
+    if status in TERMINAL_STATUSES:
+        job_queue.finish(job_id, worker_id, "failed" if status == "failed" else "done")
+        return
+
+    # The job task ended without recording an outcome (cancelled from inside, or a BaseException)
+    error = "processing was cancelled" if task.cancelled() else repr(task.exception())
+    log_event("job_interrupted", job_id=job_id, error=error, attempt=job["attempts"])
+    if job["attempts"] >= JOB_MAX_ATTEMPTS:
+        save_job_status(job_id, "failed", 0, f"Processing error: {error}")
+        job_queue.finish(job_id, worker_id, "failed")
+        remove_staging_dir(job_staging_dir(UPLOADS_DIR, job_id))
+        remove_results_log(RESULTS_DIR, job_id)
+    else:
+        # Resumes from the results log on the next claim
+        job_queue.requeue(job_id, worker_id)
+
+async def worker_loop(worker_id: str):
+    """Claim and run queued jobs one at a time until cancelled"""
+    print(f"Worker {worker_id} started")
+    failures = 0
+    while True:
+        try:
+            job, exhausted = job_queue.claim(worker_id)
+            for job_id in exhausted:
+                save_job_status(job_id, "failed", 0, f"Processing error: job was interrupted {JOB_MAX_ATTEMPTS} times")
+                remove_staging_dir(job_staging_dir(UPLOADS_DIR, job_id))
+                remove_results_log(RESULTS_DIR, job_id)
+            if job is not None:
+                await run_queued_job(job, worker_id)
+            failures = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # E.g. "database is locked" under contention or a malformed payload: keep the worker alive
+            failures += 1
+            delay = min(JOB_POLL_INTERVAL * 2 ** failures, 30.0)
+            log_event("worker_error", worker_id=worker_id, error=repr(e), retry_in=round(delay, 2))
+            await asyncio.sleep(delay)
+            continue
+        if job is None:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+@app.on_event("startup")
+async def migrate_legacy_jobs():
+    """Import jobs/<id>.json files written by earlier versions into the job store"""
+    imported = job_store.migrate_json_jobs(JOBS_DIR)
+    if imported:
+        print(f"Migrated {imported} legacy job files from {JOBS_DIR} into the job store")
+
+    # Build artifacts for completed jobs from before artifacts existed (also repairs their CSV)
+    for job_id in job_store.jobs_missing_artifacts():
+        results_file = RESULTS_DIR / f"{job_id}.json"
+        if not results_file.exists():
+            continue
+        try:
+            with open(results_file, "r", encoding='utf-8') as f:
+                rows = json.load(f).get("table", [])
+            publish_job_results(job_id, rows, (load_job_status(job_id) or {}).get("message", ""))
+        except Exception as e:
+            print(f"Could not build result artifacts for job {job_id}: {str(e)}")
+
+def index_existing_jobs():
+    """Add the events of completed jobs from before the search index to it"""
+    indexed, seen = 0, set()
+    while True:
+        job_ids = [job_id for job_id in event_index.jobs_missing_index() if job_id not in seen]
+        if not job_ids:
+            break
+        for job_id in job_ids:
+            seen.add(job_id)
+            try:
+                try:
+                    table = json.loads(read_artifact(RESULTS_DIR, job_id, "json")).get("table", [])
+                except FileNotFoundError:
+                    table = []
+                event_index.index_job(job_id, normalize_events(table))
+                indexed += 1
+            except Exception as e:
+                print(f"Could not index events of job {job_id}: {str(e)}")
+    if indexed:
+        print(f"Indexed the events of {indexed} existing jobs for search")
+
+@app.on_event("startup")
+async def start_index_backfill():
+    """Index existing jobs in the background"""
+    asyncio.get_running_loop().run_in_executor(None, index_existing_jobs)
+
+@app.on_event("startup")
+async def start_embedded_workers():
+    """Run job worker loops inside the API process (EMBEDDED_WORKERS=0 leaves jobs to worker.py)"""
+    progress_bridge.start()
+    for index in range(EMBEDDED_WORKERS):
+        worker_id = f"{socket.gethostname()}-{os.getpid()}-api{index}"
+        embedded_workers.append(asyncio.ensure_future(worker_loop(worker_id)))
+
+@app.on_event("startup")
+async def start_compactor():
+    """Apply the retention policy in the background"""
+    compactor.start()
+
+async def warm_up():
+    """Import the parsers and provider SDKs, spawn the CPU workers and open provider connections"""
+    async def load_local_parsers():
+        await asyncio.get_running_loop().run_in_executor(None, load_parsers)
+
+    async def start_cpu_workers():
+        # One task per worker process: each task that finds no idle worker spawns one
+        if cpu_executor is not None:
+            await asyncio.gather(*(run_cpu(load_parsers) for _ in range(CPU_WORKERS)))
+
+    steps = [("parsers", load_local_parsers), ("cpu_workers", start_cpu_workers)]
+    if AZURE_CONFIGURED:
+        steps.append(("azure_ocr", azure_ocr.warm_up))
+    if GEMINI_API_KEY:
+        steps.append(("gemini", gemini_client.warm_up))
+    await warm_up_state.run(steps)
+    log_event("warm_up_done", seconds=warm_up_state.seconds,
+              **{f"{name}_seconds": seconds for name, seconds in warm_up_state.steps.items()})
+
+@app.on_event("startup")
+async def start_warm_up():
+    """Record how long startup took and warm up in the background (WARM_UP)"""
+    startup_timings["ready_seconds"] = round(time.perf_counter() - APP_IMPORT_STARTED, 3)
+    if not WARM_UP:
+        warm_up_state.status = "disabled"
+    elif not warm_up_tasks:
+        warm_up_tasks.append(asyncio.ensure_future(warm_up()))
+
+@app.on_event("shutdown")
+async def close_clients():
+    """Stop embedded workers and close pooled HTTP connections on shutdown"""
+    for task in embedded_workers + warm_up_tasks:
+        task.cancel()
+    await asyncio.gather(*embedded_workers, *warm_up_tasks, return_exceptions=True)
+    embedded_workers.clear()
+    warm_up_tasks.clear()
+    await compactor.stop()
+    await progress_bridge.stop()
+    await gemini_client.aclose()
+    azure_ocr.close()
+    if cpu_executor is not None:
+        cpu_executor.shutdown(wait=False, cancel_futures=True)
+    ocr_guard.close()
+    gemini_guard.close()
+    job_queue.close()
+    event_index.close()
+    job_store.close()
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -399,7 +909,6 @@ async def root():
 
 @app.post("/api/upload")
 async def upload_files(
-    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     use_enhanced_processing: bool = False
 ):
@@ -416,22 +925,40 @@ async def upload_files(
         if file.content_type not in allowed_types and not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail=f"Unsupported file type: {file.content_type}")
 
-    # Check file sizes (10MB limit per file)
+    # Check file sizes up front when the client reported them (10MB limit per file)
     for file in files:
-        if file.size and file.size > 10 * 1024 * 1024:
+        if file.size and file.size > MAX_UPLOAD_BYTES:
             raise HTTPException(status_code=400, detail=f"File too large: {file.filename}. Max size is 10MB per file.")
 
     # Generate job ID
     job_id = str(uuid.uuid4())
 
+    # Spool every file to the job's staging directory; the limit is enforced while streaming
+    staging_dir = job_staging_dir(UPLOADS_DIR, job_id)
+    try:
+        with STAGE_SECONDS.time(stage="upload"):
+            staged_files = [
+                await stage_upload(file, staging_dir, index, MAX_UPLOAD_BYTES)
+                for index, file in enumerate(files)
+            ]
+    except FileTooLargeError as e:
+        remove_staging_dir(staging_dir)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        remove_staging_dir(staging_dir)
+        raise
+
     # Extract filenames for metadata
-    filenames = [file.filename for file in files]
+    filenames = [file.filename for file in staged_files]
 
     # Save initial job status
     save_job_status(job_id, "queued", 0, "Files uploaded, processing started", total_files=len(files), filenames=filenames)
 
-    # Start background processing
-    background_tasks.add_task(process_files_background, job_id, files, use_enhanced_processing)
+    # Hand the job to the queue; a worker picks it up
+    job_queue.enqueue(job_id, {
+        "files": [asdict(file) for file in staged_files],
+        "use_enhanced_processing": use_enhanced_processing,
+    })
 
     return {
         "job_id": job_id,
@@ -439,54 +966,151 @@ async def upload_files(
         "message": "Files uploaded successfully. Processing started."
     }
 
+def date_bound(value: Optional[str], upper: bool = False) -> Optional[str]:
+    """Normalize an ISO date query parameter (see job_store.normalize_bound), or answer 400"""
+    if not value:
+        return None
+    try:
+        return normalize_bound(value, upper)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}. Use ISO format, e.g. 2024-01-31 or 2024-01-31T12:00:00")
+
 @app.get("/api/jobs")
-async def get_jobs():
-    """Get all jobs"""
-    job_files = list(JOBS_DIR.glob("*.json"))
-    jobs_list = []
+async def get_jobs(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    filename: Optional[str] = None,
+    include_counts: bool = False
+):
+    """Get one page of jobs, newest first.
 
-    for job_file in job_files:
-        try:
-            with open(job_file, "r") as f:
-                job_data = json.load(f)
-                jobs_list.append({
-                    "job_id": job_data["job_id"],
-                    "status": job_data["status"],
-                    "progress": job_data.get("progress", 0),
-                    "message": job_data.get("message", ""),
-                    "created_at": job_data.get("created_at", ""),
-                    "total_files": job_data.get("total_files", 0),
-                    "filename": job_data.get("filenames", [None])[0] if job_data.get("filenames") else "",
-                    "filenames": job_data.get("filenames", [])
-                })
-        except:
-            continue
+    Pass the returned ``next_cursor`` back as ``cursor`` to fetch the next page.
+    """
+    limit = max(1, min(limit, 200))
+    created_from = date_bound(created_from)
+    created_to = date_bound(created_to, upper=True)
 
-    # Sort by creation date (newest first)
-    jobs_list.sort(key=lambda x: x["created_at"], reverse=True)
+    try:
+        page, next_cursor = job_store.list_jobs(
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            created_from=created_from,
+            created_to=created_to,
+            filename=filename
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    jobs_list = [
+        {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "progress": job["progress"],
+            "message": job["message"],
+            "created_at": job["created_at"],
+            "total_files": job["total_files"],
+            "filename": job["filenames"][0] if job["filenames"] else "",
+            "filenames": job["filenames"]
+        }
+        for job in page
+    ]
+
+    response = {"jobs": jobs_list, "next_cursor": next_cursor}
+    if include_counts:
+        response["counts"] = job_store.summary_counts()
+    return response
+
+@app.get("/api/events/search")
+async def search_events(
+    q: Optional[str] = None,
+    event: Optional[str] = None,
+    description: Optional[str] = None,
+    ship_cargo: Optional[str] = None,
+    start_from: Optional[str] = None,
+    start_to: Optional[str] = None,
+    filename: Optional[str] = None,
+    job_id: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None
+):
+    """Search the events of all completed jobs, latest start time first.
 
-    return {"jobs": jobs_list}
+    ``q`` matches words in the event, description and ship/cargo text; the
+    field parameters match words in one field only. Pass the returned
+    ``next_cursor`` back as ``cursor`` to fetch the next page.
+    """
+    limit = max(1, min(limit, 200))
+    start_from = date_bound(start_from)
+    start_to = date_bound(start_to, upper=True)
+
+    try:
+        events, next_cursor = event_index.search(
+            limit=limit,
+            cursor=cursor,
+            text=q,
+            fields=dict(zip(TEXT_FIELDS, (event, description, ship_cargo))),
+            start_from=start_from,
+            start_to=start_to,
+            filename=filename,
+            job_id=job_id
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return {"events": events, "next_cursor": next_cursor}
+
+def etag_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve pre-serialized JSON, answering If-None-Match with 304"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def artifact_response(request: Request, job_id: str, kind: str) -> Response:
+    """Serve a stored result artifact, answering If-None-Match without reading it"""
+    artifact = job_store.load_artifact(job_id, kind)
+    if not artifact:
+        raise HTTPException(status_code=404, detail="Results not found")
+
+    if artifact["etag"] in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": artifact["etag"], "Cache-Control": "no-cache"})
+    try:
+        body = read_artifact(RESULTS_DIR, job_id, kind)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Results not found")
+    return etag_response(request, body, artifact["etag"])
 
 @app.get("/api/result/{job_id}")
-async def get_result(job_id: str):
+async def get_result(job_id: str, request: Request):
     """Get results for a specific job"""
     job_status = load_job_status(job_id)
     if not job_status:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    if job_status["status"] == "processing":
-        return {
+    if job_status["status"] in ("queued", "processing"):
+        # Events of the files finished so far, from the job's results log
+        logged = read_file_rows(RESULTS_DIR, job_id)
+        records = normalize_events(row for index in sorted(logged) for row in logged[index])
+        apply_durations(records)
+        body = json.dumps({
             "job_id": job_id,
             "status": "processing",
             "progress": job_status.get("progress", 0),
             "message": job_status.get("message", "Processing in progress..."),
             "total_files": job_status.get("total_files", 1),
             "filename": job_status.get("filenames", [None])[0] if job_status.get("filenames") else "",
-            "filenames": job_status.get("filenames", [])
-        }
+            "filenames": job_status.get("filenames", []),
+            "files_done": len(logged),
+            "events": [record.as_frontend() for record in records]
+        }).encode("utf-8")
+        return etag_response(request, body, etag_for(body))
 
     if job_status["status"] == "failed":
-        return {
+        body = json.dumps({
             "job_id": job_id,
             "status": "failed",
             "message": job_status.get("message", "Processing failed"),
@@ -494,54 +1118,102 @@ async def get_result(job_id: str):
             "filename": job_status.get("filenames", [None])[0] if job_status.get("filenames") else "",
             "filenames": job_status.get("filenames", []),
             "error": job_status.get("message", "Processing failed")
-        }
+        }).encode("utf-8")
+        return etag_response(request, body, etag_for(body))
 
-    # Load results
-    results_file = RESULTS_DIR / f"{job_id}.json"
-    if not results_file.exists():
-        raise HTTPException(status_code=404, detail="Results not found")
+    # Completed: serve the view artifact written at completion/edit time as-is
+    return artifact_response(request, job_id, "view")
 
-    with open(results_file, "r") as f:
-        results = json.load(f)
-
-    # Regenerate CSV if needed to ensure proper format
-    regenerate_csv_if_needed(job_id, results)
-
-    # Return data in the format expected by the frontend
-    # Map backend field names to frontend expected field names
-    mapped_events = []
-    for event in results.get("table", []):
-        mapped_event = {
-            "event": event.get("event", ""),
-            "start": event.get("start_time", ""),
-            "end": event.get("end_time", ""),
-            "description": event.get("description", ""),
-            "filename": event.get("filename", ""),
-            "day": event.get("day", ""),
-            "duration": event.get("duration", ""),
-            "ship_cargo": event.get("ship_cargo", ""),
-            "layoff_time": event.get("layoff_time", "")
-        }
-        mapped_events.append(mapped_event)
+@app.put("/api/result/{job_id}")
+async def update_result(job_id: str, request: Request):
+    """Replace a completed job's events with an edited list and rebuild its artifacts"""
+    job_status = load_job_status(job_id)
+    if not job_status or job_status["status"] != "completed":
+        raise HTTPException(status_code=404, detail="Job not found or not completed")
 
-    return {
-        "job_id": job_id,
-        "status": "completed",
-        "events": mapped_events,  # Frontend expects events array directly
-        "total_files": job_status.get("total_files", 1),
-        "filename": job_status.get("filenames", [None])[0] if job_status.get("filenames") else "",  # Get first filename from list
-        "filenames": job_status.get("filenames", []),
-        "message": job_status.get("message", ""),
-        "created_at": job_status.get("created_at", "")
-    }
+    try:
+        body = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Request body must be JSON")
+    if not isinstance(body, dict) or not isinstance(body.get("events"), list):
+        raise HTTPException(status_code=400, detail="Request body must contain an 'events' list")
+
+    rows = body["events"]
+    publish_job_results(job_id, rows, job_status.get("message", ""))
+    artifact = job_store.load_artifact(job_id, "view")
+    return {"job_id": job_id, "total_events": len(rows), "version": artifact["version"], "etag": artifact["etag"]}
+
+@app.get("/api/result/{job_id}/laytime")
+async def get_laytime(job_id: str, request: Request):
+    """Duration, layoff and laytime totals per ship/cargo, per day and overall for a completed job"""
+    job_status = load_job_status(job_id)
+    if not job_status or job_status["status"] != "completed":
+        raise HTTPException(status_code=404, detail="Job not found or not completed")
+
+    if not job_store.load_artifact(job_id, "laytime"):
+        # Jobs completed before laytime totals existed get them built once from their results
+        try:
+            rows = json.loads(read_artifact(RESULTS_DIR, job_id, "json")).get("table", [])
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Results not found")
+        records = normalize_events(rows)
+        apply_durations(records)
+        manifest = write_artifacts(RESULTS_DIR, job_id, {
+            "laytime": json.dumps(dict(job_id=job_id, **laytime_summary(records))).encode("utf-8"),
+        })
+        job_store.save_artifacts(job_id, manifest)
+
+    return artifact_response(request, job_id, "laytime")
+
+def progress_stream(job_id: Optional[str], queue: asyncio.Queue, initial: Optional[dict] = None):
+    """SSE body: the initial state, then updates from the queue until the job finishes"""
+    async def events():
+        try:
+            if initial is not None:
+                yield format_sse(initial)
+                if initial["status"] in TERMINAL_STATUSES:
+                    return
+            while True:
+                try:
+                    update = await asyncio.wait_for(queue.get(), timeout=PROGRESS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield format_sse(update)
+                if job_id is not None and update["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            progress_broker.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/progress/{job_id}")
+async def stream_job_progress(job_id: str):
+    """Server-Sent Events with a job's status, progress and message; ends when the job completes or fails"""
+    # Subscribe before reading the current state so no update falls in between
+    queue = progress_broker.subscribe(job_id)
+    job_status = load_job_status(job_id)
+    if not job_status:
+        progress_broker.unsubscribe(job_id, queue)
+        raise HTTPException(status_code=404, detail="Job not found")
+    return progress_stream(job_id, queue, progress_event(job_status))
+
+@app.get("/api/progress")
+async def stream_all_progress():
+    """Server-Sent Events with status updates of every job"""
+    return progress_stream(None, progress_broker.subscribe())
 
 @app.post("/api/export/{job_id}")
 async def export_result(job_id: str, format: str = "json", type: Optional[str] = None, request: Request = None):
-    """Export results in specified format.
+    """Export results in specified format (json, csv or ndjson).
 
-    For CSV exports we now generate CSV on-the-fly from the JSON results to
-    guarantee a valid CSV (avoids serving stale or accidentally-written JSON
-    files with a .csv extension).
+    CSV and NDJSON are generated on-the-fly from the JSON results (or from
+    POSTed edited events) and streamed row by row, gzip-compressed when the
+    client accepts it.
     """
     job_status = load_job_status(job_id)
     if not job_status or job_status["status"] != "completed":
@@ -549,16 +1221,15 @@ async def export_result(job_id: str, format: str = "json", type: Optional[str] =
 
 
     # Determine requested format - frontend may send ?type=csv
-    out_format = type if type else format
+    out_format = (type if type else format).lower()
+    if out_format not in ("json", "csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Unsupported export format. Use 'json', 'csv' or 'ndjson'")
 
-    results_file = RESULTS_DIR / f"{job_id}.json"
-    if not results_file.exists():
+    results_file = artifact_path(RESULTS_DIR, job_id, "json")
+    archived = not results_file.exists()
+    if archived and not artifact_exists(RESULTS_DIR, job_id, "json"):
         raise HTTPException(status_code=404, detail="Results file not found")
 
-    # Load JSON results once (fallback source)
-    with open(results_file, "r", encoding='utf-8') as f:
-        results = json.load(f)
-
     # If frontend POSTed a normalization payload (events), prefer that for export
     posted_events = None
     if request is not None:
@@ -569,83 +1240,62 @@ async def export_result(job_id: str, format: str = "json", type: Optional[str] =
         except Exception:
             posted_events = None
 
-    if out_format.lower() == "json":
-        # Use edited data if posted, otherwise use stored results
-        if posted_events:
-            # Map frontend field names to backend field names for consistency
-            mapped_events = []
-            for row in posted_events:
-                mapped_event = {
-                    'event': row.get('event') or row.get('Event') or row.get('name') or '',
-                    'day': row.get('day') or row.get('Day') or row.get('date') or '',
-                    'start_time': row.get('start_time') or row.get('Start Time') or row.get('start_time_iso') or '',
-                    'end_time': row.get('end_time') or row.get('End Time') or row.get('end_time_iso') or '',
-                    'duration': row.get('duration') or row.get('Duration') or '',
-                    'ship_cargo': row.get('ship_cargo') or row.get('Ship/Cargo') or row.get('ShipCargo') or 'N/A',
-                    'layoff_time': row.get('layoff_time') or row.get('Layoff Time') or row.get('laytime') or row.get('Laytime') or 'N/A',
-                    'description': row.get('description') or row.get('Description') or '',
-                    'filename': row.get('filename') or row.get('Filename') or row.get('FileName') or ''
-                }
-                mapped_events.append(mapped_event)
-
-            # Return the mapped events as JSON with backend field names
-            return JSONResponse(content={"table": mapped_events})
-        else:
-            # Return stored results
-            return FileResponse(
-                results_file,
+    if out_format == "json" and not posted_events:
+        # Return stored results (decompressed if the job was archived)
+        if archived:
+            return Response(
+                content=read_artifact(RESULTS_DIR, job_id, "json"),
                 media_type="application/json",
-                filename=f"extracted_data_{job_id}.json"
+                headers={"Content-Disposition": f'attachment; filename="extracted_data_{job_id}.json"'}
             )
+        return FileResponse(
+            results_file,
+            media_type="application/json",
+            filename=f"extracted_data_{job_id}.json"
+        )
 
-
-    elif out_format.lower() == "csv":
-        # Use edited data if posted, otherwise use stored results
-        events = posted_events if posted_events else (results.get("table") or results.get("events") or [])
+    if posted_events:
+        # Use edited data if posted
+        events = posted_events
+    else:
+        results = json.loads(read_artifact(RESULTS_DIR, job_id, "json"))
+        events = results.get("table") or results.get("events") or []
         if not events:
             raise HTTPException(status_code=404, detail="No events found for this job.")
 
+    # Rows are normalized (and their durations computed) lazily as the response is written
+    records = iter_with_durations(iter_events(events))
+    if out_format == "csv":
         # Always use the original backend field names for consistency
-        # Map frontend field names to backend field names
-        fieldnames = ['event', 'day', 'start_time', 'end_time', 'duration', 'ship_cargo', 'layoff_time', 'description', 'filename']
-
-        csv_buffer = io.StringIO()
-        writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames, quoting=csv.QUOTE_ALL, escapechar='\\')
-        writer.writeheader()
-
-        for row in events:
-            # Map frontend field names to backend field names
-            csv_row = {
-                'event': row.get('event') or row.get('Event') or row.get('name') or '',
-                'day': row.get('day') or row.get('Day') or row.get('date') or '',
-                'start_time': row.get('start_time') or row.get('Start Time') or row.get('start_time_iso') or '',
-                'end_time': row.get('end_time') or row.get('End Time') or row.get('end_time_iso') or '',
-                'duration': row.get('duration') or row.get('Duration') or '',
-                'ship_cargo': row.get('ship_cargo') or row.get('Ship/Cargo') or row.get('ShipCargo') or 'N/A',
-                'layoff_time': row.get('layoff_time') or row.get('Layoff Time') or row.get('laytime') or row.get('Laytime') or 'N/A',
-                'description': row.get('description') or row.get('Description') or '',
-                'filename': row.get('filename') or row.get('Filename') or row.get('FileName') or ''
-            }
-            writer.writerow(csv_row)
-
-        csv_bytes = csv_buffer.getvalue().encode('utf-8')
-        csv_buffer.close()
-        return StreamingResponse(
-            iter([csv_bytes]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=extracted_data_{job_id}.csv"}
-        )
-
+        body_chunks = iter_csv(records, list(FIELDS))
+        media_type = "text/csv"
+    elif out_format == "ndjson":
+        body_chunks = iter_ndjson(record.as_dict() for record in records)
+        media_type = "application/x-ndjson"
     else:
-        raise HTTPException(status_code=400, detail="Unsupported export format. Use 'json' or 'csv'")
+        body_chunks = iter_json_table(record.as_dict() for record in records)
+        media_type = "application/json"
+
+    headers = {
+        "Content-Disposition": f"attachment; filename=extracted_data_{job_id}.{out_format}",
+        "Vary": "Accept-Encoding"
+    }
+    if request is not None and accepts_gzip(request.headers.get("accept-encoding", "")):
+        body_chunks = gzip_chunks(body_chunks)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(body_chunks, media_type=media_type, headers=headers)
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "azure_configured": bool(AZURE_API_KEY and AZURE_ENDPOINT and 'your-resource-name' not in AZURE_ENDPOINT),
-        "gemini_configured": bool(GEMINI_API_KEY)
+        "azure_configured": AZURE_CONFIGURED,
+        "gemini_configured": bool(GEMINI_API_KEY),
+        "queue": job_queue.depth(),
+        "providers": {guard.name: guard.state() for guard in (ocr_guard, gemini_guard)},
+        "startup": dict(startup_timings, warm_up=warm_up_state.state())
     }
 
 @app.get("/health")
@@ -653,6 +1303,67 @@ async def simple_health_check():
     """Simple health check endpoint for cloud platforms"""
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics of this process (stage latencies, counters, queue and executor gauges)"""
+    return Response(content=REGISTRY.render(), headers={"Content-Type": CONTENT_TYPE})
+
+def require_admin(request: Request):
+    """Reject requests without the admin token (admin endpoints are off when ADMIN_TOKEN is unset)"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.post("/api/admin/profiler/start")
+async def start_profiler(request: Request, interval: float = 0.005, max_seconds: float = 300):
+    """Start sampling the stacks of this process's threads"""
+    require_admin(request)
+    if not 0.001 <= interval <= 1:
+        raise HTTPException(status_code=400, detail="interval must be between 0.001 and 1 seconds")
+    if not profiler.start(interval, max_seconds):
+        raise HTTPException(status_code=409, detail="Profiler is already running")
+    return {"running": True, "interval": interval, "max_seconds": max_seconds}
+
+@app.post("/api/admin/profiler/stop")
+async def stop_profiler(request: Request, format: str = "json", limit: int = 200):
+    """Stop the profiler and return the sampled stacks (``format=collapsed`` for flame graph tools)"""
+    require_admin(request)
+    report = profiler.stop(limit)
+    if format == "collapsed":
+        body = "".join(f"{entry['stack']} {entry['count']}\n" for entry in report["stacks"])
+        return Response(content=body, media_type="text/plain")
+    return report
+
+@app.get("/api/admin/storage")
+async def storage_usage(request: Request):
+    """Disk use per storage area, job counts, the retention policy and the last compaction pass"""
+    require_admin(request)
+    loop = asyncio.get_running_loop()
+    usage = await loop.run_in_executor(None, compactor.usage)
+    db_path = Path(os.getenv('JOB_DB_PATH', 'jobs.db'))
+    usage["database"] = {"bytes": sum(
+        path.stat().st_size for path in (db_path, Path(f"{db_path}-wal"), Path(f"{db_path}-shm")) if path.exists()
+    )}
+    usage["cache"] = await loop.run_in_executor(None, dir_usage, CACHE_DIR)
+    return {
+        "usage": usage,
+        "total_bytes": sum(area["bytes"] for area in usage.values()),
+        "jobs": job_store.summary_counts(),
+        "retention": asdict(retention_policy),
+        "last_compaction": compactor.last_run,
+    }
+
+@app.post("/api/admin/retention/run")
+async def run_retention(request: Request):
+    """Run a retention pass now"""
+    require_admin(request)
+    return await asyncio.get_running_loop().run_in_executor(None, compactor.run_once)
+
+startup_timings["import_seconds"] = round(time.perf_counter() - APP_IMPORT_STARTED, 3)
+
 if __name__ == "__main__":
+    import uvicorn
+
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
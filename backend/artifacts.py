@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict
+
+
+# Artifact kind -> file name suffix under the results directory
+ARTIFACT_SUFFIXES = {
+    "json": ".json",
+    "csv": ".csv",
+    "view": ".view.json",
+    "laytime": ".laytime.json",
+}
+
+
+# Compressed artifacts of old jobs (see retention.py) live here as <name>.gz
+ARCHIVE_DIR_NAME = "archive"
+
+
+def artifact_path(results_dir: Path, job_id: str, kind: str) -> Path:
+    return Path(results_dir) / f"{job_id}{ARTIFACT_SUFFIXES[kind]}"
+
+
+def archived_artifact_path(results_dir: Path, job_id: str, kind: str) -> Path:
+    return Path(results_dir) / ARCHIVE_DIR_NAME / f"{job_id}{ARTIFACT_SUFFIXES[kind]}.gz"
+
+
+def etag_for(data: bytes) -> str:
+    """Strong ETag (quoted) derived from the content hash"""
+    return f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+
+
+def write_artifacts(results_dir: Path, job_id: str, payloads: Dict[str, bytes]) -> Dict[str, dict]:
+    """Atomically write pre-serialized result artifacts and return their manifest.
+
+    The manifest maps each kind to ``{"etag", "size"}`` so readers can answer
+    conditional requests without touching the files.
+    """
+    manifest = {}
+    for kind, data in payloads.items():
+        path = artifact_path(results_dir, job_id, kind)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        # A rewritten artifact (edited results) supersedes its archived copy
+        try:
+            os.remove(archived_artifact_path(results_dir, job_id, kind))
+        except FileNotFoundError:
+            pass
+        manifest[kind] = {"etag": etag_for(data), "size": len(data)}
+    return manifest
+
+
+def artifact_exists(results_dir: Path, job_id: str, kind: str) -> bool:
+    return (artifact_path(results_dir, job_id, kind).exists()
+            or archived_artifact_path(results_dir, job_id, kind).exists())
+
+
+def open_artifact(results_dir: Path, job_id: str, kind: str):
+    """Open an artifact for binary reading, decompressing it transparently if it was archived"""
+    try:
+        return open(artifact_path(results_dir, job_id, kind), "rb")
+    except FileNotFoundError:
+        return gzip.open(archived_artifact_path(results_dir, job_id, kind), "rb")
+
+
+def read_artifact(results_dir: Path, job_id: str, kind: str) -> bytes:
+    with open_artifact(results_dir, job_id, kind) as f:
+        return f.read()
+
+
+def archive_artifact(results_dir: Path, job_id: str, kind: str) -> int:
+    """Move an artifact into the compressed archive; returns the bytes saved (0 if it was not live)"""
+    path = artifact_path(results_dir, job_id, kind)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return 0
+    archived = archived_artifact_path(results_dir, job_id, kind)
+    archived.parent.mkdir(exist_ok=True)
+    tmp_path = archived.with_name(archived.name + ".tmp")
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(tmp_path, "wb") as f:
+        f.write(compressed)
+    os.replace(tmp_path, archived)
+    os.remove(path)
+    return len(data) - len(compressed)
+
+
+def remove_artifacts(results_dir: Path, job_id: str, kinds=None):
+    """Delete live and archived files of the given artifact kinds (all by default)"""
+    for kind in kinds or ARTIFACT_SUFFIXES:
+        for path in (artifact_path(results_dir, job_id, kind), archived_artifact_path(results_dir, job_id, kind)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
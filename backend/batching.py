@@ -0,0 +1,114 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+
+# (text, filename) pairs in, one list of rows per document out (same order)
+SendBatch = Callable[[List[Tuple[str, str]]], Awaitable[List[List[dict]]]]
+SendSingle = Callable[[str, str], Awaitable[List[dict]]]
+
+
+class _Document:
+    __slots__ = ("text", "filename", "future")
+
+    def __init__(self, text: str, filename: str, future: asyncio.Future):
+        self.text = text
+        self.filename = filename
+        self.future = future
+
+
+class DocumentBatcher:
+    """Packs several small documents of one job into a single Gemini request.
+
+    Files report ``file_started``/``file_finished`` around their processing
+    and call ``extract`` for a small document. A batch is sent as soon as
+    every file that is currently running is waiting on it, when it reaches
+    ``max_chars``/``max_docs``, or ``linger`` seconds after its first
+    document, whichever comes first. If the batched request fails or its
+    response cannot be split per document, each document of that batch is
+    sent on its own instead.
+    """
+
+    def __init__(self, send_batch: SendBatch, send_single: SendSingle,
+                 max_chars: int = 12000, max_docs: int = 8, linger: float = 2.0):
+        self.send_batch = send_batch
+        self.send_single = send_single
+        self.max_chars = max_chars
+        self.max_docs = max_docs
+        self.linger = linger
+        self.batches_sent = 0
+        self.fallbacks = 0
+
+        self._active = 0
+        self._waiting = 0
+        self._pending: List[_Document] = []
+        self._pending_chars = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def file_started(self):
+        self._active += 1
+
+    def file_finished(self):
+        self._active -= 1
+        self._maybe_flush()
+
+    async def extract(self, text: str, filename: str) -> List[dict]:
+        loop = asyncio.get_running_loop()
+        if self._pending and self._pending_chars + len(text) > self.max_chars:
+            self._flush()
+
+        document = _Document(text, filename, loop.create_future())
+        self._pending.append(document)
+        self._pending_chars += len(text)
+        self._waiting += 1
+        try:
+            if len(self._pending) >= self.max_docs:
+                self._flush()
+            else:
+                self._maybe_flush()
+                if self._pending and self._timer is None:
+                    self._timer = loop.call_later(self.linger, self._flush)
+            return await document.future
+        finally:
+            self._waiting -= 1
+
+    def _maybe_flush(self):
+        # Nothing else can join the batch once every running file is waiting on it
+        if self._pending and self._waiting >= self._active:
+            self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        documents, self._pending, self._pending_chars = self._pending, [], 0
+        if not documents:
+            return
+        task = asyncio.ensure_future(self._send(documents))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, documents: List[_Document]):
+        if len(documents) > 1:
+            try:
+                results = await self.send_batch([(d.text, d.filename) for d in documents])
+                self.batches_sent += 1
+                for document, rows in zip(documents, results):
+                    if not document.future.done():
+                        document.future.set_result(rows)
+                return
+            except Exception as e:
+                self.fallbacks += 1
+                print(f"Batched Gemini request for {len(documents)} documents failed ({str(e)}); "
+                      f"falling back to one request per document")
+
+        async def send_one(document: _Document):
+            try:
+                rows = await self.send_single(document.text, document.filename)
+                if not document.future.done():
+                    document.future.set_result(rows)
+            except Exception as e:
+                if not document.future.done():
+                    document.future.set_exception(e)
+
+        await asyncio.gather(*(send_one(document) for document in documents))
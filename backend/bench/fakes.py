@@ -0,0 +1,297 @@
+"""Local stand-ins for the Azure Read API and the Gemini generateContent API.
+
+Both servers answer in the shape the real services (and SDKs) expect, with
+configurable latency, error rate and rate limiting (429 with Retry-After),
+so the backend can be benchmarked without credentials or network access.
+Run them on their own with ``python -m bench.fakes`` from the backend
+directory, or let ``bench.run`` start them.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+# Text of every page the fake OCR returns: a short Statement of Facts in the
+# layout the local parser reads, so runs exercise both extraction paths
+SOF_PAGE_LINES = [
+    "STATEMENT OF FACTS",
+    "Vessel: MV BENCH CARRIER",
+    "Cargo: Iron Ore",
+    "01/03/2024",
+    "0600 Vessel arrived at anchorage",
+    "0830-0915 Pilot on board",
+    "1000 All fast alongside berth 4",
+    "1100-1800 Loading commenced",
+    "1400-1430 Rain stoppage",
+]
+
+GEMINI_EVENTS = [
+    {"event": "Vessel Arrival at Anchorage", "start_time": "2024-03-01 06:00", "end_time": "2024-03-01 06:00",
+     "ship_cargo": "MV BENCH CARRIER / Iron Ore", "layoff_time": "N/A", "description": "Vessel arrived at anchorage"},
+    {"event": "Pilot Boarding", "start_time": "2024-03-01 08:30", "end_time": "2024-03-01 09:15",
+     "ship_cargo": "MV BENCH CARRIER / Iron Ore", "layoff_time": "N/A", "description": "Pilot boarded the vessel"},
+    {"event": "Cargo Loading Operation", "start_time": "2024-03-01 11:00", "end_time": "2024-03-01 18:00",
+     "ship_cargo": "MV BENCH CARRIER / Iron Ore", "layoff_time": "30m", "description": "Loading with a rain stoppage"},
+]
+
+
+@dataclass
+class FakeServiceConfig:
+    """Behaviour of one fake service; latencies are in seconds, rates are probabilities per request"""
+    latency: float = 0.5
+    jitter: float = 0.2
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+
+    def delay(self) -> float:
+        return max(0.0, self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def failure(self) -> Optional[int]:
+        """Status code of an injected failure for this request, or None"""
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: FakeServiceConfig
+
+    def log_message(self, format, *args):
+        pass
+
+    def _count(self, key: str, amount: int = 1):
+        with self.server.lock:
+            self.server.stats[key] += amount
+
+    def _read_body(self) -> bytes:
+        # The Azure SDK streams uploads with chunked transfer encoding
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, body: dict, headers: Optional[Dict[str, str]] = None):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _send_failure(self, status: int):
+        self._count(f"http_{status}")
+        headers = {"Retry-After": str(self.config.retry_after)} if status == 429 else None
+        self._send_json(status, {"error": {"code": str(status), "message": "Injected failure"}}, headers)
+
+
+class FakeAzureReadHandler(_Handler):
+    """Azure Read 3.2: ``POST .../read/analyze`` then poll ``GET .../read/analyzeResults/{id}``.
+
+    An operation reports "running" until ``latency`` seconds after it was
+    submitted, so the backend's polling behaviour is part of what is measured.
+    """
+
+    def do_POST(self):
+        body = self._read_body()
+        url = urlparse(self.path)
+        if not url.path.rstrip("/").endswith("/read/analyze"):
+            self._send_json(404, {"error": {"code": "NotFound", "message": self.path}})
+            return
+        failure = self.config.failure()
+        if failure:
+            self._send_failure(failure)
+            return
+
+        pages = parse_qs(url.query).get("pages", [""])[0]
+        page_count = len([page for page in pages.split(",") if page]) or 1
+        operation_id = str(uuid.uuid4())
+        with self.server.lock:
+            self.server.operations[operation_id] = (time.monotonic() + self.config.delay(), page_count)
+        self._count("submitted")
+        self._count("bytes", len(body))
+
+        base = f"http://{self.headers.get('Host')}{url.path.rsplit('/read/analyze', 1)[0]}"
+        self.send_response(202)
+        self.send_header("Operation-Location", f"{base}/read/analyzeResults/{operation_id}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        operation_id = urlparse(self.path).path.rstrip("/").rsplit("/", 1)[-1]
+        with self.server.lock:
+            operation = self.server.operations.get(operation_id)
+        if operation is None:
+            self._send_json(404, {"error": {"code": "NotFound", "message": "Unknown operation"}})
+            return
+        self._count("polls")
+
+        ready_at, page_count = operation
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        if time.monotonic() < ready_at:
+            self._send_json(200, {"status": "running", "createdDateTime": now, "lastUpdatedDateTime": now})
+            return
+        with self.server.lock:
+            self.server.operations.pop(operation_id, None)
+        lines = [{"boundingBox": [0, 0, 100, 0, 100, 10, 0, 10], "text": text, "words": []} for text in SOF_PAGE_LINES]
+        self._send_json(200, {
+            "status": "succeeded",
+            "createdDateTime": now,
+            "lastUpdatedDateTime": now,
+            "analyzeResult": {
+                "version": "3.2.0",
+                "modelVersion": "2022-04-30",
+                "readResults": [
+                    {"page": page + 1, "angle": 0, "width": 1000, "height": 1400, "unit": "pixel", "lines": lines}
+                    for page in range(page_count)
+                ],
+            },
+        })
+
+
+class FakeGeminiHandler(_Handler):
+    """Gemini ``POST .../models/{model}:generateContent`` answering with a fixed set of events"""
+
+    def do_POST(self):
+        body = self._read_body()
+        if not urlparse(self.path).path.endswith(":generateContent"):
+            self._send_json(404, {"error": {"code": 404, "message": self.path}})
+            return
+        failure = self.config.failure()
+        time.sleep(self.config.delay())
+        if failure:
+            self._send_failure(failure)
+            return
+        self._count("requests")
+
+        try:
+            prompt = json.loads(body)["contents"][0]["parts"][0]["text"]
+        except (ValueError, KeyError, IndexError):
+            self._send_json(400, {"error": {"code": 400, "message": "Invalid request"}})
+            return
+        # Batched prompts expect a document_id per row
+        documents = prompt.count("=== END OF DOCUMENT D")
+        rows = (
+            [dict(event, document_id=f"D{i + 1}") for i in range(documents) for event in GEMINI_EVENTS]
+            if documents else GEMINI_EVENTS
+        )
+        self._send_json(200, {
+            "candidates": [{"content": {"parts": [{"text": json.dumps(rows)}], "role": "model"}}],
+            "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": 60 * len(rows)},
+        })
+
+
+class FakeServer:
+    """One fake service on a background thread (port 0 picks a free port)"""
+
+    def __init__(self, handler: type, config: FakeServiceConfig, host: str = "127.0.0.1", port: int = 0):
+        handler_class = type(handler.__name__, (handler,), {"config": config})
+        self.httpd = ThreadingHTTPServer((host, port), handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.operations = {}
+        self.httpd.stats = _Stats()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name=handler.__name__, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self.httpd.lock:
+            return dict(self.httpd.stats)
+
+    def start(self) -> "FakeServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Stats(dict):
+    """Request counters; missing keys count from zero"""
+
+    def __missing__(self, key):
+        return 0
+
+
+def start_fakes(ocr: FakeServiceConfig, gemini: FakeServiceConfig, ocr_port: int = 0, gemini_port: int = 0) -> List[FakeServer]:
+    return [
+        FakeServer(FakeAzureReadHandler, ocr, port=ocr_port).start(),
+        FakeServer(FakeGeminiHandler, gemini, port=gemini_port).start(),
+    ]
+
+
+def add_fake_arguments(parser: argparse.ArgumentParser):
+    for name, latency in (("ocr", 0.5), ("gemini", 1.0)):
+        parser.add_argument(f"--{name}-latency", type=float, default=latency,
+                            help=f"seconds until a {name} result is ready (default {latency})")
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0,
+                            help=f"share of {name} requests answered with HTTP 500")
+        parser.add_argument(f"--{name}-429-rate", type=float, default=0.0,
+                            help=f"share of {name} requests answered with HTTP 429")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency varies by +/- this fraction")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+
+
+def fake_configs(args: argparse.Namespace) -> Dict[str, FakeServiceConfig]:
+    return {
+        name: FakeServiceConfig(
+            latency=getattr(args, f"{name}_latency"),
+            jitter=args.jitter,
+            error_rate=getattr(args, f"{name}_error_rate"),
+            rate_limit_rate=getattr(args, f"{name}_429_rate"),
+            retry_after=args.retry_after,
+        )
+        for name in ("ocr", "gemini")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake Azure Read and Gemini servers")
+    parser.add_argument("--ocr-port", type=int, default=8101)
+    parser.add_argument("--gemini-port", type=int, default=8102)
+    add_fake_arguments(parser)
+    args = parser.parse_args()
+
+    configs = fake_configs(args)
+    ocr, gemini = start_fakes(configs["ocr"], configs["gemini"], args.ocr_port, args.gemini_port)
+    print(f"AZURE_ENDPOINT={ocr.url}")
+    print(f"GEMINI_BASE_URL={gemini.url}/v1beta")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ocr.stop()
+        gemini.stop()
+
+
+if __name__ == "__main__":
+    main()
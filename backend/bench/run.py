@@ -0,0 +1,315 @@
+"""Offline load benchmark for the SoF Event Extractor API.
+
+Starts the fake Azure Read and Gemini servers (bench/fakes.py), starts the
+API against them in a scratch directory, then for each concurrency level
+runs jobs end to end: upload, poll the result until the job finishes, list
+jobs and export the result. Prints (or writes) a JSON report with latency
+percentiles per request type, jobs per minute, peak RSS and the time until
+the API first answered ``/health``, to compare between versions. From the
+backend directory::
+
+    python -m bench.run --concurrency 1,4,8 --jobs 20 --output bench.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+from PIL import Image
+
+from bench.fakes import add_fake_arguments, fake_configs, start_fakes
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentiles(samples: List[float]) -> dict:
+    """Count, mean, max and nearest-rank p50/p95/p99 of latencies in seconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": round(rank(50), 4),
+        "p95": round(rank(95), 4),
+        "p99": round(rank(99), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def make_page_image(width: int, height: int) -> bytes:
+    """A mostly blank PNG page with a random noise patch, so every upload has a new digest"""
+    image = Image.new("L", (width, height), 255)
+    patch = Image.effect_noise((64, 64), 64)
+    image.paste(patch, (random.randrange(width - 64), random.randrange(height - 64)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class RSSSampler:
+    """Samples the resident memory of a process and its children (Linux /proc) from a thread"""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    @staticmethod
+    def _children(pid: int) -> List[int]:
+        children = []
+        for task in Path(f"/proc/{pid}/task").glob("*"):
+            try:
+                children.extend(int(child) for child in (task / "children").read_text().split())
+            except OSError:
+                continue
+        return children
+
+    @staticmethod
+    def _status_kb(pid: int, field: str) -> int:
+        try:
+            for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+    def tree_rss(self) -> int:
+        pids, total = [self.pid], 0
+        while pids:
+            pid = pids.pop()
+            total += self._status_kb(pid, "VmRSS") * 1024
+            pids.extend(self._children(pid))
+        return total
+
+    def process_peak(self) -> int:
+        """High-water mark of the main process alone (VmHWM)"""
+        return self._status_kb(self.pid, "VmHWM") * 1024
+
+    def reset_peak(self) -> int:
+        peak, self.peak = self.peak, self.tree_rss()
+        return peak
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.tree_rss())
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class LoadRun:
+    """Runs ``jobs`` jobs through the API with ``concurrency`` clients and records timings"""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ("upload", "result_poll", "jobs_list", "export", "job")}
+        self.errors: Dict[str, int] = {}
+        self.completed = 0
+        self.failed = 0
+
+    async def _timed(self, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.errors[f"{name}:{type(e).__name__}"] = self.errors.get(f"{name}:{type(e).__name__}", 0) + 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[f"{name}:http_{response.status_code}"] = self.errors.get(f"{name}:http_{response.status_code}", 0) + 1
+        return response
+
+    async def run_job(self):
+        files = [
+            ("files", (f"page{i}.png", make_page_image(self.args.image_width, self.args.image_height), "image/png"))
+            for i in range(self.args.files_per_job)
+        ]
+        started = time.perf_counter()
+        response = await self._timed("upload", "POST", "/api/upload", files=files)
+        if response is None or response.status_code != 200:
+            self.failed += 1
+            return
+        job_id = response.json()["job_id"]
+
+        deadline = started + self.args.job_timeout
+        status = None
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(self.args.poll_interval)
+            response = await self._timed("result_poll", "GET", f"/api/result/{job_id}")
+            if response is not None and response.status_code == 200:
+                status = response.json().get("status")
+                if status in ("completed", "failed"):
+                    break
+        if status != "completed":
+            self.failed += 1
+            self.errors[f"job:{status or 'timeout'}"] = self.errors.get(f"job:{status or 'timeout'}", 0) + 1
+            return
+        self.latencies["job"].append(time.perf_counter() - started)
+        self.completed += 1
+
+        await self._timed("jobs_list", "GET", "/api/jobs", params={"limit": 50})
+        await self._timed("export", "POST", f"/api/export/{job_id}", params={"format": self.args.export_format})
+
+    async def run(self, concurrency: int, jobs: int) -> float:
+        """Run the jobs with at most ``concurrency`` in flight; returns the wall time"""
+        remaining = iter(range(jobs))
+
+        async def client_loop():
+            for _ in remaining:
+                await self.run_job()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+
+def start_backend(args: argparse.Namespace, workdir: Path, ocr_url: str, gemini_url: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        AZURE_ENDPOINT=ocr_url,
+        AZURE_API_KEY="bench",
+        GEMINI_BASE_URL=f"{gemini_url}/v1beta",
+        GEMINI_API_KEY="bench",
+        EMBEDDED_WORKERS=str(args.workers),
+        LOCAL_PARSER_ENABLED="true" if args.local_parser else "false",
+        JOB_DB_PATH=str(workdir / "jobs.db"),
+        CACHE_DIR=str(workdir / "cache"),
+        UPLOADS_DIR=str(workdir / "uploads"),
+    )
+    log = open(workdir / "backend.log", "wb")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", str(BACKEND_DIR),
+         "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.02)
+    raise RuntimeError(f"API did not become healthy within {timeout:.0f}s")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def benchmark(args: argparse.Namespace) -> dict:
+    configs = fake_configs(args)
+    fakes = start_fakes(configs["ocr"], configs["gemini"])
+    ocr, gemini = fakes
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "levels": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="sof-bench-") as tmp:
+        workdir = Path(tmp)
+        launched = time.perf_counter()
+        backend = start_backend(args, workdir, ocr.url, gemini.url)
+        sampler = RSSSampler(backend.pid)
+        limits = httpx.Limits(max_connections=max(args.concurrency) * 2 + 10)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60, limits=limits) as client:
+                await wait_until_healthy(client)
+                report["startup_seconds"] = round(time.perf_counter() - launched, 3)
+                sampler.start()
+                for concurrency in args.concurrency:
+                    sampler.reset_peak()
+                    run = LoadRun(client, args)
+                    wall = await run.run(concurrency, args.jobs)
+                    report["levels"].append({
+                        "concurrency": concurrency,
+                        "jobs": args.jobs,
+                        "completed": run.completed,
+                        "failed": run.failed,
+                        "wall_seconds": round(wall, 3),
+                        "jobs_per_minute": round(run.completed / wall * 60, 2) if wall else 0.0,
+                        "latency_seconds": {name: percentiles(samples) for name, samples in run.latencies.items()},
+                        "errors": run.errors,
+                        "peak_rss_bytes": max(sampler.peak, sampler.tree_rss()),
+                    })
+                    print(f"concurrency {concurrency}: {run.completed}/{args.jobs} jobs in {wall:.1f}s", file=sys.stderr)
+                report["api_peak_rss_bytes"] = sampler.process_peak()
+                report["startup"] = (await client.get("/api/health")).json().get("startup")
+        finally:
+            sampler.stop()
+            backend.terminate()
+            try:
+                backend.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                backend.kill()
+            for fake in fakes:
+                fake.stop()
+
+    report["peak_rss_bytes"] = max([level["peak_rss_bytes"] for level in report["levels"]] or [0])
+    report["fakes"] = {"ocr": ocr.stats, "gemini": gemini.stats}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API offline against fake Azure OCR and Gemini")
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")], default=[1, 4],
+                        help="comma-separated numbers of concurrent clients, one run each (default 1,4)")
+    parser.add_argument("--jobs", type=int, default=10, help="jobs per concurrency level (default 10)")
+    parser.add_argument("--files-per-job", type=int, default=1)
+    parser.add_argument("--image-width", type=int, default=1240)
+    parser.add_argument("--image-height", type=int, default=1754)
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between result polls")
+    parser.add_argument("--job-timeout", type=float, default=300.0)
+    parser.add_argument("--export-format", default="csv", choices=["csv", "json", "ndjson"])
+    parser.add_argument("--workers", type=int, default=2, help="EMBEDDED_WORKERS of the API under test")
+    parser.add_argument("--local-parser", action="store_true",
+                        help="let the local SoF parser handle the fake OCR text (default: every page goes to Gemini)")
+    parser.add_argument("--port", type=int, default=8765, help="port for the API under test")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    add_fake_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(benchmark(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from metrics import CACHE_LOOKUPS_TOTAL
+
+
+class PartialResult(Exception):
+    """Raised by a compute function to return a value without caching it"""
+
+    def __init__(self, value: Any):
+        super().__init__("partial result")
+        self.value = value
+
+
+class _LRULayer:
+    """One cache layer: an in-memory LRU in front of a directory of JSON files.
+
+    Both tiers are bounded by bytes (the size of the serialized value) and
+    evict least-recently-used entries first.
+    """
+
+    def __init__(self, directory: Path, max_memory_bytes: int, max_disk_bytes: int):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._memory_bytes = 0
+
+        # key -> size on disk, oldest access first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _remember(self, key: str, value: Any, size: int):
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[1]
+        if size > self.max_memory_bytes:
+            return
+        self._memory[key] = (value, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def get(self, key: str) -> Optional[Any]:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key][0]
+
+        if key not in self._disk:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            value = json.loads(raw)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._disk_bytes -= self._disk.pop(key, 0)
+            return None
+
+        self._disk.move_to_end(key)
+        self._remember(key, value, len(raw))
+        return value
+
+    def put(self, key: str, value: Any):
+        raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        self._remember(key, value, len(raw))
+
+        if len(raw) > self.max_disk_bytes:
+            return
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(raw)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Cache write failed for {path}: {str(e)}")
+            return
+
+        self._disk_bytes -= self._disk.pop(key, 0)
+        self._disk[key] = len(raw)
+        self._disk_bytes += len(raw)
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            evicted_key, evicted_size = self._disk.popitem(last=False)
+            self._disk_bytes -= evicted_size
+            try:
+                os.unlink(self._path(evicted_key))
+            except OSError:
+                pass
+
+
+class ContentCache:
+    """Content-addressed cache for extracted text and extracted event rows.
+
+    Each layer ("text", "rows") is an independent bounded LRU persisted under
+    ``directory/<layer>/``. ``get_or_compute`` also de-duplicates concurrent
+    requests for the same key so identical in-flight uploads share one piece
+    of work.
+    """
+
+    LAYERS = ("text", "rows")
+
+    def __init__(self, directory: Path, max_memory_bytes: int, max_disk_bytes: int):
+        self.layers: Dict[str, _LRULayer] = {
+            name: _LRULayer(Path(directory) / name, max_memory_bytes, max_disk_bytes)
+            for name in self.LAYERS
+        }
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, layer: str, key: str) -> Optional[Any]:
+        return self.layers[layer].get(key)
+
+    def put(self, layer: str, key: str, value: Any):
+        self.layers[layer].put(key, value)
+
+    async def get_or_compute(self, layer: str, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value, joining an in-flight computation or starting one.
+
+        Empty results, and values raised as PartialResult, are returned but
+        not stored, so transient failures are retried on the next upload. If
+        the caller computing the value is cancelled, a waiting caller computes
+        it instead.
+        """
+        value = self.get(layer, key)
+        if value is not None:
+            self.hits += 1
+            CACHE_LOOKUPS_TOTAL.inc(layer=layer, result="hit")
+            return value
+
+        inflight_key = (layer, key)
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            self.hits += 1
+            CACHE_LOOKUPS_TOTAL.inc(layer=layer, result="joined")
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The owner's job was cancelled (lease lost, worker stopping), not ours: take over
+                if pending.cancelled():
+                    return await self.get_or_compute(layer, key, compute)
+                raise
+
+        self.misses += 1
+        CACHE_LOOKUPS_TOTAL.inc(layer=layer, result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            value = await compute()
+            if value:
+                self.put(layer, key, value)
+            future.set_result(value)
+            return value
+        except PartialResult as partial:
+            future.set_result(partial.value)
+            return partial.value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[inflight_key]
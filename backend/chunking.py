@@ -0,0 +1,79 @@
+from collections import Counter
+from typing import List, Sequence, Tuple
+
+
+def _split_long_page(page: str, max_chars: int) -> List[str]:
+    """Split a page that is larger than max_chars on line boundaries"""
+    parts, current, size = [], [], 0
+    for line in page.splitlines(keepends=True):
+        if current and size + len(line) > max_chars:
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def chunk_pages(pages: Sequence[str], max_chars: int, overlap_lines: int = 3) -> List[str]:
+    """Group consecutive pages into chunks of at most ``max_chars`` characters.
+
+    Chunks only break on page boundaries (pages that are too large on their
+    own are split on line boundaries). Every chunk after the first starts
+    with the last ``overlap_lines`` lines of the previous chunk, so an event
+    spanning a page break is seen whole by at least one chunk.
+    """
+    units = []
+    for page in pages:
+        if not page.strip():
+            continue
+        units.extend(_split_long_page(page, max_chars) if len(page) > max_chars else [page])
+
+    chunks, current, size = [], [], 0
+    for unit in units:
+        if current and size + len(unit) > max_chars:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(unit)
+        size += len(unit)
+    if current:
+        chunks.append("".join(current))
+
+    if overlap_lines <= 0:
+        return chunks
+
+    overlapped = chunks[:1]
+    for previous, chunk in zip(chunks, chunks[1:]):
+        tail = previous.splitlines(keepends=True)[-overlap_lines:]
+        overlapped.append("".join(tail) + chunk)
+    return overlapped
+
+
+def _event_key(row: dict) -> Tuple[str, str]:
+    return (str(row.get("start_time") or "").strip(), str(row.get("end_time") or "").strip())
+
+
+def merge_chunk_rows(chunk_rows: Sequence[List[dict]], overlap_lines: int = 3) -> List[dict]:
+    """Concatenate per-chunk rows in order, dropping the second reading of the overlap lines.
+
+    A chunk starts with the last ``overlap_lines`` lines of the one before
+    it, which hold at most that many events: only the first
+    ``overlap_lines`` rows of a chunk can be copies, and only of the last
+    ``overlap_lines`` rows of the previous chunk. The model names and
+    describes an event differently from one chunk to the next, so a copy is
+    recognised by its start and end time; each earlier row cancels at most
+    one copy, and rows without a start time are always kept. Pass an empty
+    list for a chunk that failed so its neighbours are not compared. Rows
+    inside one chunk are kept as the model returned them.
+    """
+    merged, tail = [], Counter()
+    for rows in chunk_rows:
+        for position, row in enumerate(rows):
+            key = _event_key(row)
+            if position < overlap_lines and key[0] and tail[key]:
+                tail[key] -= 1
+                continue
+            merged.append(row)
+        tail = Counter(_event_key(row) for row in rows[-overlap_lines:]) if overlap_lines > 0 else Counter()
+    return merged
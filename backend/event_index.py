@@ -0,0 +1,187 @@
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from event_schema import FIELDS, EventRecord
+from job_store import _Transaction, decode_cursor, encode_cursor
+from laytime import parse_timestamp
+
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS event_index (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT NOT NULL REFERENCES jobs(job_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    start_at TEXT NOT NULL DEFAULT '',
+    event TEXT,
+    day TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    duration TEXT,
+    ship_cargo TEXT,
+    layoff_time TEXT,
+    description TEXT,
+    filename TEXT,
+    duration_minutes INTEGER,
+    layoff_minutes INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_event_index_job_id ON event_index(job_id);
+CREATE INDEX IF NOT EXISTS idx_event_index_start_at_id ON event_index(start_at, id);
+
+CREATE TABLE IF NOT EXISTS event_index_jobs (
+    job_id TEXT PRIMARY KEY REFERENCES jobs(job_id) ON DELETE CASCADE,
+    indexed_at TEXT NOT NULL
+);
+"""
+
+# Full-text index over the text fields, kept in step with event_index by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS event_index_fts USING fts5(
+    event, description, ship_cargo,
+    content='event_index', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS event_index_ai AFTER INSERT ON event_index BEGIN
+    INSERT INTO event_index_fts (rowid, event, description, ship_cargo)
+    VALUES (new.id, new.event, new.description, new.ship_cargo);
+END;
+CREATE TRIGGER IF NOT EXISTS event_index_ad AFTER DELETE ON event_index BEGIN
+    INSERT INTO event_index_fts (event_index_fts, rowid, event, description, ship_cargo)
+    VALUES ('delete', old.id, old.event, old.description, old.ship_cargo);
+END;
+"""
+
+TEXT_FIELDS = ("event", "description", "ship_cargo")
+
+INDEX_COLUMNS = ("job_id", "position", "start_at") + FIELDS
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class EventIndex:
+    """Search index over the events of completed jobs, in the job database.
+
+    Rows are written when a job's results are published (and rewritten when
+    they are edited), so searches never read result files. Text search uses
+    SQLite FTS5 over ``event``, ``description`` and ``ship_cargo``; without
+    FTS5 it falls back to substring matching. Rows go with their job: they
+    reference the jobs table and are deleted with it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(INDEX_SCHEMA)
+        try:
+            conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+            print("Warning: SQLite has no FTS5. Event search falls back to substring matching.")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def index_job(self, job_id: str, records: Sequence[EventRecord]):
+        """Replace the indexed events of a job"""
+        rows = []
+        for position, record in enumerate(records):
+            start = parse_timestamp(record.start_time)
+            rows.append((job_id, position, start.isoformat() if start else "", *record))
+        placeholders = ", ".join("?" for _ in INDEX_COLUMNS)
+        with _Transaction(self._connect()) as conn:
+            conn.execute("DELETE FROM event_index WHERE job_id = ?", (job_id,))
+            conn.executemany(f"INSERT INTO event_index ({', '.join(INDEX_COLUMNS)}) VALUES ({placeholders})", rows)
+            conn.execute("INSERT OR REPLACE INTO event_index_jobs (job_id, indexed_at) VALUES (?, ?)",
+                         (job_id, datetime.now().isoformat()))
+
+    def jobs_missing_index(self, limit: int = 100) -> List[str]:
+        """IDs of completed jobs whose events have not been indexed yet (e.g. from before the index)"""
+        rows = self._connect().execute(
+            "SELECT job_id FROM jobs WHERE status = 'completed' "
+            "AND NOT EXISTS (SELECT 1 FROM event_index_jobs i WHERE i.job_id = jobs.job_id) LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def _match(self, text: str, column: Optional[str]) -> str:
+        """FTS5 query matching every word of ``text`` (as a prefix), optionally in one column"""
+        scope = f"{column} : " if column else ""
+        return " ".join(f'{scope}"{word}"*' for word in re.findall(r"\w+", text))
+
+    def search(self, limit: int = 50, cursor: Optional[str] = None, text: Optional[str] = None,
+               fields: Optional[dict] = None, start_from: Optional[str] = None, start_to: Optional[str] = None,
+               filename: Optional[str] = None, job_id: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """One page of matching events, latest start time first, and the cursor for the next page.
+
+        ``text`` is matched against all text fields and ``fields`` maps a text
+        field to words it must contain; every word has to match, as a prefix.
+        ``start_from``/``start_to`` bound the parsed start time (ISO strings).
+        """
+        searches = [(None, text)] if text else []
+        searches += [(column, value) for column, value in (fields or {}).items() if value]
+        clauses, params = [], []
+        if self.fts:
+            query = " ".join(filter(None, (self._match(value, column) for column, value in searches)))
+            if query:
+                clauses.append("e.id IN (SELECT rowid FROM event_index_fts WHERE event_index_fts MATCH ?)")
+                params.append(query)
+        else:
+            for column, value in searches:
+                for word in re.findall(r"\w+", value):
+                    columns = [column] if column else TEXT_FIELDS
+                    clauses.append("(" + " OR ".join(f"e.{name} LIKE ? ESCAPE '\\'" for name in columns) + ")")
+                    params.extend([f"%{_escape_like(word)}%"] * len(columns))
+
+        # Keyset pagination on (start_at, id), like the jobs list
+        if cursor:
+            start_at, row_id = decode_cursor(cursor)
+            if not row_id.isdigit():
+                raise ValueError("Invalid cursor")
+            clauses.append("(e.start_at, e.id) < (?, ?)")
+            params.extend([start_at, int(row_id)])
+        if start_from:
+            clauses.append("e.start_at >= ?")
+            params.append(start_from)
+        if start_to:
+            clauses.append("e.start_at != '' AND e.start_at <= ?")
+            params.append(start_to)
+        if filename:
+            clauses.append("e.filename LIKE ? ESCAPE '\\'")
+            params.append(f"%{_escape_like(filename)}%")
+        if job_id:
+            clauses.append("e.job_id = ?")
+            params.append(job_id)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT e.id, {', '.join(f'e.{name}' for name in INDEX_COLUMNS)} FROM event_index e {where} "
+            "ORDER BY e.start_at DESC, e.id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+
+        events = [{name: row[name] for name in ("job_id", "position") + FIELDS} for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last["start_at"], str(last["id"]))
+        return events, next_cursor
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,111 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+# Canonical event fields, in export column order. The *_minutes fields are
+# numeric and filled in by laytime.apply_durations.
+FIELDS = ('event', 'day', 'start_time', 'end_time', 'duration', 'ship_cargo', 'layoff_time', 'description', 'filename',
+          'duration_minutes', 'layoff_minutes')
+
+# Accepted input names for each field, in order of preference. Covers the
+# backend names, the frontend names and the column titles of older exports.
+FIELD_ALIASES = {
+    'event': ('event', 'Event', 'name'),
+    'day': ('day', 'Day', 'date'),
+    'start_time': ('start_time', 'Start Time', 'start_time_iso', 'start'),
+    'end_time': ('end_time', 'End Time', 'end_time_iso', 'end'),
+    'duration': ('duration', 'Duration'),
+    'ship_cargo': ('ship_cargo', 'Ship/Cargo', 'ShipCargo', 'shipCargo'),
+    'layoff_time': ('layoff_time', 'Layoff Time', 'laytime', 'Laytime', 'layoff'),
+    'description': ('description', 'Description'),
+    'filename': ('filename', 'Filename', 'FileName'),
+    'duration_minutes': ('duration_minutes', 'Duration Minutes', 'durationMinutes'),
+    'layoff_minutes': ('layoff_minutes', 'Layoff Minutes', 'layoffMinutes'),
+}
+
+FIELD_DEFAULTS = {
+    'ship_cargo': 'N/A',
+    'layoff_time': 'N/A',
+    'duration_minutes': None,
+    'layoff_minutes': None,
+}
+
+# Frontend view names that differ from the canonical ones
+FRONTEND_NAMES = {
+    'start_time': 'start',
+    'end_time': 'end',
+}
+
+
+class EventRecord:
+    """One normalized event row; iterating yields values in FIELDS order"""
+
+    __slots__ = FIELDS
+
+    def __init__(self, *values):
+        for name, value in zip(FIELDS, values):
+            setattr(self, name, value)
+
+    def __iter__(self) -> Iterator:
+        for name in FIELDS:
+            yield getattr(self, name)
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in FIELDS}
+
+    def as_frontend(self) -> dict:
+        return {FRONTEND_NAMES.get(name, name): getattr(self, name) for name in FIELDS}
+
+
+# Per field: the aliases present in a row shape, and the default value
+_Plan = Tuple[Tuple[Tuple[str, ...], str], ...]
+
+
+class EventNormalizer:
+    """Maps raw rows to EventRecords.
+
+    Alias resolution is done once per distinct row shape (the tuple of its
+    keys), so a batch of rows produced by the same source costs one lookup
+    per row instead of a fallback chain per field.
+    """
+
+    def __init__(self):
+        self._plans: Dict[Tuple[str, ...], _Plan] = {}
+
+    def _plan(self, shape: Tuple[str, ...]) -> _Plan:
+        keys = set(shape)
+        plan = tuple(
+            (tuple(alias for alias in FIELD_ALIASES[name] if alias in keys), FIELD_DEFAULTS.get(name, ''))
+            for name in FIELDS
+        )
+        self._plans[shape] = plan
+        return plan
+
+    def normalize(self, row: dict) -> EventRecord:
+        shape = tuple(row)
+        plan = self._plans.get(shape) or self._plan(shape)
+        values = []
+        for aliases, default in plan:
+            value = None
+            # Missing and empty values fall through to the next alias; 0 is a value
+            for alias in aliases:
+                value = row[alias]
+                if value is not None and value != "":
+                    break
+            values.append(value if value is not None and value != "" else default)
+        return EventRecord(*values)
+
+    def iter_records(self, rows: Iterable[dict]) -> Iterator[EventRecord]:
+        normalize = self.normalize
+        for row in rows:
+            if isinstance(row, dict):
+                yield normalize(row)
+
+
+def normalize_events(rows: Iterable[dict]) -> List[EventRecord]:
+    """Normalize a batch of rows with a shared alias plan cache"""
+    return list(EventNormalizer().iter_records(rows))
+
+
+def iter_events(rows: Iterable[dict]) -> Iterator[EventRecord]:
+    """Lazily normalize rows; used by streaming exports"""
+    return EventNormalizer().iter_records(rows)
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, List, Sequence
+
+
+# Rows are buffered up to this many characters before a chunk is yielded
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def iter_csv(rows: Iterable[Sequence], header: List[str]) -> Iterator[bytes]:
+    """Yield a CSV document (header first) in chunks of roughly EXPORT_CHUNK_SIZE.
+
+    Rows are sequences of values in header order (e.g. EventRecords).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL, escapechar='\\')
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(rows: Iterable[dict]) -> Iterator[bytes]:
+    """Yield one JSON object per line"""
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, ensure_ascii=False)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= EXPORT_CHUNK_SIZE:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+            size = 0
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def iter_json_table(rows: Iterable[dict]) -> Iterator[bytes]:
+    """Yield ``{"table": [...]}`` without building the whole document in memory"""
+    yield b'{"table": ['
+    first = True
+    for chunk in iter_ndjson(rows):
+        lines = chunk.rstrip(b'\n').split(b'\n')
+        if not first:
+            yield b', '
+        yield b', '.join(lines)
+        first = False
+    yield b']}'
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip-compress a byte stream incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """True when an Accept-Encoding header allows gzip (and does not set q=0)"""
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
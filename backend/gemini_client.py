@@ -0,0 +1,152 @@
+import asyncio
+import random
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+import httpx
+
+from metrics import GEMINI_REQUESTS_TOTAL, GEMINI_TOKENS_TOTAL, RETRIES_TOTAL, STAGE_SECONDS
+from resilience import CallSlot, ProviderGuard, parse_retry_after
+
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class GeminiError(Exception):
+    """Raised when a Gemini request fails after all retries"""
+
+
+class GeminiClient:
+    """Shared keep-alive client for the Gemini generateContent API.
+
+    One ``httpx.AsyncClient`` (and therefore one connection pool) is reused
+    for every call, so requests run natively on the event loop without a
+    TLS handshake per file. Transient failures (429, 5xx, timeouts and
+    connection errors) are retried with full-jitter exponential backoff.
+    With a ``guard`` every request also goes through the shared rate limit,
+    adaptive concurrency limit and circuit breaker, and 429s wait for quota
+    (up to ``max_throttle_wait`` seconds) without using up retries.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str = "https://generativelanguage.googleapis.com/v1beta",
+        model: str = "gemini-1.5-flash",
+        timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        guard: Optional[ProviderGuard] = None,
+        max_throttle_wait: float = 300.0,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.guard = guard
+        self.max_throttle_wait = max_throttle_wait
+        self.retries = 0
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool is bound to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                headers={"Content-Type": "application/json"},
+            )
+        return self._client
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def generate(self, prompt: str) -> str:
+        """Send a single-turn prompt and return the generated text"""
+        with STAGE_SECONDS.time(stage="gemini"):
+            return await self._generate(prompt)
+
+    async def _generate(self, prompt: str) -> str:
+        payload = {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }]
+        }
+        url = f"/models/{self.model}:generateContent"
+        headers = {"x-goog-api-key": self.api_key or ""}
+
+        started = time.monotonic()
+        attempt = throttled = 0
+        while True:
+            retry_after = None
+            was_throttled = False
+            try:
+                async with (self.guard.slot() if self.guard else nullcontext(CallSlot())) as call:
+                    response = await self.client.post(url, json=payload, headers=headers)
+                    if response.status_code == 429:
+                        call.throttled(parse_retry_after(response.headers.get("Retry-After")))
+                    elif response.status_code in RETRYABLE_STATUS_CODES:
+                        call.failed()
+                    elif response.is_error:
+                        call.rejected()
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    if response.is_error:
+                        GEMINI_REQUESTS_TOTAL.inc(outcome=f"http_{response.status_code}")
+                    response.raise_for_status()
+                    result = response.json()
+                    GEMINI_REQUESTS_TOTAL.inc(outcome="ok")
+                    usage = result.get("usageMetadata") or {}
+                    GEMINI_TOKENS_TOTAL.inc(usage.get("promptTokenCount", 0), kind="prompt")
+                    GEMINI_TOKENS_TOTAL.inc(usage.get("candidatesTokenCount", 0), kind="output")
+                    return result['candidates'][0]['content']['parts'][0]['text']
+                GEMINI_REQUESTS_TOTAL.inc(outcome=f"http_{response.status_code}")
+                retry_after = response.headers.get("Retry-After")
+                was_throttled = response.status_code == 429
+                error = GeminiError(f"Gemini returned HTTP {response.status_code}")
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                GEMINI_REQUESTS_TOTAL.inc(outcome="timeout" if isinstance(e, httpx.TimeoutException) else "transport_error")
+                error = GeminiError(f"Gemini request failed: {str(e)}")
+
+            if was_throttled and self.guard and time.monotonic() - started < self.max_throttle_wait:
+                # Over quota: wait for it rather than failing the document
+                delay = self._backoff(min(throttled, self.max_retries), retry_after)
+                throttled += 1
+                print(f"{error}; waiting {delay:.2f}s for quota")
+            else:
+                if attempt == self.max_retries:
+                    raise error
+                delay = self._backoff(attempt, retry_after)
+                attempt += 1
+                print(f"{error}; retrying in {delay:.2f}s (attempt {attempt}/{self.max_retries})")
+            self.retries += 1
+            RETRIES_TOTAL.inc(service="gemini")
+            await asyncio.sleep(delay)
+
+    async def warm_up(self):
+        """Open a pooled connection ahead of the first request"""
+        # Reading the model's metadata uses no generation quota; any answer leaves the connection in the pool
+        await self.client.get(f"/models/{self.model}", headers={"x-goog-api-key": self.api_key or ""})
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
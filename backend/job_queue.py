@@ -0,0 +1,166 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from job_store import _Transaction
+
+
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_queue (
+    job_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_queue_state_enqueued_at ON job_queue (state, enqueued_at);
+"""
+
+
+class JobQueue:
+    """Durable job queue in SQLite with leases, shared by the API and worker processes.
+
+    A worker claims the oldest queued job and holds it under a lease that it
+    renews with ``heartbeat``. Leases that run out (the worker died or hung)
+    are handed back to the queue on the next claim, until a job has been
+    attempted ``max_attempts`` times. A job that is picked up again resumes
+    from its results log (see results_log.py). Finished entries are pruned
+    by the compactor (see retention.py).
+    """
+
+    def __init__(self, path: Path, lease_seconds: float = 60.0, max_attempts: int = 3):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._connect().executescript(QUEUE_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self) -> _Transaction:
+        return _Transaction(self._connect())
+
+    def enqueue(self, job_id: str, payload: dict):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_queue (job_id, payload, state, attempts, enqueued_at, updated_at) "
+                "VALUES (?, ?, 'queued', 0, ?, ?)",
+                (job_id, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+
+    def claim(self, worker_id: str) -> Tuple[Optional[dict], List[str]]:
+        """Lease the oldest queued job to a worker.
+
+        Returns ``(job, exhausted)``: the claimed job as ``{"job_id",
+        "payload", "attempts"}`` (or None when the queue is empty) and the
+        IDs of jobs whose lease expired after their last allowed attempt.
+        Those are marked failed in the queue; the caller reports them.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            expired = conn.execute(
+                "SELECT job_id, attempts FROM job_queue WHERE state = 'leased' AND lease_expires_at < ?", (now,)
+            ).fetchall()
+            exhausted = [row["job_id"] for row in expired if row["attempts"] >= self.max_attempts]
+            for row in expired:
+                state = "failed" if row["attempts"] >= self.max_attempts else "queued"
+                conn.execute(
+                    "UPDATE job_queue SET state = ?, worker_id = NULL, lease_expires_at = NULL, updated_at = ? "
+                    "WHERE job_id = ?",
+                    (state, now, row["job_id"]),
+                )
+            if expired:
+                print(f"Re-queued {len(expired) - len(exhausted)} jobs with expired leases, "
+                      f"gave up on {len(exhausted)}")
+
+            row = conn.execute(
+                "SELECT job_id, payload, attempts FROM job_queue WHERE state = 'queued' "
+                "ORDER BY enqueued_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None, exhausted
+            conn.execute(
+                "UPDATE job_queue SET state = 'leased', worker_id = ?, lease_expires_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                (worker_id, now + self.lease_seconds, now, row["job_id"]),
+            )
+        job = {"job_id": row["job_id"], "payload": json.loads(row["payload"]), "attempts": row["attempts"] + 1}
+        return job, exhausted
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend a lease; False means the worker no longer holds it and must stop"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE job_queue SET lease_expires_at = ?, updated_at = ? "
+                "WHERE job_id = ? AND worker_id = ? AND state = 'leased'",
+                (now + self.lease_seconds, now, job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, job_id: str, worker_id: str):
+        """Give a leased job back to the queue without counting the attempt (worker shutting down)"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE job_queue SET state = 'queued', worker_id = NULL, lease_expires_at = NULL, "
+                "attempts = MAX(attempts - 1, 0), updated_at = ? WHERE job_id = ? AND worker_id = ?",
+                (time.time(), job_id, worker_id),
+            )
+
+    def requeue(self, job_id: str, worker_id: str):
+        """Give a leased job whose run broke off back to the queue; the attempt counts"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE job_queue SET state = 'queued', worker_id = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE job_id = ? AND worker_id = ?",
+                (time.time(), job_id, worker_id),
+            )
+
+    def finish(self, job_id: str, worker_id: str, state: str = "done"):
+        """Mark a leased job done (or failed)"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE job_queue SET state = ?, worker_id = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE job_id = ? AND worker_id = ?",
+                (state, time.time(), job_id, worker_id),
+            )
+
+    def delete(self, job_id: str):
+        """Remove a job from the queue whatever its state (the job itself was deleted)"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM job_queue WHERE job_id = ?", (job_id,))
+
+    def prune(self, before: float) -> int:
+        """Remove done and failed entries last updated before ``before`` (epoch seconds); returns how many"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM job_queue WHERE state IN ('done', 'failed') AND updated_at < ?", (before,)
+            )
+        return cursor.rowcount
+
+    def depth(self) -> Dict[str, int]:
+        """Number of jobs per queue state"""
+        rows = self._connect().execute("SELECT state, COUNT(*) AS jobs FROM job_queue GROUP BY state").fetchall()
+        return {row["state"]: row["jobs"] for row in rows}
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,435 @@
+import base64
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class JobStore(ABC):
+    """Interface for job status persistence.
+
+    Implementations must make ``save`` atomic: a reader never sees a job
+    half-way through an update.
+    """
+
+    @abstractmethod
+    def save(self, job_id: str, status: str, progress: int = 0, message: str = "",
+             total_files: Optional[int] = None, filenames: Optional[list] = None,
+             files_done: Optional[int] = None):
+        ...
+
+    @abstractmethod
+    def load(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def list_jobs(self, limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None,
+                  created_from: Optional[str] = None, created_to: Optional[str] = None,
+                  filename: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Return one page of job summaries (newest first) and the cursor for the next page"""
+
+    @abstractmethod
+    def summary_counts(self) -> dict:
+        ...
+
+    @abstractmethod
+    def jobs_updated_since(self, since: str, limit: int = 500) -> List[dict]:
+        """Summaries of jobs updated after ``since`` (ISO timestamp), oldest update first"""
+
+    @abstractmethod
+    def save_artifacts(self, job_id: str, manifest: Dict[str, dict]) -> int:
+        """Record a new version of a job's result artifacts; returns the version number"""
+
+    @abstractmethod
+    def load_artifact(self, job_id: str, kind: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def jobs_missing_artifacts(self) -> List[str]:
+        """IDs of completed jobs that have no artifacts recorded yet"""
+
+    @abstractmethod
+    def jobs_updated_between(self, after: str, before: str, statuses: Tuple[str, ...],
+                             limit: int = 500) -> List[dict]:
+        """Summaries of jobs in ``statuses`` last updated in (after, before], oldest first"""
+
+    @abstractmethod
+    def delete_job(self, job_id: str):
+        """Remove a job with its artifact records"""
+
+    @abstractmethod
+    def delete_artifacts(self, job_id: str, kinds: List[str]):
+        ...
+
+    @abstractmethod
+    def get_meta(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set_meta(self, key: str, value: str):
+        ...
+
+    @abstractmethod
+    def migrate_json_jobs(self, jobs_dir: Path) -> int:
+        """Import legacy ``jobs/<id>.json`` files once; returns the number imported"""
+
+    def close(self):
+        pass
+
+
+def encode_cursor(created_at: str, job_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at}|{job_id}".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        created_at, job_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return created_at, job_id
+
+
+def normalize_bound(value: str, upper: bool = False) -> str:
+    """An ISO date or date-time query bound in the form timestamps are stored in; raises ValueError.
+
+    Stored timestamps are naive local ISO strings compared as text, so the
+    bound is parsed (any ISO form, e.g. "2024-01-31 12:00" or "20240131")
+    and re-serialized, with a UTC offset converted to local time. A bare
+    date as an ``upper`` bound includes the whole day.
+    """
+    parsed = datetime.fromisoformat(value.strip())
+    if parsed.tzinfo:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    if upper:
+        try:
+            date.fromisoformat(value.strip())
+            parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+        except ValueError:
+            pass
+    return parsed.isoformat()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    total_files INTEGER NOT NULL DEFAULT 1,
+    filenames TEXT NOT NULL DEFAULT '[]',
+    files_done INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created_at ON jobs(status, created_at, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs(updated_at);
+
+CREATE TABLE IF NOT EXISTS job_filenames (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT NOT NULL REFERENCES jobs(job_id) ON DELETE CASCADE,
+    filename TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_filenames_job_id ON job_filenames(job_id);
+
+CREATE TABLE IF NOT EXISTS job_artifacts (
+    job_id TEXT NOT NULL REFERENCES jobs(job_id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    etag TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (job_id, kind)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Trigram index over uploaded filenames for the substring filter of list_jobs, kept in step by triggers
+FILENAME_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS job_filenames_fts USING fts5(
+    filename, content='job_filenames', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS job_filenames_ai AFTER INSERT ON job_filenames BEGIN
+    INSERT INTO job_filenames_fts (rowid, filename) VALUES (new.id, new.filename);
+END;
+CREATE TRIGGER IF NOT EXISTS job_filenames_ad AFTER DELETE ON job_filenames BEGIN
+    INSERT INTO job_filenames_fts (job_filenames_fts, rowid, filename) VALUES ('delete', old.id, old.filename);
+END;
+"""
+
+SUMMARY_COLUMNS = "job_id, status, progress, message, created_at, updated_at, total_files, filenames, files_done"
+
+
+class SQLiteJobStore(JobStore):
+    """Job store backed by a single SQLite database in WAL mode.
+
+    Each thread gets its own connection; WAL lets readers proceed while a
+    writer commits, and the database can be shared by several processes.
+    Results are not stored here: the JSON artifact is their only copy.
+    Filenames are also kept one per row in ``job_filenames`` with a trigram
+    FTS5 index, so the filename filter does not scan the jobs; without the
+    trigram tokenizer (SQLite < 3.34) it falls back to a LIKE scan of that
+    table.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        try:
+            conn.executescript(FILENAME_FTS_SCHEMA)
+            self.filename_fts = True
+        except sqlite3.OperationalError:
+            self.filename_fts = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._connect())
+
+    @staticmethod
+    def _summary(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["filenames"] = json.loads(job["filenames"] or "[]")
+        return job
+
+    def save(self, job_id: str, status: str, progress: int = 0, message: str = "",
+             total_files: Optional[int] = None, filenames: Optional[list] = None,
+             files_done: Optional[int] = None):
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            # created_at is kept from the first save; total_files/filenames/files_done only change when given
+            conn.execute(
+                """
+                INSERT INTO jobs (job_id, status, progress, message, created_at, updated_at, total_files, filenames,
+                                  files_done)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(job_id) DO UPDATE SET
+                    status = excluded.status,
+                    progress = excluded.progress,
+                    message = excluded.message,
+                    updated_at = excluded.updated_at,
+                    total_files = COALESCE(?, jobs.total_files),
+                    filenames = COALESCE(?, jobs.filenames),
+                    files_done = COALESCE(?, jobs.files_done)
+                """,
+                (
+                    job_id, status, progress, message, now, now,
+                    total_files if total_files is not None else 1,
+                    json.dumps(filenames or [], ensure_ascii=False),
+                    files_done or 0,
+                    total_files,
+                    json.dumps(filenames, ensure_ascii=False) if filenames is not None else None,
+                    files_done,
+                ),
+            )
+            if filenames is not None:
+                self._save_filenames(conn, job_id, filenames)
+
+    @staticmethod
+    def _save_filenames(conn: sqlite3.Connection, job_id: str, filenames: list):
+        conn.execute("DELETE FROM job_filenames WHERE job_id = ?", (job_id,))
+        conn.executemany("INSERT INTO job_filenames (job_id, filename) VALUES (?, ?)",
+                         [(job_id, str(name)) for name in filenames])
+
+    def load(self, job_id: str) -> Optional[dict]:
+        row = self._connect().execute(f"SELECT {SUMMARY_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._summary(row) if row else None
+
+    def list_jobs(self, limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None,
+                  created_from: Optional[str] = None, created_to: Optional[str] = None,
+                  filename: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        # Keyset pagination on (created_at, job_id): every page is an index range scan
+        clauses, params = [], []
+        if cursor:
+            clauses.append("(created_at, job_id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if created_from:
+            clauses.append("created_at >= ?")
+            params.append(created_from)
+        if created_to:
+            clauses.append("created_at <= ?")
+            params.append(created_to)
+        if filename:
+            clause, param = self._filename_clause(filename)
+            clauses.append(clause)
+            params.append(param)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM jobs {where} ORDER BY created_at DESC, job_id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+
+        jobs = [self._summary(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = jobs[-1]
+            next_cursor = encode_cursor(last["created_at"], last["job_id"])
+        return jobs, next_cursor
+
+    def _filename_clause(self, filename: str) -> Tuple[str, str]:
+        """Clause and parameter selecting jobs with a filename containing ``filename`` (case-insensitive)"""
+        if self.filename_fts and len(filename) >= 3:
+            # A quoted phrase on a trigram index matches substrings from the index
+            return ("job_id IN (SELECT f.job_id FROM job_filenames f "
+                    "JOIN job_filenames_fts ON job_filenames_fts.rowid = f.id WHERE job_filenames_fts MATCH ?)",
+                    '"' + filename.replace('"', '""') + '"')
+        escaped = filename.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return "job_id IN (SELECT job_id FROM job_filenames WHERE filename LIKE ? ESCAPE '\\')", f"%{escaped}%"
+
+    def summary_counts(self) -> dict:
+        """Job and file totals per status, computed from the status index"""
+        rows = self._connect().execute(
+            "SELECT status, COUNT(*) AS jobs, COALESCE(SUM(total_files), 0) AS files FROM jobs GROUP BY status"
+        ).fetchall()
+        return {
+            "total_jobs": sum(row["jobs"] for row in rows),
+            "total_files": sum(row["files"] for row in rows),
+            "by_status": {row["status"]: row["jobs"] for row in rows},
+        }
+
+    def jobs_updated_since(self, since: str, limit: int = 500) -> List[dict]:
+        rows = self._connect().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM jobs WHERE updated_at > ? ORDER BY updated_at LIMIT ?", (since, limit)
+        ).fetchall()
+        return [self._summary(row) for row in rows]
+
+    def save_artifacts(self, job_id: str, manifest: Dict[str, dict]) -> int:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) AS version FROM job_artifacts WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            version = row["version"] + 1
+            conn.executemany(
+                "INSERT OR REPLACE INTO job_artifacts (job_id, kind, version, etag, size) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, kind, version, meta["etag"], meta["size"]) for kind, meta in manifest.items()],
+            )
+        return version
+
+    def load_artifact(self, job_id: str, kind: str) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT version, etag, size FROM job_artifacts WHERE job_id = ? AND kind = ?", (job_id, kind)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def jobs_missing_artifacts(self) -> List[str]:
+        rows = self._connect().execute(
+            "SELECT job_id FROM jobs WHERE status = 'completed' "
+            "AND NOT EXISTS (SELECT 1 FROM job_artifacts a WHERE a.job_id = jobs.job_id)"
+        ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def jobs_updated_between(self, after: str, before: str, statuses: Tuple[str, ...],
+                             limit: int = 500) -> List[dict]:
+        placeholders = ", ".join("?" for _ in statuses)
+        rows = self._connect().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM jobs WHERE updated_at > ? AND updated_at <= ? "
+            f"AND status IN ({placeholders}) ORDER BY updated_at LIMIT ?",
+            (after, before, *statuses, limit),
+        ).fetchall()
+        return [self._summary(row) for row in rows]
+
+    def delete_job(self, job_id: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def delete_artifacts(self, job_id: str, kinds: List[str]):
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM job_artifacts WHERE job_id = ? AND kind = ?",
+                             [(job_id, kind) for kind in kinds])
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def migrate_json_jobs(self, jobs_dir: Path) -> int:
+        """Import legacy ``jobs/<id>.json`` files once; returns the number imported"""
+        done = self._connect().execute("SELECT value FROM meta WHERE key = 'json_jobs_migrated'").fetchone()
+        if done or not Path(jobs_dir).is_dir():
+            return 0
+
+        imported = 0
+        with self._transaction() as conn:
+            for job_file in Path(jobs_dir).glob("*.json"):
+                try:
+                    with open(job_file, "r") as f:
+                        job = json.load(f)
+                except Exception:
+                    continue
+                created_at = job.get("created_at") or datetime.now().isoformat()
+                status, message = job.get("status", "failed"), job.get("message", "")
+                if status in ("queued", "processing"):
+                    # Nothing resumes jobs that were running in the old format
+                    status, message = "failed", "Processing error: job was interrupted"
+                cursor = conn.execute(
+                    """
+                    INSERT OR IGNORE INTO jobs (job_id, status, progress, message, created_at, updated_at, total_files, filenames)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        job.get("job_id") or job_file.stem, status,
+                        job.get("progress", 0), message, created_at, created_at,
+                        job.get("total_files", 1), json.dumps(job.get("filenames") or [], ensure_ascii=False),
+                    ),
+                )
+                if cursor.rowcount:
+                    self._save_filenames(conn, job.get("job_id") or job_file.stem, job.get("filenames") or [])
+                imported += cursor.rowcount
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_jobs_migrated', ?)",
+                         (datetime.now().isoformat(),))
+        return imported
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _Transaction:
+    """Context manager running a block inside BEGIN IMMEDIATE ... COMMIT"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+
+
+def create_job_store(backend: str, path: Path) -> JobStore:
+    """Build the job store selected by the JOB_STORE setting"""
+    if backend == "sqlite":
+        return SQLiteJobStore(path)
+    raise ValueError(f"Unknown job store backend: {backend}")
@@ -0,0 +1,181 @@
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from event_schema import EventRecord
+
+
+TIMESTAMP_FORMATS = ("%Y-%m-%d %H:%M", "%d/%m/%Y %H:%M", "%d.%m.%Y %H:%M", "%Y/%m/%d %H:%M")
+
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(d|day|days|h|hr|hrs|hour|hours|m|min|mins|minute|minutes)\b", re.I)
+_CLOCK_DURATION_RE = re.compile(r"^\s*(\d+):([0-5]\d)\s*$")
+_UNIT_MINUTES = {"d": 24 * 60, "h": 60, "m": 1}
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Parse an event start/end time ("YYYY-MM-DD HH:MM" and close variants); None if unusable"""
+    if not value or not isinstance(value, str):
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value)
+        return parsed.replace(tzinfo=None) if parsed.tzinfo else parsed
+    except ValueError:
+        pass
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_duration(value) -> Optional[int]:
+    """Minutes in a duration string such as "2d 4h 30m", "1 hour 15 mins" or "1:30"; None if there are none"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    if not value or not isinstance(value, str):
+        return None
+    clock = _CLOCK_DURATION_RE.match(value)
+    if clock:
+        return int(clock.group(1)) * 60 + int(clock.group(2))
+    parts = _DURATION_PART_RE.findall(value)
+    if not parts:
+        return None
+    return int(round(sum(float(amount) * _UNIT_MINUTES[unit[0].lower()] for amount, unit in parts)))
+
+
+def format_duration(minutes: int) -> str:
+    """Duration in the display format used for events ("2h 30m", "1d 4h 30m", "45m")"""
+    days, rest = divmod(max(0, int(minutes)), 24 * 60)
+    hours, mins = divmod(rest, 60)
+    if days:
+        return f"{days}d {hours}h {mins}m" if mins else f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {mins}m"
+    return f"{mins}m"
+
+
+def _minutes_between(start: Optional[datetime], end: Optional[datetime]) -> Optional[int]:
+    if not start or not end:
+        return None
+    if end < start:
+        # Time-only ranges that run past midnight
+        end += timedelta(days=1)
+    if end < start:
+        # Still before the start: a misread date, not a duration
+        return None
+    return int((end - start).total_seconds() // 60)
+
+
+def _non_negative(minutes: Optional[int]) -> Optional[int]:
+    return None if minutes is None else max(0, minutes)
+
+
+def _record_minutes(record: EventRecord, start: Optional[datetime], end: Optional[datetime]) -> Optional[int]:
+    minutes = _minutes_between(start, end)
+    if minutes is None:
+        minutes = parse_duration(record.duration)
+    return _non_negative(minutes)
+
+
+def apply_durations(records: Sequence[EventRecord]):
+    """Fill numeric minutes and display durations for a job's records in one columnar pass.
+
+    ``duration_minutes`` comes from start/end times when both parse (an end
+    up to a day before the start is taken to be on the next day), otherwise
+    from the existing duration string. ``layoff_minutes`` is parsed from
+    ``layoff_time``. Neither is ever negative. Display strings are rewritten
+    from the minutes.
+    """
+    starts = [parse_timestamp(record.start_time) for record in records]
+    ends = [parse_timestamp(record.end_time) for record in records]
+    durations = [_record_minutes(record, start, end) for record, start, end in zip(records, starts, ends)]
+    layoffs = [_non_negative(parse_duration(record.layoff_time)) for record in records]
+
+    for record, minutes, layoff in zip(records, durations, layoffs):
+        record.duration_minutes = minutes
+        record.layoff_minutes = layoff
+        if minutes is not None:
+            record.duration = format_duration(minutes)
+        if layoff is not None:
+            record.layoff_time = format_duration(layoff)
+
+
+def iter_with_durations(records: Iterable[EventRecord], batch_size: int = 1000) -> Iterator[EventRecord]:
+    """Streaming variant of apply_durations for exports; works on batches of records"""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            apply_durations(batch)
+            yield from batch
+            batch = []
+    apply_durations(batch)
+    yield from batch
+
+
+def _day_shares(start: Optional[datetime], minutes: int, fallback: str) -> List[tuple]:
+    """Split an event's minutes over the calendar days it covers"""
+    if start is None:
+        return [(fallback or "unknown", minutes)]
+    shares, current, remaining = [], start, minutes
+    while True:
+        midnight = datetime.combine(current.date() + timedelta(days=1), datetime.min.time())
+        part = min(remaining, int((midnight - current).total_seconds() // 60))
+        shares.append((current.date().isoformat(), part))
+        remaining -= part
+        if remaining <= 0:
+            return shares
+        current = midnight
+
+
+def _totals(events: int, duration: int, layoff: int) -> dict:
+    laytime = max(0, duration - layoff)
+    return {
+        "events": events,
+        "duration_minutes": duration,
+        "layoff_minutes": layoff,
+        "laytime_minutes": laytime,
+        "duration": format_duration(duration),
+        "layoff_time": format_duration(layoff),
+        "laytime": format_duration(laytime),
+    }
+
+
+def laytime_summary(records: Sequence[EventRecord]) -> dict:
+    """Totals of a job's event time per ship/cargo, per calendar day and overall.
+
+    Laytime is event duration minus layoff time. Records must have gone
+    through ``apply_durations``; events without a duration count towards
+    ``events`` only. Day totals split events that run past midnight and
+    share their layoff time out in proportion.
+    """
+    by_cargo = OrderedDict()
+    by_day = OrderedDict()
+    events = duration = layoff = 0
+    for record in records:
+        minutes = record.duration_minutes or 0
+        layoff_minutes = min(record.layoff_minutes or 0, minutes) if minutes else (record.layoff_minutes or 0)
+        events += 1
+        duration += minutes
+        layoff += layoff_minutes
+
+        cargo = by_cargo.setdefault(record.ship_cargo or "N/A", [0, 0, 0])
+        cargo[0] += 1
+        cargo[1] += minutes
+        cargo[2] += layoff_minutes
+
+        shares = _day_shares(parse_timestamp(record.start_time), minutes, record.day)
+        for index, (day, part) in enumerate(shares):
+            totals = by_day.setdefault(day, [0, 0, 0])
+            totals[0] += 1 if index == 0 else 0
+            totals[1] += part
+            totals[2] += round(layoff_minutes * part / minutes) if minutes else layoff_minutes
+
+    return {
+        "total": _totals(events, duration, layoff),
+        "by_ship_cargo": [dict(ship_cargo=key, **_totals(*values)) for key, values in by_cargo.items()],
+        "by_day": [dict(day=key, **_totals(*values)) for key, values in sorted(by_day.items())],
+    }
@@ -0,0 +1,26 @@
+import json
+import os
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+
+# "text" (key=value) or "json" (one object per line)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+
+# Set while a job is processed; tasks started inside the job inherit it
+current_job_id: ContextVar[Optional[str]] = ContextVar("current_job_id", default=None)
+
+
+def log_event(event: str, **fields):
+    """Print one structured log line, tagged with the current job ID when there is one"""
+    job_id = fields.pop("job_id", None) or current_job_id.get()
+    record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "event": event}
+    if job_id:
+        record["job_id"] = job_id
+    record.update(fields)
+    if LOG_FORMAT == "json":
+        print(json.dumps(record, ensure_ascii=False, default=str), flush=True)
+    else:
+        print(" ".join(f"{key}={json.dumps(value, default=str) if isinstance(value, str) and ' ' in value else value}"
+                       for key, value in record.items()), flush=True)
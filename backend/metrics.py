@@ -0,0 +1,200 @@
+"""Minimal Prometheus-format metrics (counters, gauges, histograms) without extra dependencies.
+
+Metrics are process-local and thread-safe. The metrics used across the
+backend are defined at the bottom of this module so every component
+records into the same registry that ``/metrics`` renders.
+"""
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Gauge set directly, moved with inc/dec, or computed at scrape time by a callback"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, callback: Callable[[], Dict[Tuple[str, ...], float]]):
+        """``callback`` returns ``{label values tuple: value}`` when metrics are rendered"""
+        self._callback = callback
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in progress while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._callback is not None:
+            try:
+                values.update(self._callback())
+            except Exception as e:
+                print(f"Could not compute metric {self.name}: {str(e)}")
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value}" for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label key: [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{float(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "sof_stage_duration_seconds",
+    "Time spent per processing stage (upload, ocr_submit, ocr_poll, pdf_text, preprocess, "
+    "local_parse, gemini, file, serialize, job)",
+    ["stage"],
+))
+FILES_TOTAL = REGISTRY.register(Counter("sof_files_total", "Files processed, by outcome", ["outcome"]))
+PAGES_TOTAL = REGISTRY.register(Counter("sof_pages_total", "Pages extracted, by text source", ["source"]))
+PREPROCESS_BYTES_TOTAL = REGISTRY.register(Counter(
+    "sof_preprocess_bytes_total", "Image bytes before and after preprocessing for OCR", ["stage"]
+))
+EVENTS_TOTAL = REGISTRY.register(Counter("sof_events_total", "Events extracted, by extractor", ["extractor"]))
+GEMINI_REQUESTS_TOTAL = REGISTRY.register(Counter("sof_gemini_requests_total", "Gemini requests, by outcome", ["outcome"]))
+GEMINI_TOKENS_TOTAL = REGISTRY.register(Counter("sof_gemini_tokens_total", "Gemini tokens, by kind", ["kind"]))
+RETRIES_TOTAL = REGISTRY.register(Counter("sof_retries_total", "Retried external calls, by service", ["service"]))
+FAILURES_TOTAL = REGISTRY.register(Counter("sof_failures_total", "Failures, by stage", ["stage"]))
+JOBS_TOTAL = REGISTRY.register(Counter("sof_jobs_total", "Jobs finished, by status", ["status"]))
+CACHE_LOOKUPS_TOTAL = REGISTRY.register(Counter("sof_cache_lookups_total", "Content cache lookups", ["layer", "result"]))
+QUEUE_DEPTH = REGISTRY.register(Gauge("sof_queue_jobs", "Jobs in the queue, by state", ["state"]))
+EXECUTOR_BUSY = REGISTRY.register(Gauge("sof_executor_busy", "Tasks running or waiting on an executor", ["executor"]))
+ACTIVE_JOBS = REGISTRY.register(Gauge("sof_active_jobs", "Jobs being processed by this process"))
+PROVIDER_CONCURRENCY = REGISTRY.register(Gauge("sof_provider_concurrency_limit", "Adaptive concurrency limit per provider", ["provider"]))
+PROVIDER_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "sof_provider_wait_seconds", "Time calls waited for the circuit breaker, a concurrency slot and the rate limit", ["provider"],
+))
+THROTTLED_TOTAL = REGISTRY.register(Counter("sof_throttled_total", "Provider responses asking to slow down (HTTP 429)", ["provider"]))
+CIRCUIT_STATE = REGISTRY.register(Gauge("sof_circuit_state", "Circuit breaker state per provider (0 closed, 1 half-open, 2 open)", ["provider"]))
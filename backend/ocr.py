@@ -0,0 +1,163 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional
+
+from metrics import EXECUTOR_BUSY, PAGES_TOTAL, RETRIES_TOTAL, STAGE_SECONDS
+from resilience import CallSlot, ProviderGuard, parse_retry_after
+
+# The Azure SDK (and msrest/requests under it) is imported on first use, not at startup
+if TYPE_CHECKING:
+    from azure.cognitiveservices.vision.computervision import ComputerVisionClient
+
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class OCRTimeoutError(Exception):
+    """Raised when an Azure Read operation does not finish before the deadline"""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status of a failed SDK call, if it got a response"""
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+class AzureOCR:
+    """Long-lived Azure Read client that never blocks the event loop.
+
+    The SDK is synchronous, so submissions and status checks run on a small
+    dedicated thread pool. Polling starts quickly and backs off
+    geometrically up to ``poll_max`` seconds, bounded by an overall deadline.
+    With a ``guard`` every SDK call goes through the shared rate limit,
+    adaptive concurrency limit and circuit breaker; 429s wait for quota (up
+    to ``max_throttle_wait`` seconds) and 5xx responses are retried. The SDK
+    client is created on first use (or by ``warm_up``) and keeps its HTTP
+    session, so polls reuse the connection instead of reconnecting.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: Optional[str],
+        max_workers: int = 8,
+        poll_initial: float = 0.25,
+        poll_max: float = 2.0,
+        poll_factor: float = 1.5,
+        deadline: float = 120.0,
+        guard: Optional[ProviderGuard] = None,
+        max_retries: int = 3,
+        max_throttle_wait: float = 300.0,
+    ):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.poll_factor = poll_factor
+        self.deadline = deadline
+        self.guard = guard
+        self.max_retries = max_retries
+        self.max_throttle_wait = max_throttle_wait
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="azure-ocr")
+        self._client: Optional["ComputerVisionClient"] = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> "ComputerVisionClient":
+        with self._client_lock:
+            if self._client is None:
+                from azure.cognitiveservices.vision.computervision import ComputerVisionClient
+                from msrest.authentication import CognitiveServicesCredentials
+
+                client = ComputerVisionClient(self.endpoint, CognitiveServicesCredentials(self.api_key))
+                # Without keep-alive msrest closes its session (and connections) after every call
+                client.__enter__()
+                self._client = client
+            return self._client
+
+    def _open_connection(self):
+        # Any answer will do (the endpoint root is a 404): it leaves a pooled connection behind
+        service = self.client._client
+        service.send(service.get(self.endpoint), stream=False)
+
+    async def warm_up(self):
+        """Import the SDK, create the client and open a connection to the endpoint"""
+        await self._run(self._open_connection)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        with EXECUTOR_BUSY.track(executor="ocr"):
+            return await loop.run_in_executor(self.executor, lambda: func(*args, **kwargs))
+
+    async def _call(self, func, *args):
+        """One SDK call under the provider guard, waiting out 429s and retrying server errors"""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                async with (self.guard.slot() if self.guard else nullcontext(CallSlot())) as call:
+                    try:
+                        return await self._run(func, *args)
+                    except Exception as e:
+                        status = _status_code(e)
+                        if status == 429:
+                            response = getattr(e, "response", None)
+                            call.throttled(parse_retry_after(response.headers.get("Retry-After")))
+                        elif status is not None and status < 500:
+                            call.rejected()
+                        raise
+            except Exception as e:
+                status = _status_code(e)
+                if status == 429 and self.guard and time.monotonic() - started < self.max_throttle_wait:
+                    delay = call.retry_after or random.uniform(0.5, 2.0)
+                    print(f"Azure OCR throttled; waiting {delay:.2f}s for quota")
+                elif status in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                    attempt += 1
+                    delay = call.retry_after or random.uniform(0, 0.5 * 2 ** attempt)
+                    print(f"Azure OCR returned HTTP {status}; retrying in {delay:.2f}s (attempt {attempt}/{self.max_retries})")
+                else:
+                    raise
+            RETRIES_TOTAL.inc(service="azure_ocr")
+            await asyncio.sleep(delay)
+
+    def _submit(self, path: str, pages: Optional[List[str]] = None) -> str:
+        with open(path, "rb") as stream:
+            response = self.client.read_in_stream(stream, pages=pages, raw=True)
+        return response.headers['Operation-Location'].split('/')[-1]
+
+    async def read_pages(self, path: str, pages: Optional[List[str]] = None) -> List[str]:
+        """OCR a file and return the text of each page (one line per ``\\n``)"""
+        from azure.cognitiveservices.vision.computervision.models import OperationStatusCodes
+
+        with STAGE_SECONDS.time(stage="ocr_submit"):
+            operation_id = await self._call(self._submit, path, pages)
+
+        started = time.monotonic()
+        delay = self.poll_initial
+        with STAGE_SECONDS.time(stage="ocr_poll"):
+            while True:
+                result = await self._call(self.client.get_read_result, operation_id)
+                if result.status not in [OperationStatusCodes.running, OperationStatusCodes.not_started]:
+                    break
+                if time.monotonic() - started + delay > self.deadline:
+                    raise OCRTimeoutError(f"Azure OCR did not finish within {self.deadline:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * self.poll_factor, self.poll_max)
+
+        if result.status != OperationStatusCodes.succeeded:
+            return []
+
+        PAGES_TOTAL.inc(len(result.analyze_result.read_results), source="ocr")
+        return [
+            "".join(line.text + "\n" for line in page.lines)
+            for page in result.analyze_result.read_results
+        ]
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        self.executor.shutdown(wait=False)
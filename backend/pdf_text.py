@@ -0,0 +1,41 @@
+import importlib.util
+from typing import List, Optional
+
+# pypdf is optional; without it every PDF goes to OCR as before. It is imported on first use
+PYPDF_AVAILABLE = importlib.util.find_spec("pypdf") is not None
+if not PYPDF_AVAILABLE:
+    print("Warning: pypdf not installed. PDF text layers will not be used.")
+
+
+def _usable(text: str, min_chars: int) -> bool:
+    return sum(1 for c in text if c.isalnum()) >= min_chars
+
+
+def extract_pdf_pages(path: str, min_chars: int = 20) -> List[Optional[str]]:
+    """Text layer of each page of a PDF, or None for pages that need OCR.
+
+    A page needs OCR when its embedded text has fewer than ``min_chars``
+    letters and digits (scanned pages usually have none at all). Returns an
+    empty list when the file cannot be read as a PDF.
+    """
+    if not PYPDF_AVAILABLE:
+        return []
+    from pypdf import PdfReader
+
+    try:
+        reader = PdfReader(path)
+        if reader.is_encrypted:
+            reader.decrypt("")
+        pages = []
+        for page in reader.pages:
+            try:
+                text = page.extract_text() or ""
+            except Exception:
+                text = ""
+            lines = [line.rstrip() for line in text.splitlines() if line.strip()]
+            text = "".join(line + "\n" for line in lines)
+            pages.append(text if _usable(text, min_chars) else None)
+        return pages
+    except Exception as e:
+        print(f"Could not read PDF text layer of {path}: {str(e)}")
+        return []
@@ -0,0 +1,63 @@
+import os
+from typing import TYPE_CHECKING, List
+
+# Pillow is imported on first use (in the CPU worker processes), not when the API starts
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+def _prepare_page(image: "Image.Image", max_side: int) -> "Image.Image":
+    """Upright, grayscale (bilevel scans stay bilevel) and at most max_side pixels on the long side"""
+    from PIL import Image, ImageOps
+
+    page = ImageOps.exif_transpose(image)
+    if page.mode != "1":
+        page = page.convert("L")
+    if max(page.size) > max_side:
+        page.thumbnail((max_side, max_side), Image.LANCZOS)
+    return page
+
+
+def _save_page(page: "Image.Image", base: str, index: int, quality: int) -> str:
+    # Bilevel pages compress far better losslessly than as JPEG
+    if page.mode == "1":
+        target = f"{base}.p{index + 1}.png"
+        page.save(target, "PNG", optimize=True)
+    else:
+        target = f"{base}.p{index + 1}.jpg"
+        page.save(target, "JPEG", quality=quality, optimize=True)
+    return target
+
+
+def preprocess_image(path: str, max_side: int = 3200, quality: int = 85) -> dict:
+    """Shrink an image for OCR: fix EXIF orientation, grayscale, downscale and recompress.
+
+    Multi-page images (TIFF) are split into one file per page next to the
+    original. A single-page image is left as it is when preprocessing would
+    not make it smaller. Returns ``{"paths", "original_bytes",
+    "processed_bytes"}``; on any error the original file is returned as-is.
+    Runs in a worker process, so it only deals in paths and plain values.
+    """
+    from PIL import Image
+
+    original_bytes = os.path.getsize(path)
+    unchanged = {"paths": [path], "original_bytes": original_bytes, "processed_bytes": original_bytes}
+    base = os.path.splitext(path)[0]
+    paths: List[str] = []
+    try:
+        with Image.open(path) as image:
+            frames = getattr(image, "n_frames", 1)
+            for index in range(frames):
+                image.seek(index)
+                paths.append(_save_page(_prepare_page(image, max_side), base, index, quality))
+    except Exception as e:
+        print(f"Could not preprocess {path}: {str(e)}")
+        for target in paths:
+            os.remove(target)
+        return unchanged
+
+    processed_bytes = sum(os.path.getsize(target) for target in paths)
+    if len(paths) == 1 and processed_bytes >= original_bytes:
+        os.remove(paths[0])
+        return unchanged
+    return {"paths": paths, "original_bytes": original_bytes, "processed_bytes": processed_bytes}
@@ -0,0 +1,77 @@
+import collections
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+
+class SamplingProfiler:
+    """Statistical profiler that can be switched on and off in a running process.
+
+    While running, a background thread records the stack of every other
+    thread each ``interval`` seconds. ``stop`` returns the counts as
+    collapsed stacks ("thread;file:function;..."), the input format of
+    flame graph tools. Sampling stops by itself after ``max_seconds``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._counts = collections.Counter()
+        self.samples = 0
+        self.interval = 0.0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.005, max_seconds: float = 300.0) -> bool:
+        """Start sampling; False if it is already running"""
+        with self._lock:
+            if self.running:
+                return False
+            self._counts = collections.Counter()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.monotonic()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval, max_seconds),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, interval: float, max_seconds: float):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + max_seconds
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self, limit: int = 200) -> dict:
+        """Stop sampling and return the most frequent stacks"""
+        with self._lock:
+            thread = self._thread
+            self._stop.set()
+            if thread is not None:
+                thread.join()
+            self._thread = None
+            duration = time.monotonic() - self.started_at if self.started_at else 0.0
+            return {
+                "samples": self.samples,
+                "interval": self.interval,
+                "duration": round(duration, 3),
+                "stacks": [{"stack": stack, "count": count} for stack, count in self._counts.most_common(limit)],
+            }
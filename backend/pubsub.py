@@ -0,0 +1,119 @@
+import asyncio
+import json
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def format_sse(data: dict, event: str = "progress") -> bytes:
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class ProgressBroker:
+    """In-process fan-out of job progress updates to subscribers (SSE streams).
+
+    Subscribers get an asyncio.Queue for one job, or for every job when
+    subscribing with ``job_id=None``. Updates that repeat a job's last
+    status, progress and message are dropped, so the same change arriving
+    both from this process and through the store bridge is delivered once.
+    A subscriber that falls behind loses its oldest queued updates.
+    """
+
+    def __init__(self, max_queue: int = 100, max_tracked_jobs: int = 10000):
+        self.max_queue = max_queue
+        self.max_tracked_jobs = max_tracked_jobs
+        self._subscribers: Dict[Optional[str], Set[asyncio.Queue]] = {}
+        self._last: "OrderedDict[str, tuple]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, job_id: Optional[str] = None) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: Optional[str], queue: asyncio.Queue):
+        queues = self._subscribers.get(job_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[job_id]
+
+    def publish(self, update: dict):
+        """Deliver ``{"job_id", "status", "progress", "message", ...}``; safe to call from any thread"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(update)
+        else:
+            loop.call_soon_threadsafe(self._deliver, update)
+
+    def _deliver(self, update: dict):
+        job_id = update["job_id"]
+        state = (update.get("status"), update.get("progress"), update.get("message"))
+        if self._last.get(job_id) == state:
+            return
+        self._last[job_id] = state
+        self._last.move_to_end(job_id)
+        while len(self._last) > self.max_tracked_jobs:
+            self._last.popitem(last=False)
+
+        for queue in list(self._subscribers.get(job_id, ())) + list(self._subscribers.get(None, ())):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(update)
+
+
+class StoreBridge:
+    """Forwards job updates written by other processes (workers) to a local broker.
+
+    Polls the job store for jobs updated since the last poll, but only while
+    the broker has subscribers, so an idle API process does not query.
+    """
+
+    def __init__(self, broker: ProgressBroker, fetch_updates: Callable[[str], List[dict]], interval: float = 0.5):
+        self.broker = broker
+        self.fetch_updates = fetch_updates
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        since = datetime.now().isoformat()
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.broker.has_subscribers:
+                # Nobody is listening: skip the backlog instead of replaying it to the next subscriber
+                since = datetime.now().isoformat()
+                continue
+            try:
+                updates = self.fetch_updates(since)
+            except Exception as e:
+                print(f"Progress bridge could not read job updates: {str(e)}")
+                continue
+            for update in updates:
+                since = max(since, update["updated_at"])
+                self.broker.publish(update)
@@ -0,0 +1,338 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Callable, Deque, Dict, Hashable, Optional
+
+from job_store import _Transaction
+from logs import log_event
+from metrics import CIRCUIT_STATE, PROVIDER_CONCURRENCY, PROVIDER_WAIT_SECONDS, THROTTLED_TOTAL
+
+
+RATE_LIMIT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    name TEXT PRIMARY KEY,
+    tat REAL NOT NULL
+);
+"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (HTTP dates are ignored)"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Token bucket for ``rate`` calls per second with bursts of up to ``burst`` calls.
+
+    Implemented as GCRA: each call reserves the next free slot and sleeps
+    until it, so callers are served in arrival order. With ``path`` the
+    bucket lives in a SQLite table and every process using that database
+    shares the one quota; its transactions can wait on the other processes,
+    so the async methods run them in a thread.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int = 1, path: Optional[Path] = None):
+        self.name = name
+        self.interval = 1.0 / rate
+        self.tolerance = self.interval * (max(1, burst) - 1)
+        self.path = Path(path) if path else None
+        self._tat = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if self.path is not None:
+            self._connect().executescript(RATE_LIMIT_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _update(self, step: Callable[[float, float], float]) -> float:
+        """Apply ``step(tat, now) -> new tat`` to the bucket atomically; returns the new tat"""
+        now = time.time()
+        if self.path is None:
+            with self._lock:
+                self._tat = step(self._tat, now)
+                return self._tat
+        with _Transaction(self._connect()) as conn:
+            row = conn.execute("SELECT tat FROM rate_limits WHERE name = ?", (self.name,)).fetchone()
+            tat = step(row[0] if row else 0.0, now)
+            conn.execute("INSERT OR REPLACE INTO rate_limits (name, tat) VALUES (?, ?)", (self.name, tat))
+        return tat
+
+    def reserve(self) -> float:
+        """Reserve the next slot and return how many seconds to wait for it"""
+        # The slot starts once the bucket is back within the burst tolerance
+        tat = self._update(lambda tat, now: max(tat, now) + self.interval)
+        return max(0.0, tat - self.interval - self.tolerance - time.time())
+
+    async def _off_loop(self, func, *args):
+        if self.path is None:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    async def acquire(self):
+        delay = await self._off_loop(self.reserve)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def penalize(self, seconds: float):
+        """Hold back every caller (in every sharing process) for ``seconds``, e.g. a Retry-After"""
+        await self._off_loop(self._update, lambda tat, now: max(tat, now + seconds + self.tolerance))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit that adapts to the provider (AIMD), with fair queueing.
+
+    The limit grows by one per "round" of successful calls and is cut by
+    ``decrease_factor`` on throttling or errors (and gently when calls are
+    slower than ``latency_target``), at most once per ``decrease_interval``.
+    Callers waiting for a slot are queued per ``key()`` (the job ID) and
+    served round-robin, so one large job cannot starve the others.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        latency_target: float = 0.0,
+        decrease_factor: float = 0.5,
+        decrease_interval: float = 1.0,
+        key: Optional[Callable[[], Hashable]] = None,
+    ):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.decrease_interval = decrease_interval
+        self.key = key
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._waiters: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+        self._last_decrease = 0.0
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(self.key() if self.key else None, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just before the cancellation arrived: hand the slot on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.in_flight < int(self.limit) and self._waiters:
+            key, queue = next(iter(self._waiters.items()))
+            future = queue.popleft()
+            if queue:
+                self._waiters.move_to_end(key)
+            else:
+                del self._waiters[key]
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def on_success(self, latency: float):
+        if self.latency_target and latency > self.latency_target:
+            self._decrease(0.9)
+            return
+        self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_overload(self):
+        self._decrease(self.decrease_factor)
+
+    def _decrease(self, factor: float):
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_interval:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * factor)
+
+
+class CircuitBreaker:
+    """Pauses calls to a provider that keeps failing.
+
+    After ``failure_threshold`` consecutive errors the circuit opens and
+    callers wait (instead of failing) for ``reset_timeout`` seconds. Then a
+    single probe call goes through: success closes the circuit, failure
+    opens it again for twice as long, up to ``max_reset_timeout``.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, max_reset_timeout: float = 300.0,
+                 name: str = ""):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+
+    async def wait(self) -> bool:
+        """Wait until calls may go through; True if this caller is the half-open probe"""
+        while True:
+            if self.state == self.CLOSED:
+                return False
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+                return True
+            await asyncio.sleep(min(max(remaining, 0.1), 1.0))
+
+    def record_success(self):
+        self.failures = 0
+        self.state = self.CLOSED
+        self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self, probe: bool):
+        self.failures += 1
+        if probe:
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            self._open()
+        elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def abandon_probe(self):
+        """The probe was cancelled: let the next caller probe right away"""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic() - self.reset_timeout
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        log_event("circuit_opened", provider=self.name, failures=self.failures, pause_seconds=self.reset_timeout)
+
+
+class CallSlot:
+    """Outcome of one guarded call, set by the caller: ok (default), throttled, error or rejected"""
+
+    def __init__(self):
+        self.outcome = "ok"
+        self.retry_after: Optional[float] = None
+
+    def throttled(self, retry_after: Optional[float] = None):
+        self.outcome = "throttled"
+        self.retry_after = retry_after
+
+    def failed(self):
+        self.outcome = "error"
+
+    def rejected(self):
+        """The provider answered but refused this request (4xx): not a sign of an outage"""
+        self.outcome = "rejected"
+
+
+class ProviderGuard:
+    """Circuit breaker, adaptive concurrency and (optional) rate limit around calls to one provider.
+
+    Used as ``async with guard.slot() as call: ...``; mark the call throttled
+    (429) or failed (5xx) inside the block. An exception escaping the block
+    counts as an error unless the call was already marked.
+    """
+
+    def __init__(self, name: str, concurrency: AdaptiveConcurrency, breaker: CircuitBreaker,
+                 limiter: Optional[RateLimiter] = None):
+        self.name = name
+        self.concurrency = concurrency
+        self.breaker = breaker
+        self.limiter = limiter
+        self._publish()
+
+    @asynccontextmanager
+    async def slot(self):
+        queued = time.perf_counter()
+        probe = await self.breaker.wait()
+        try:
+            await self.concurrency.acquire()
+        except asyncio.CancelledError:
+            # A probe cancelled while queued must not leave the circuit half-open for good
+            if probe:
+                self.breaker.abandon_probe()
+            raise
+        call, started = CallSlot(), None
+        try:
+            if self.limiter is not None:
+                await self.limiter.acquire()
+            started = time.perf_counter()
+            PROVIDER_WAIT_SECONDS.observe(started - queued, provider=self.name)
+            yield call
+        except asyncio.CancelledError:
+            call.outcome = None
+            raise
+        except Exception:
+            if call.outcome == "ok":
+                call.outcome = "error"
+            raise
+        finally:
+            self.concurrency.release()
+            self._record(call, probe, time.perf_counter() - started if started else 0.0)
+            if call.outcome == "throttled" and call.retry_after and self.limiter is not None:
+                # Over quota: hold everyone back for Retry-After
+                await self.limiter.penalize(call.retry_after)
+
+    def _record(self, call: CallSlot, probe: bool, latency: float):
+        if call.outcome is None:
+            if probe:
+                self.breaker.abandon_probe()
+        elif call.outcome == "throttled":
+            # The provider is up but over quota: slow down (slot() applies Retry-After to the rate limit)
+            THROTTLED_TOTAL.inc(provider=self.name)
+            self.breaker.record_success()
+            self.concurrency.on_overload()
+        elif call.outcome == "error":
+            self.breaker.record_failure(probe)
+            self.concurrency.on_overload()
+        elif call.outcome == "rejected":
+            # The provider is up, but a refused request says nothing about how much load it takes
+            self.breaker.record_success()
+        else:
+            self.breaker.record_success()
+            self.concurrency.on_success(latency)
+        self._publish()
+
+    def _publish(self):
+        PROVIDER_CONCURRENCY.set(int(self.concurrency.limit), provider=self.name)
+        CIRCUIT_STATE.set(self.breaker.state, provider=self.name)
+
+    def state(self) -> Dict[str, object]:
+        return {
+            "circuit": ("closed", "half_open", "open")[self.breaker.state],
+            "concurrency_limit": int(self.concurrency.limit),
+            "in_flight": self.concurrency.in_flight,
+            "rate_limit_per_second": round(1.0 / self.limiter.interval, 3) if self.limiter else None,
+        }
+
+    def close(self):
+        if self.limiter is not None:
+            self.limiter.close()
@@ -0,0 +1,49 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+
+
+def results_log_path(results_dir: Path, job_id: str) -> Path:
+    return Path(results_dir) / f"{job_id}.partial.ndjson"
+
+
+def append_file_rows(results_dir: Path, job_id: str, index: int, filename: str, rows: List[dict]):
+    """Append one finished file's rows to the job's NDJSON results log and flush it to disk"""
+    line = json.dumps({"file_index": index, "filename": filename, "rows": rows}, ensure_ascii=False) + "\n"
+    with open(results_log_path(results_dir, job_id), "ab+") as f:
+        # A line torn by a crash is terminated first so it does not swallow this one
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        f.write(line.encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_file_rows(results_dir: Path, job_id: str) -> Dict[int, List[dict]]:
+    """Rows per file index from the job's results log (empty if there is none).
+
+    Unreadable lines (a write cut short by a crash) are skipped; if a file
+    was logged twice the last entry wins.
+    """
+    per_file = {}
+    try:
+        with open(results_log_path(results_dir, job_id), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    per_file[int(entry["file_index"])] = entry["rows"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return per_file
+
+
+def remove_results_log(results_dir: Path, job_id: str):
+    try:
+        os.remove(results_log_path(results_dir, job_id))
+    except FileNotFoundError:
+        pass
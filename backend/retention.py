@@ -0,0 +1,221 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+from artifacts import ARCHIVE_DIR_NAME, archive_artifact, remove_artifacts
+from job_queue import JobQueue
+from job_store import JobStore
+from logs import log_event
+from results_log import remove_results_log
+from uploads import job_staging_dir, remove_staging_dir
+
+
+TERMINAL = ("completed", "failed")
+
+# Artifacts kept (compressed) when a job is archived; the CSV is dropped as it is rebuilt on export
+ARCHIVED_KINDS = ("json", "view", "laytime")
+
+
+@dataclass
+class RetentionPolicy:
+    """Ages in days since a job's last update; 0 keeps forever"""
+    job_days: float = 0
+    failed_days: float = 30
+    csv_days: float = 7
+    archive_days: float = 30
+    stale_days: float = 2
+
+
+def dir_usage(path: Path) -> Dict[str, int]:
+    """Number of files and total bytes under a directory"""
+    files = size = 0
+    stack = [Path(path)]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                else:
+                    files += 1
+                    size += entry.stat(follow_symlinks=False).st_size
+            except FileNotFoundError:
+                continue
+    return {"files": files, "bytes": size}
+
+
+class Compactor:
+    """Applies the retention policy to the job store, job queue, results/, uploads/ and legacy jobs/.
+
+    Each pass deletes expired jobs (files and records), drops CSV artifacts
+    and moves the remaining artifacts of old jobs into gzip archives under
+    ``results/archive/`` (reads decompress them transparently, see
+    artifacts.py), and removes staging directories, results logs and queue
+    entries left by jobs that are no longer running. CSV and archive passes only look at jobs
+    updated since the previous pass, so a pass costs the same however many
+    jobs have piled up.
+    """
+
+    def __init__(self, job_store: JobStore, results_dir: Path, uploads_dir: Path, legacy_jobs_dir: Path,
+                 policy: RetentionPolicy, interval: float = 3600.0, job_queue: Optional[JobQueue] = None):
+        self.job_store = job_store
+        self.job_queue = job_queue
+        self.results_dir = Path(results_dir)
+        self.uploads_dir = Path(uploads_dir)
+        self.legacy_jobs_dir = Path(legacy_jobs_dir)
+        self.policy = policy
+        self.interval = interval
+        self.last_run: Optional[dict] = None
+        self._bytes_saved = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _cutoff(days: float) -> str:
+        return (datetime.now() - timedelta(days=days)).isoformat()
+
+    def _delete_job(self, job_id: str):
+        remove_artifacts(self.results_dir, job_id)
+        remove_results_log(self.results_dir, job_id)
+        remove_staging_dir(job_staging_dir(self.uploads_dir, job_id))
+        if self.job_queue is not None:
+            self.job_queue.delete(job_id)
+        self.job_store.delete_job(job_id)
+
+    def _expire(self, days: float, statuses: tuple) -> int:
+        if not days:
+            return 0
+        deleted = 0
+        while True:
+            jobs = self.job_store.jobs_updated_between("", self._cutoff(days), statuses)
+            for job in jobs:
+                self._delete_job(job["job_id"])
+            deleted += len(jobs)
+            if not jobs:
+                return deleted
+
+    def _sweep(self, watermark_key: str, days: float, action) -> int:
+        """Apply ``action(job_id)`` to completed jobs that aged past ``days`` since the last sweep"""
+        if not days:
+            return 0
+        cutoff = self._cutoff(days)
+        after = self.job_store.get_meta(watermark_key) or ""
+        done = 0
+        while True:
+            jobs = self.job_store.jobs_updated_between(after, cutoff, ("completed",))
+            for job in jobs:
+                action(job["job_id"])
+            done += len(jobs)
+            if not jobs:
+                break
+            after = jobs[-1]["updated_at"]
+        self.job_store.set_meta(watermark_key, cutoff)
+        return done
+
+    def _drop_csv(self, job_id: str):
+        remove_artifacts(self.results_dir, job_id, ["csv"])
+        self.job_store.delete_artifacts(job_id, ["csv"])
+
+    def _archive(self, job_id: str):
+        self._drop_csv(job_id)
+        for kind in ARCHIVED_KINDS:
+            self._bytes_saved += archive_artifact(self.results_dir, job_id, kind)
+
+    def _remove_stale(self) -> int:
+        """Staging directories and results logs of jobs that finished or no longer exist"""
+        cutoff = time.time() - self.policy.stale_days * 86400
+        removed = 0
+        candidates = [(path, path.name) for path in self.uploads_dir.glob("*") if path.is_dir()]
+        candidates += [(path, path.name.split(".", 1)[0]) for path in self.results_dir.glob("*.partial.ndjson")]
+        for path, job_id in candidates:
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            job = self.job_store.load(job_id)
+            if job is not None and job["status"] not in TERMINAL:
+                continue
+            if path.is_dir():
+                remove_staging_dir(path)
+            else:
+                remove_results_log(self.results_dir, job_id)
+            removed += 1
+        return removed
+
+    def _prune_queue(self) -> int:
+        """Queue entries of jobs that finished more than ``stale_days`` ago"""
+        if self.job_queue is None or not self.policy.stale_days:
+            return 0
+        return self.job_queue.prune(time.time() - self.policy.stale_days * 86400)
+
+    def _remove_legacy_jobs(self) -> int:
+        """Legacy jobs/<id>.json files already migrated into the job store"""
+        if not self.job_store.get_meta("json_jobs_migrated"):
+            return 0
+        removed = 0
+        for path in self.legacy_jobs_dir.glob("*.json"):
+            if self.job_store.load(path.stem) is not None:
+                path.unlink(missing_ok=True)
+                removed += 1
+        try:
+            self.legacy_jobs_dir.rmdir()
+        except OSError:
+            pass
+        return removed
+
+    def run_once(self) -> dict:
+        """One retention pass; returns what it did"""
+        started = time.perf_counter()
+        self._bytes_saved = 0
+        stats = {
+            "expired_jobs": self._expire(self.policy.job_days, TERMINAL),
+            "expired_failed_jobs": self._expire(self.policy.failed_days, ("failed",)),
+            "dropped_csv": self._sweep("retention_csv_through", self.policy.csv_days, self._drop_csv),
+            "archived_jobs": self._sweep("retention_archive_through", self.policy.archive_days, self._archive),
+            "removed_stale": self._remove_stale(),
+            "pruned_queue_entries": self._prune_queue(),
+            "removed_legacy_jobs": self._remove_legacy_jobs(),
+        }
+        stats["archive_bytes_saved"] = self._bytes_saved
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        stats["finished_at"] = datetime.now().isoformat()
+        self.last_run = stats
+        log_event("retention_pass", **stats)
+        return stats
+
+    def usage(self) -> dict:
+        """Disk use per storage area"""
+        results = dir_usage(self.results_dir)
+        archive = dir_usage(self.results_dir / ARCHIVE_DIR_NAME)
+        return {
+            "results": {"files": results["files"] - archive["files"], "bytes": results["bytes"] - archive["bytes"]},
+            "archive": archive,
+            "uploads": dir_usage(self.uploads_dir),
+            "legacy_jobs": dir_usage(self.legacy_jobs_dir),
+        }
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.run_once)
+            except Exception as e:
+                print(f"Retention pass failed: {str(e)}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,245 @@
+"""Deterministic Statement of Facts line parser.
+
+Handles the regular SoF layout of a date (as a heading or at the start of a
+line), an ``HHMM``/``HH:MM`` time or time range and an activity, e.g.::
+
+    12/03/2024
+    0800-1200  Commenced loading
+    13.03.2024 1430 NOR tendered
+    NOR tendered: 13.03.2024 1430
+
+Header lines (``Key: value``) set the vessel, cargo or date when the key is
+a known one; any other key with a time in its value is an event named after
+the key.
+
+Each page gets a confidence score (share of event-like lines that parsed
+cleanly) so callers can send only the low-confidence pages to the LLM.
+Everything here is pure Python so it can run in a process pool.
+"""
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from laytime import format_duration
+
+
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+        ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+        ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december"),
+    ], start=1)
+    for name in names
+}
+_MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+_WEEKDAY_RE = re.compile(r"\b(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)(?:day|sday|nesday|rsday|urday)?\b\.?,?", re.I)
+
+_DATE_PATTERNS = [
+    # 2024-03-12
+    (re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b"), "ymd"),
+    # 12/03/2024, 12.03.24, 12-03-2024 (day first unless that is impossible)
+    (re.compile(r"\b(\d{1,2})[./-](\d{1,2})[./-](\d{4}|\d{2})\b"), "dmy"),
+    # 12th March 2024, 12 Mar 24, 12-Mar-2024
+    (re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?[\s.-]*({_MONTH_NAMES})\.?[\s,.-]*(\d{{4}}|\d{{2}})\b", re.I), "d_mon_y"),
+    # March 12, 2024
+    (re.compile(rf"\b({_MONTH_NAMES})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?,?\s+(\d{{4}})\b", re.I), "mon_d_y"),
+]
+
+_TIME = r"([01]?\d|2[0-4])[:.h]?([0-5]\d)"
+_TIME_SUFFIX = r"\s*(?:hrs?|hours|h|lt)?\.?"
+_TIME_RANGE_RE = re.compile(rf"^\s*(?:from\s+)?{_TIME}{_TIME_SUFFIX}\s*(?:-|–|—|to|till|until|/)\s*{_TIME}{_TIME_SUFFIX}(?=\s|$|[,;:])", re.I)
+_TIME_RE = re.compile(rf"^\s*(?:at\s+)?{_TIME}{_TIME_SUFFIX}(?=\s|$|[,;:])", re.I)
+
+_HEADER_RE = re.compile(r"^\s*([A-Za-z][A-Za-z /.'()-]{1,30})\s*[:=]\s*(.+)$")
+_VESSEL_KEYS = ("vessel", "vessel name", "ship", "ship name", "mv", "m/v", "m.v.", "name of vessel")
+_CARGO_KEYS = ("cargo", "cargo description", "commodity")
+# Other header keys that describe the call rather than an event
+_INFO_KEYS = ("port", "berth", "load port", "loading port", "discharge port", "discharging port", "master",
+              "agent", "agents", "charterer", "charterers", "shipper", "shippers", "receiver", "receivers",
+              "voyage", "voy", "voyage no", "quantity", "b/l quantity", "owner", "owners")
+
+
+def _year(value: str) -> int:
+    year = int(value)
+    return year + 2000 if year < 100 else year
+
+
+def _parse_date(line: str) -> Tuple[Optional[date], str]:
+    """Find the first date in a line; returns it and the line without it"""
+    for pattern, kind in _DATE_PATTERNS:
+        match = pattern.search(line)
+        if not match:
+            continue
+        a, b, c = match.groups()
+        try:
+            if kind == "ymd":
+                found = date(int(a), int(b), int(c))
+            elif kind == "dmy":
+                day, month = int(a), int(b)
+                if month > 12 and day <= 12:
+                    day, month = month, day
+                found = date(_year(c), month, day)
+            elif kind == "d_mon_y":
+                found = date(_year(c), MONTHS[b.lower()], int(a))
+            else:
+                found = date(_year(c), MONTHS[a.lower()], int(b))
+        except (ValueError, KeyError):
+            continue
+        return found, line[:match.start()] + " " + line[match.end():]
+    return None, line
+
+
+def _clock(hours: str, minutes: str) -> int:
+    return int(hours) * 60 + int(minutes)
+
+
+def _activity(text: str) -> str:
+    text = _WEEKDAY_RE.sub(" ", text)
+    text = re.sub(r"^[\s\-–—:;,.|/]+|[\s\-–—:;,|/]+$", "", text)
+    return re.sub(r"\s{2,}", " ", text).strip()
+
+
+def _is_title(line: str) -> bool:
+    letters = [c for c in line if c.isalpha()]
+    return bool(letters) and not any(c.isdigit() for c in line) and all(c.isupper() for c in letters)
+
+
+class SoFParser:
+    """Line-by-line parser that carries date and vessel/cargo context across pages"""
+
+    def __init__(self, filename: str = ""):
+        self.filename = filename
+        self.current_date: Optional[date] = None
+        self.vessel = ""
+        self.cargo = ""
+
+    @property
+    def ship_cargo(self) -> str:
+        return " / ".join(part for part in (self.vessel, self.cargo) if part) or "N/A"
+
+    def context_note(self) -> str:
+        """Date and ship/cargo in effect, for handing a later page to the LLM on its own"""
+        facts = []
+        if self.current_date:
+            facts.append(f"the current date is {self.current_date.isoformat()}")
+        if self.vessel or self.cargo:
+            facts.append(f"the ship/cargo is {self.ship_cargo}")
+        return f"Earlier pages of this document state that {' and '.join(facts)}." if facts else ""
+
+    def _event(self, activity: str, start: datetime, end: Optional[datetime], line: str) -> dict:
+        return {
+            "event": activity[:1].upper() + activity[1:],
+            "day": WEEKDAYS[start.weekday()].capitalize(),
+            "start_time": start.strftime("%Y-%m-%d %H:%M"),
+            "end_time": end.strftime("%Y-%m-%d %H:%M") if end else "",
+            "duration": format_duration((end - start).total_seconds() // 60) if end else "",
+            "ship_cargo": self.ship_cargo,
+            "layoff_time": "N/A",
+            "description": line.strip(),
+            "filename": self.filename,
+        }
+
+    def parse_line(self, line: str) -> Tuple[str, Optional[dict]]:
+        """Classify one line as "skip", "context", "event" or "unparsed" (with its row for events)"""
+        stripped = line.strip()
+        if len(stripped) < 3:
+            return "skip", None
+
+        header = _HEADER_RE.match(stripped)
+        if header and not re.match(r"^\s*\d", stripped):
+            key, value = header.group(1).strip().lower(), header.group(2).strip()
+            if key in _VESSEL_KEYS:
+                self.vessel = value
+                return "context", None
+            if key in _CARGO_KEYS:
+                self.cargo = value
+                return "context", None
+            if "date" in key.split():
+                found, _ = _parse_date(value)
+                if found:
+                    self.current_date = found
+                return "context", None
+            if key in _INFO_KEYS:
+                return "context", None
+            # "NOR tendered: 12.03.2024 0700": the key names the event, the value holds its time
+            found, rest = _parse_date(value)
+            if found:
+                self.current_date = found
+            rest = _WEEKDAY_RE.sub(" ", rest).strip()
+            match = _TIME_RANGE_RE.match(rest) or _TIME_RE.match(rest)
+            if not match:
+                return "unparsed", None
+            return self._timed_event(_activity(header.group(1)), match, stripped)
+
+        found, rest = _parse_date(stripped)
+        if found:
+            self.current_date = found
+        rest = _WEEKDAY_RE.sub(" ", rest)
+
+        match = _TIME_RANGE_RE.match(rest) or _TIME_RE.match(rest)
+        if not match:
+            if found and len(_activity(rest)) < 3:
+                return "context", None
+            if _is_title(stripped):
+                return "context", None
+            return "unparsed", None
+        return self._timed_event(_activity(rest[match.end():]), match, stripped)
+
+    def _timed_event(self, activity: str, match: re.Match, line: str) -> Tuple[str, Optional[dict]]:
+        """Event row for an activity at the time (range) in ``match`` on the current date"""
+        if len(re.sub(r"[^A-Za-z]", "", activity)) < 3 or self.current_date is None:
+            return "unparsed", None
+
+        groups = match.groups()
+        start_minutes = _clock(groups[0], groups[1])
+        if start_minutes > 24 * 60:
+            return "unparsed", None
+        start = datetime.combine(self.current_date, datetime.min.time()) + timedelta(minutes=start_minutes)
+        end = None
+        if len(groups) == 4:
+            end_minutes = _clock(groups[2], groups[3])
+            if end_minutes > 24 * 60:
+                return "unparsed", None
+            end = datetime.combine(self.current_date, datetime.min.time()) + timedelta(minutes=end_minutes)
+            if end < start:
+                # Range runs past midnight
+                end += timedelta(days=1)
+        return "event", self._event(activity, start, end, line)
+
+    def parse_page(self, page: str) -> Tuple[List[dict], float]:
+        """Parse one page; confidence is the share of event-like lines that became events.
+
+        A page with text but no event-like lines scores 0, so it is not
+        mistaken for a page with nothing to extract; a blank page scores 1.
+        """
+        rows, unparsed, lines = [], 0, 0
+        for line in page.splitlines():
+            kind, row = self.parse_line(line)
+            if kind != "skip":
+                lines += 1
+            if kind == "event":
+                rows.append(row)
+            elif kind == "unparsed":
+                unparsed += 1
+        candidates = len(rows) + unparsed
+        if not candidates:
+            return rows, (0.0 if lines else 1.0)
+        return rows, len(rows) / candidates
+
+
+def parse_document(pages: Sequence[str], filename: str = "") -> List[Tuple[List[dict], float, str]]:
+    """Parse every page of a document in order.
+
+    Returns ``(rows, confidence, context_note)`` per page, where the note
+    describes the context carried over from the pages before it.
+    """
+    parser = SoFParser(filename)
+    results = []
+    for page in pages:
+        note = parser.context_note()
+        rows, confidence = parser.parse_page(page)
+        results.append((rows, confidence, note))
+    return results
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from cache import ContentCache, PartialResult
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ContentCache(tmp_path / "cache", max_memory_bytes=1 << 20, max_disk_bytes=1 << 20)
+
+
+def test_concurrent_requests_share_one_computation(cache):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["page"]
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute("text", "k", compute) for _ in range(3)))
+
+    assert asyncio.run(main()) == [["page"]] * 3
+    assert len(calls) == 1
+    assert (cache.misses, cache.hits) == (1, 2)
+    assert cache.get("text", "k") == ["page"]
+
+
+def test_values_survive_a_restart(cache, tmp_path):
+    cache.put("rows", "k", [{"event": "Loading"}])
+    reopened = ContentCache(tmp_path / "cache", max_memory_bytes=1 << 20, max_disk_bytes=1 << 20)
+    assert reopened.get("rows", "k") == [{"event": "Loading"}]
+    assert reopened.get("text", "k") is None
+
+
+def test_empty_and_partial_results_are_not_stored(cache):
+    async def empty():
+        return []
+
+    async def partial():
+        raise PartialResult(["some rows"])
+
+    async def main():
+        assert await cache.get_or_compute("rows", "a", empty) == []
+        assert await cache.get_or_compute("rows", "b", partial) == ["some rows"]
+
+    asyncio.run(main())
+    assert cache.get("rows", "a") is None
+    assert cache.get("rows", "b") is None
+
+
+def test_errors_reach_every_waiter_and_are_retried(cache):
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("OCR failed")
+
+    async def main():
+        results = await asyncio.gather(*(cache.get_or_compute("text", "k", failing) for _ in range(2)),
+                                       return_exceptions=True)
+        assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("text", "k", failing)
+
+    asyncio.run(main())
+    assert len(attempts) == 2
+
+
+def test_waiter_takes_over_when_the_owner_is_cancelled(cache):
+    started = []
+
+    async def compute():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return [f"run {len(started)}"]
+
+    async def main():
+        owner = asyncio.ensure_future(cache.get_or_compute("text", "k", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_compute("text", "k", compute))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        results = await asyncio.gather(owner, waiter, return_exceptions=True)
+        assert isinstance(results[0], asyncio.CancelledError)
+        assert results[1] == ["run 2"]
+
+    asyncio.run(main())
+
+
+def test_cancelling_a_waiter_leaves_the_owner_running(cache):
+    async def compute():
+        await asyncio.sleep(0.03)
+        return ["page"]
+
+    async def main():
+        owner = asyncio.ensure_future(cache.get_or_compute("text", "k", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_compute("text", "k", compute))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        results = await asyncio.gather(owner, waiter, return_exceptions=True)
+        assert results[0] == ["page"]
+        assert isinstance(results[1], asyncio.CancelledError)
+
+    asyncio.run(main())
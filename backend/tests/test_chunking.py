@@ -0,0 +1,36 @@
+from chunking import chunk_pages, merge_chunk_rows
+
+
+def row(event, start, end=""):
+    return {"event": event, "start_time": start, "end_time": end}
+
+
+def test_chunks_repeat_the_last_lines_of_the_previous_chunk():
+    chunks = chunk_pages(["a\nb\nc\n", "d\ne\n"], max_chars=6, overlap_lines=2)
+    assert chunks == ["a\nb\nc\n", "b\nc\nd\ne\n"]
+
+
+def test_overlap_copies_are_dropped_even_when_renamed():
+    first = [row("Loading", "2024-03-12 08:00", "2024-03-12 12:00"), row("NOR tendered", "2024-03-12 14:30")]
+    second = [row("Notice of Readiness Tendered", "2024-03-12 14:30"), row("Pilot on board", "2024-03-12 15:00")]
+    assert [r["event"] for r in merge_chunk_rows([first, second])] == ["Loading", "NOR tendered", "Pilot on board"]
+
+
+def test_each_row_cancels_one_copy_only():
+    first = [row("NOR tendered", "2024-03-12 08:00")]
+    second = [row("NOR", "2024-03-12 08:00"), row("Pilot on board", "2024-03-12 08:00")]
+    assert [r["event"] for r in merge_chunk_rows([first, second])] == ["NOR tendered", "Pilot on board"]
+
+
+def test_only_adjacent_chunks_and_timed_rows_are_compared():
+    first = [row("Shifting", "2024-03-12 08:00"), row("Remark", "")]
+    assert merge_chunk_rows([first, [], [row("Shifting", "2024-03-12 08:00"), row("Remark", "")]]) == first * 2
+    assert merge_chunk_rows([[row("Rain", ""), row("Rain", "")]]) == [row("Rain", ""), row("Rain", "")]
+
+
+def test_same_time_events_outside_the_overlap_are_kept():
+    first = [row("NOR tendered", "2024-03-12 08:00"), row("Loading", "2024-03-12 09:00"), row("Rain", "2024-03-12 14:00")]
+    second = [row("Rain stopped", "2024-03-12 14:00"), row("Loading", "2024-03-12 15:00"),
+              row("NOR tendered again", "2024-03-12 08:00")]
+    merged = merge_chunk_rows([first, second], overlap_lines=1)
+    assert [r["event"] for r in merged] == ["NOR tendered", "Loading", "Rain", "Loading", "NOR tendered again"]
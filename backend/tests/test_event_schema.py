@@ -0,0 +1,16 @@
+from event_schema import normalize_events
+
+
+def test_aliases_and_defaults():
+    [record] = normalize_events([{"Event": "Loading", "start": "", "Start Time": "2024-03-12 08:00", "Layoff Time": ""}])
+    assert record.event == "Loading"
+    assert record.start_time == "2024-03-12 08:00"
+    assert record.layoff_time == "N/A"
+    assert record.ship_cargo == "N/A"
+    assert record.duration_minutes is None
+
+
+def test_zero_is_kept():
+    [record] = normalize_events([{"event": "Shifting", "duration_minutes": 0, "layoff_minutes": 0}])
+    assert record.duration_minutes == 0
+    assert record.layoff_minutes == 0
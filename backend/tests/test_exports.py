@@ -0,0 +1,113 @@
+import csv
+import gzip
+import importlib
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from artifacts import archive_artifact, artifact_path, etag_for, read_artifact, write_artifacts
+from exports import accepts_gzip, gzip_chunks, iter_csv, iter_json_table, iter_ndjson
+
+
+ROWS = [{"event": f"Loading {index}", "remarks": 'said "ok", then left'} for index in range(3000)]
+
+
+def test_gzip_round_trips_every_export_format():
+    csv_body = gzip.decompress(b"".join(gzip_chunks(iter_csv(([row["event"], row["remarks"]] for row in ROWS),
+                                                             ["event", "remarks"]))))
+    assert list(csv.reader(io.StringIO(csv_body.decode("utf-8")), escapechar='\\')) == (
+        [["event", "remarks"]] + [[row["event"], row["remarks"]] for row in ROWS])
+
+    ndjson_body = gzip.decompress(b"".join(gzip_chunks(iter_ndjson(ROWS))))
+    assert [json.loads(line) for line in ndjson_body.splitlines()] == ROWS
+
+    # The table spans several chunks; joined back it must still be one JSON document
+    assert len(list(iter_ndjson(ROWS))) > 1
+    assert json.loads(gzip.decompress(b"".join(gzip_chunks(iter_json_table(ROWS))))) == {"table": ROWS}
+    assert json.loads(b"".join(iter_json_table([]))) == {"table": []}
+
+
+def test_accepts_gzip():
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, *;q=0.5")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip("")
+
+
+def test_archived_artifacts_read_back_unchanged(tmp_path):
+    data = json.dumps({"table": ROWS}).encode("utf-8")
+    manifest = write_artifacts(tmp_path, "job", {"json": data})
+    assert manifest == {"json": {"etag": etag_for(data), "size": len(data)}}
+
+    assert archive_artifact(tmp_path, "job", "json") > 0
+    assert not artifact_path(tmp_path, "job", "json").exists()
+    assert read_artifact(tmp_path, "job", "json") == data
+    assert archive_artifact(tmp_path, "job", "json") == 0
+
+    # Rewriting (an edit) replaces the archived copy
+    write_artifacts(tmp_path, "job", {"json": b"{}"})
+    assert read_artifact(tmp_path, "job", "json") == b"{}"
+    assert not (tmp_path / "archive" / "job.json.gz").exists()
+
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    """The app module, run from a temporary directory without its startup tasks"""
+    root = tmp_path_factory.mktemp("app")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(root)
+        for name, value in {"JOB_DB_PATH": str(root / "jobs.db"), "UPLOADS_DIR": str(root / "uploads"),
+                            "CACHE_DIR": str(root / "cache"), "CPU_WORKERS": "0"}.items():
+            mp.setenv(name, value)
+        app = importlib.import_module("app")
+        app.save_job_status("done", "queued", filenames=["sof.pdf"])
+        app.publish_job_results("done", [
+            {"event": "Arrived", "start_time": "2024-03-12 08:00", "end_time": "2024-03-12 09:30"},
+            {"event": "Loading, hold 1", "start_time": "2024-03-12 10:00", "end_time": "2024-03-12 14:00"},
+        ], "Processing completed")
+        yield app, TestClient(app.app)
+
+
+def test_result_etag_answers_304(api):
+    _, client = api
+    first = client.get("/api/result/done")
+    assert first.status_code == 200
+    assert [event["event"] for event in first.json()["events"]] == ["Arrived", "Loading, hold 1"]
+
+    etag = first.headers["etag"]
+    cached = client.get("/api/result/done", headers={"If-None-Match": f'"other", {etag}'})
+    assert (cached.status_code, cached.content, cached.headers["etag"]) == (304, b"", etag)
+    assert client.get("/api/result/done", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_archived_result_keeps_its_etag(api):
+    app, client = api
+    etag = client.get("/api/result/done").headers["etag"]
+    archive_artifact(app.RESULTS_DIR, "done", "view")
+    response = client.get("/api/result/done")
+    assert (response.status_code, response.headers["etag"]) == (200, etag)
+    assert client.get("/api/result/done", headers={"If-None-Match": etag}).status_code == 304
+
+
+@pytest.mark.parametrize("export_format", ["csv", "ndjson", "json"])
+def test_export_is_gzipped_only_when_accepted(api, export_format):
+    _, client = api
+    # httpx decodes gzip by itself, so read the raw stream to see what was sent
+    with client.stream("POST", f"/api/export/done?format={export_format}",
+                       headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.status_code == 200
+    plain = client.post(f"/api/export/done?format={export_format}", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    if export_format == "json":
+        # Stored results are served as they are
+        assert raw == plain.content
+        return
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(raw) == plain.content
+    assert b"Loading, hold 1" in plain.content
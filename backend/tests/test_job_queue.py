@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.db", lease_seconds=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def states(queue):
+    rows = queue._connect().execute("SELECT job_id, state, attempts FROM job_queue ORDER BY job_id").fetchall()
+    return {row["job_id"]: (row["state"], row["attempts"]) for row in rows}
+
+
+def expire_leases(queue):
+    queue._connect().execute("UPDATE job_queue SET lease_expires_at = 0 WHERE state = 'leased'")
+
+
+def test_claims_oldest_first_and_only_once(queue):
+    queue.enqueue("first", {"files": ["a.pdf"]})
+    queue.enqueue("second", {"files": []})
+
+    job, exhausted = queue.claim("w1")
+    assert job == {"job_id": "first", "payload": {"files": ["a.pdf"]}, "attempts": 1}
+    assert exhausted == []
+    assert queue.claim("w2")[0]["job_id"] == "second"
+    assert queue.claim("w3") == (None, [])
+    assert queue.depth() == {"leased": 2}
+
+
+def test_heartbeat_only_for_the_lease_holder(queue):
+    queue.enqueue("job", {})
+    queue.claim("w1")
+    assert queue.heartbeat("job", "w1")
+    assert not queue.heartbeat("job", "w2")
+
+    queue.finish("job", "w1")
+    assert not queue.heartbeat("job", "w1")
+    assert states(queue) == {"job": ("done", 1)}
+
+
+def test_expired_leases_are_requeued_until_attempts_run_out(queue):
+    queue.enqueue("job", {})
+    queue.claim("w1")
+    expire_leases(queue)
+
+    # The first worker lost its lease: the job goes to the next claimant
+    job, exhausted = queue.claim("w2")
+    assert (job["job_id"], job["attempts"], exhausted) == ("job", 2, [])
+    assert not queue.heartbeat("job", "w1")
+
+    expire_leases(queue)
+    assert queue.claim("w3") == (None, ["job"])
+    assert states(queue) == {"job": ("failed", 2)}
+
+
+def test_release_does_not_count_the_attempt_but_requeue_does(queue):
+    queue.enqueue("job", {})
+    queue.claim("w1")
+    queue.release("job", "w1")
+    assert states(queue) == {"job": ("queued", 0)}
+
+    queue.claim("w1")
+    queue.requeue("job", "w1")
+    assert states(queue) == {"job": ("queued", 1)}
+
+    # Only the lease holder can hand a job back
+    queue.claim("w1")
+    queue.requeue("job", "w2")
+    assert states(queue) == {"job": ("leased", 2)}
+
+
+def test_prune_and_delete(queue):
+    for job_id in ("done", "failed", "waiting"):
+        queue.enqueue(job_id, {})
+    queue.claim("w")
+    queue.finish("done", "w")
+    queue.claim("w")
+    queue.finish("failed", "w", "failed")
+
+    assert queue.prune(time.time() - 3600) == 0
+    assert queue.prune(time.time() + 1) == 2
+    assert queue.depth() == {"queued": 1}
+    queue.delete("waiting")
+    assert queue.depth() == {}
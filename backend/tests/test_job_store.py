@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from job_store import SQLiteJobStore, normalize_bound
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteJobStore(tmp_path / "jobs.db")
+    yield store
+    store.close()
+
+
+def add_job(store, job_id, created_at, status="completed", filenames=None):
+    store.save(job_id, status, filenames=filenames or [f"{job_id}.pdf"])
+    with store._transaction() as conn:
+        conn.execute("UPDATE jobs SET created_at = ?, updated_at = ? WHERE job_id = ?", (created_at, created_at, job_id))
+
+
+def job_ids(store, **filters):
+    return [job["job_id"] for job in store.list_jobs(**filters)[0]]
+
+
+def test_normalize_bound():
+    assert normalize_bound("2024-01-31 12:00") == "2024-01-31T12:00:00"
+    assert normalize_bound("20240131") == "2024-01-31T00:00:00"
+    assert normalize_bound("20240131", upper=True) == "2024-01-31T23:59:59.999999"
+    assert normalize_bound("2024-01-31", upper=True) == "2024-01-31T23:59:59.999999"
+    assert normalize_bound("2024-01-31T12:00", upper=True) == "2024-01-31T12:00:00"
+    with pytest.raises(ValueError):
+        normalize_bound("31/01/2024")
+
+
+def test_space_separated_and_date_only_bounds(store):
+    add_job(store, "morning", "2024-01-31T08:00:00")
+    add_job(store, "evening", "2024-01-31T18:30:00")
+    add_job(store, "next_day", "2024-02-01T00:10:00")
+
+    after_noon = normalize_bound("2024-01-31 12:00")
+    assert job_ids(store, created_from=after_noon) == ["next_day", "evening"]
+    assert job_ids(store, created_to=normalize_bound("20240131", upper=True)) == ["evening", "morning"]
+    assert job_ids(store, created_from=after_noon, created_to=normalize_bound("2024-01-31", upper=True)) == ["evening"]
+
+
+def test_legacy_jobs_left_running_are_imported_as_failed(store, tmp_path):
+    jobs_dir = tmp_path / "jobs"
+    jobs_dir.mkdir()
+    (jobs_dir / "old.json").write_text(json.dumps({"job_id": "old", "status": "processing", "message": "Processing a.pdf..."}))
+    (jobs_dir / "done.json").write_text(json.dumps({"job_id": "done", "status": "completed", "message": "ok"}))
+
+    assert store.migrate_json_jobs(jobs_dir) == 2
+    assert store.migrate_json_jobs(jobs_dir) == 0
+    assert store.load("old")["status"] == "failed"
+    assert store.load("old")["message"] == "Processing error: job was interrupted"
+    assert store.load("done")["status"] == "completed"
+
+
+def test_list_jobs_pages_with_a_cursor(store):
+    for index in range(5):
+        add_job(store, f"job{index}", f"2024-01-0{index + 1}T10:00:00")
+    add_job(store, "twin", "2024-01-05T10:00:00")
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.list_jobs(limit=2, cursor=cursor)
+        seen += [job["job_id"] for job in page]
+        if cursor is None:
+            break
+    # Newest first; equal timestamps are ordered by job ID
+    assert seen == ["twin", "job4", "job3", "job2", "job1", "job0"]
+
+    with pytest.raises(ValueError):
+        store.list_jobs(cursor="not a cursor")
+
+
+def test_list_jobs_filters(store):
+    add_job(store, "a", "2024-01-01T10:00:00", status="completed", filenames=["SoF Rotterdam.pdf"])
+    add_job(store, "b", "2024-01-02T10:00:00", status="failed", filenames=['quote"d_100%.docx'])
+    add_job(store, "c", "2024-01-03T10:00:00", status="completed", filenames=["scan.png", "rotterdam-2.pdf"])
+
+    assert job_ids(store, status="completed") == ["c", "a"]
+    assert job_ids(store, filename="rotterdam") == ["c", "a"]
+    assert job_ids(store, filename='quote"d_') == ["b"]
+    assert job_ids(store, filename="%") == ["b"]
+    assert job_ids(store, filename="2.") == ["c"]
+    assert job_ids(store, status="completed", filename="scan") == ["c"]
+
+    # Renaming replaces the indexed filenames; deleting a job removes them
+    store.save("c", "completed", filenames=["renamed.pdf"])
+    assert job_ids(store, filename="scan") == []
+    store.delete_job("a")
+    assert job_ids(store, filename="rotterdam") == []
+
+
+def test_save_keeps_created_at_and_unchanged_fields(store):
+    store.save("a", "queued", total_files=2, filenames=["x.pdf", "y.pdf"])
+    created_at = store.load("a")["created_at"]
+    store.save("a", "processing", 50, "Processing x.pdf...", files_done=1)
+    job = store.load("a")
+    assert (job["status"], job["progress"], job["files_done"]) == ("processing", 50, 1)
+    assert job["created_at"] == created_at
+    assert job["filenames"] == ["x.pdf", "y.pdf"] and job["total_files"] == 2
+    assert store.summary_counts() == {"total_jobs": 1, "total_files": 2, "by_status": {"processing": 1}}
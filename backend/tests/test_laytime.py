@@ -0,0 +1,47 @@
+from event_schema import normalize_events
+from laytime import apply_durations, laytime_summary, parse_duration
+
+
+def durations(rows):
+    records = normalize_events(rows)
+    apply_durations(records)
+    return [(record.duration_minutes, record.duration, record.layoff_minutes) for record in records]
+
+
+def test_minutes_from_start_and_end():
+    assert durations([{"start_time": "2024-03-12 08:00", "end_time": "2024-03-12 12:30"}]) == [(270, "4h 30m", None)]
+
+
+def test_end_earlier_in_the_day_is_the_next_day():
+    assert durations([{"start_time": "2024-03-12 22:00", "end_time": "2024-03-12 01:30"}]) == [(210, "3h 30m", None)]
+
+
+def test_end_days_before_the_start_falls_back_to_the_duration_string():
+    rows = [
+        {"start_time": "2024-03-14 22:00", "end_time": "2024-03-12 01:30", "duration": "2h"},
+        {"start_time": "2024-03-14 22:00", "end_time": "2024-03-12 01:30"},
+    ]
+    assert durations(rows) == [(120, "2h 0m", None), (None, "", None)]
+
+
+def test_negative_durations_and_layoffs_are_clamped():
+    assert durations([{"duration": -30, "layoff_time": -15}]) == [(0, "0m", 0)]
+
+
+def test_summary_never_goes_negative():
+    records = normalize_events([
+        {"start_time": "2024-03-12 08:00", "end_time": "2024-03-12 10:00", "layoff_time": "30m"},
+        {"start_time": "2024-03-14 08:00", "end_time": "2024-03-12 10:00", "layoff_time": "-1:00"},
+    ])
+    apply_durations(records)
+    totals = laytime_summary(records)["total"]
+    assert totals["duration_minutes"] == 120
+    assert totals["layoff_minutes"] == 30
+    assert totals["laytime_minutes"] == 90
+
+
+def test_parse_duration_formats():
+    assert parse_duration("2d 4h 30m") == 3150
+    assert parse_duration("1 hour 15 mins") == 75
+    assert parse_duration("1:30") == 90
+    assert parse_duration("N/A") is None
@@ -0,0 +1,200 @@
+import asyncio
+import contextvars
+
+import pytest
+
+from resilience import AdaptiveConcurrency, CircuitBreaker, ProviderGuard, RateLimiter, parse_retry_after
+
+
+def test_rate_limiter_allows_the_burst_then_spaces_calls():
+    limiter = RateLimiter("test", rate=10, burst=2)
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == pytest.approx(0.1, abs=0.02)
+    assert limiter.reserve() == pytest.approx(0.2, abs=0.02)
+
+
+def test_rate_limiter_penalty_holds_everyone_back():
+    limiter = RateLimiter("test", rate=10, burst=1)
+    asyncio.run(limiter.penalize(1.0))
+    assert limiter.reserve() == pytest.approx(1.0, abs=0.02)
+
+
+def test_shared_rate_limit_is_one_quota_across_instances(tmp_path):
+    first = RateLimiter("gemini", rate=10, burst=1, path=tmp_path / "jobs.db")
+    second = RateLimiter("gemini", rate=10, burst=1, path=tmp_path / "jobs.db")
+    other = RateLimiter("azure", rate=10, burst=1, path=tmp_path / "jobs.db")
+    try:
+        assert first.reserve() == 0
+        assert second.reserve() == pytest.approx(0.1, abs=0.02)
+        assert other.reserve() == 0
+        asyncio.run(second.penalize(1.0))
+        assert first.reserve() == pytest.approx(1.0, abs=0.02)
+    finally:
+        for limiter in (first, second, other):
+            limiter.close()
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") is None
+    assert parse_retry_after(None) is None
+
+
+def test_adaptive_concurrency_cuts_on_overload_and_grows_on_success():
+    limiter = AdaptiveConcurrency(8, min_limit=2, latency_target=1.0, decrease_interval=0)
+    limiter.on_overload()
+    assert limiter.limit == 4
+    limiter.on_overload()
+    limiter.on_overload()
+    assert limiter.limit == 2
+    for _ in range(2):
+        limiter.on_success(0.1)
+    assert limiter.limit == pytest.approx(2.9, abs=0.01)
+    # Slow calls shrink it gently
+    limiter.on_success(5.0)
+    assert limiter.limit == pytest.approx(2.61, abs=0.01)
+
+
+def test_adaptive_concurrency_decreases_at_most_once_per_interval():
+    limiter = AdaptiveConcurrency(8, decrease_interval=60)
+    limiter.on_overload()
+    limiter.on_overload()
+    assert limiter.limit == 4
+
+
+def test_adaptive_concurrency_serves_jobs_round_robin():
+    job = contextvars.ContextVar("job", default=None)
+    limiter = AdaptiveConcurrency(1, key=job.get)
+    order = []
+
+    async def call(job_id, name):
+        job.set(job_id)
+        await limiter.acquire()
+        order.append(name)
+        await asyncio.sleep(0)
+        limiter.release()
+
+    async def main():
+        await limiter.acquire()
+        waiters = [asyncio.ensure_future(call(job_id, name))
+                   for job_id, name in (("big", "big-1"), ("big", "big-2"), ("big", "big-3"), ("small", "small-1"))]
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*waiters)
+
+    asyncio.run(main())
+    assert order == ["big-1", "small-1", "big-2", "big-3"]
+    assert limiter.in_flight == 0
+
+
+def test_adaptive_concurrency_hands_on_a_slot_granted_to_a_cancelled_waiter():
+    limiter = AdaptiveConcurrency(1)
+
+    async def main():
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert limiter.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_circuit_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05, max_reset_timeout=0.15)
+
+    async def main():
+        breaker.record_failure(probe=False)
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record_failure(probe=False)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        # One probe after the timeout; a failed probe doubles the pause
+        assert await breaker.wait() is True
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        breaker.record_failure(probe=True)
+        assert (breaker.state, breaker.reset_timeout) == (CircuitBreaker.OPEN, 0.1)
+
+        assert await breaker.wait() is True
+        breaker.record_success()
+        assert (breaker.state, breaker.reset_timeout, breaker.failures) == (CircuitBreaker.CLOSED, 0.05, 0)
+        assert await breaker.wait() is False
+
+    asyncio.run(main())
+
+
+def test_abandoned_probe_lets_the_next_caller_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure(probe=False)
+    breaker.state = CircuitBreaker.HALF_OPEN
+    breaker.abandon_probe()
+
+    async def main():
+        return await asyncio.wait_for(breaker.wait(), timeout=1)
+
+    assert asyncio.run(main()) is True
+
+
+def guard(limiter=None, threshold=1):
+    return ProviderGuard("test", AdaptiveConcurrency(4, decrease_interval=0), CircuitBreaker(threshold, 0.05), limiter)
+
+
+def test_guard_records_call_outcomes():
+    provider = guard(RateLimiter("test", rate=100, burst=1))
+
+    async def call(mark=None, retry_after=None):
+        async with provider.slot() as slot:
+            if mark == "throttled":
+                slot.throttled(retry_after)
+            elif mark:
+                getattr(slot, mark)()
+
+    async def main():
+        await call("rejected")
+        assert (provider.concurrency.limit, provider.breaker.state) == (4, CircuitBreaker.CLOSED)
+        await call("throttled", retry_after=0.2)
+        assert provider.concurrency.limit == 2
+        assert provider.limiter.reserve() == pytest.approx(0.2, abs=0.05)
+        await call("failed")
+        assert provider.breaker.state == CircuitBreaker.OPEN
+        assert provider.concurrency.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_guard_counts_an_escaping_exception_as_an_error():
+    provider = guard()
+
+    async def main():
+        with pytest.raises(ValueError):
+            async with provider.slot():
+                raise ValueError("bad response")
+
+    asyncio.run(main())
+    assert provider.breaker.state == CircuitBreaker.OPEN
+    assert provider.state()["circuit"] == "open"
+
+
+def test_guard_releases_the_probe_when_its_caller_is_cancelled_while_queued():
+    provider = guard()
+    provider.breaker.record_failure(probe=False)
+
+    async def main():
+        provider.concurrency.limit = 1
+        await provider.concurrency.acquire()
+        queued = asyncio.ensure_future(provider.slot().__aenter__())
+        await asyncio.sleep(0.25)
+        assert provider.breaker.state == CircuitBreaker.HALF_OPEN
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        provider.concurrency.release()
+
+        async with provider.slot():
+            pass
+
+    asyncio.run(main())
+    assert provider.breaker.state == CircuitBreaker.CLOSED
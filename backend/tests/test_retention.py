@@ -0,0 +1,141 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from artifacts import archived_artifact_path, artifact_path, read_artifact, write_artifacts
+from job_queue import JobQueue
+from job_store import SQLiteJobStore
+from results_log import append_file_rows, results_log_path
+from retention import Compactor, RetentionPolicy
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteJobStore(tmp_path / "jobs.db")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.db")
+    yield queue
+    queue.close()
+
+
+def compactor(store, tmp_path, queue=None, **policy):
+    for name in ("results", "uploads", "jobs"):
+        (tmp_path / name).mkdir(exist_ok=True)
+    return Compactor(store, tmp_path / "results", tmp_path / "uploads", tmp_path / "jobs",
+                     RetentionPolicy(**policy), interval=0, job_queue=queue)
+
+
+def add_job(store, results_dir, job_id, days_old, status="completed"):
+    store.save(job_id, status, filenames=[f"{job_id}.pdf"])
+    if status == "completed":
+        payloads = {kind: json.dumps({"job_id": job_id, "table": [{"event": "Loading"}] * 50}).encode("utf-8")
+                    for kind in ("json", "csv", "view", "laytime")}
+        store.save_artifacts(job_id, write_artifacts(results_dir, job_id, payloads))
+    updated_at = (datetime.now() - timedelta(days=days_old)).isoformat()
+    with store._transaction() as conn:
+        conn.execute("UPDATE jobs SET updated_at = ? WHERE job_id = ?", (updated_at, job_id))
+
+
+def age(path, days):
+    stamp = time.time() - days * 86400
+    os.utime(path, (stamp, stamp))
+
+
+def test_expired_jobs_are_deleted_with_their_files(store, queue, tmp_path):
+    compact = compactor(store, tmp_path, queue, job_days=10, failed_days=3, csv_days=0, archive_days=0)
+    results = tmp_path / "results"
+    add_job(store, results, "old", 11)
+    add_job(store, results, "recent", 5)
+    add_job(store, results, "old_failure", 4, status="failed")
+    add_job(store, results, "recent_failure", 1, status="failed")
+    add_job(store, results, "running", 20, status="processing")
+    queue.enqueue("old", {})
+    (tmp_path / "uploads" / "old").mkdir()
+
+    stats = compact.run_once()
+    assert (stats["expired_jobs"], stats["expired_failed_jobs"]) == (1, 1)
+    assert store.load("old") is None and store.load("old_failure") is None
+    assert all(store.load(job_id) for job_id in ("recent", "recent_failure", "running"))
+    assert not artifact_path(results, "old", "json").exists()
+    assert not (tmp_path / "uploads" / "old").exists()
+    assert queue.depth() == {}
+
+
+def test_csv_is_dropped_then_the_rest_archived(store, tmp_path):
+    compact = compactor(store, tmp_path, csv_days=2, archive_days=5)
+    results = tmp_path / "results"
+    add_job(store, results, "week_old", 7)
+    add_job(store, results, "three_days", 3)
+    add_job(store, results, "today", 0)
+    view = read_artifact(results, "week_old", "view")
+
+    stats = compact.run_once()
+    assert (stats["dropped_csv"], stats["archived_jobs"]) == (2, 1)
+    assert stats["archive_bytes_saved"] > 0
+    assert store.load_artifact("three_days", "csv") is None
+    assert not artifact_path(results, "three_days", "csv").exists()
+    assert artifact_path(results, "three_days", "view").exists()
+    assert artifact_path(results, "today", "csv").exists()
+
+    # Archived artifacts read back unchanged and keep their manifest entry
+    assert not artifact_path(results, "week_old", "view").exists()
+    assert archived_artifact_path(results, "week_old", "view").exists()
+    assert read_artifact(results, "week_old", "view") == view
+    assert store.load_artifact("week_old", "view") is not None
+
+    # Jobs already handled are not looked at again
+    stats = compact.run_once()
+    assert (stats["dropped_csv"], stats["archived_jobs"]) == (0, 0)
+    assert compact.usage()["archive"]["files"] == 3
+
+
+def test_stale_staging_dirs_and_results_logs_of_finished_jobs_are_removed(store, tmp_path):
+    compact = compactor(store, tmp_path, csv_days=0, archive_days=0, stale_days=2)
+    uploads, results = tmp_path / "uploads", tmp_path / "results"
+    add_job(store, results, "finished", 0)
+    add_job(store, results, "running", 0, status="processing")
+    for job_id in ("finished", "running", "unknown", "fresh"):
+        (uploads / job_id).mkdir()
+        append_file_rows(results, job_id, 0, "a.pdf", [{"event": "Loading"}])
+        if job_id != "fresh":
+            age(uploads / job_id, 3)
+            age(results_log_path(results, job_id), 3)
+
+    assert compact.run_once()["removed_stale"] == 4
+    assert sorted(path.name for path in uploads.iterdir()) == ["fresh", "running"]
+    assert not results_log_path(results, "finished").exists()
+    assert results_log_path(results, "running").exists()
+    assert results_log_path(results, "fresh").exists()
+
+
+def test_finished_queue_entries_are_pruned(store, queue, tmp_path):
+    compact = compactor(store, tmp_path, queue, csv_days=0, archive_days=0, stale_days=2)
+    for job_id in ("old", "new", "waiting"):
+        queue.enqueue(job_id, {})
+    for job_id in ("old", "new"):
+        queue.claim("w")
+        queue.finish(job_id, "w")
+    with queue._transaction() as conn:
+        conn.execute("UPDATE job_queue SET updated_at = ? WHERE job_id = 'old'", (time.time() - 3 * 86400,))
+
+    assert compact.run_once()["pruned_queue_entries"] == 1
+    assert queue.depth() == {"done": 1, "queued": 1}
+
+
+def test_legacy_job_files_are_removed_once_migrated(store, tmp_path):
+    compact = compactor(store, tmp_path, csv_days=0, archive_days=0)
+    jobs_dir = tmp_path / "jobs"
+    (jobs_dir / "old.json").write_text(json.dumps({"job_id": "old", "status": "completed"}))
+    assert compact.run_once()["removed_legacy_jobs"] == 0
+
+    store.migrate_json_jobs(jobs_dir)
+    assert compact.run_once()["removed_legacy_jobs"] == 1
+    assert not jobs_dir.exists()
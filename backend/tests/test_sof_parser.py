@@ -0,0 +1,74 @@
+from sof_parser import SoFParser, parse_document
+
+
+def events(rows):
+    return [(row["event"], row["start_time"], row["end_time"]) for row in rows]
+
+
+def test_time_range_lines_under_a_date_heading():
+    [(rows, confidence, _)] = parse_document(["12/03/2024\n0800-1200  Commenced loading\n1430 NOR tendered\n"])
+    assert events(rows) == [
+        ("Commenced loading", "2024-03-12 08:00", "2024-03-12 12:00"),
+        ("NOR tendered", "2024-03-12 14:30", ""),
+    ]
+    assert confidence == 1.0
+
+
+def test_range_past_midnight_ends_next_day():
+    [(rows, _, _)] = parse_document(["12.03.2024 2200-0130 Loading"])
+    assert events(rows) == [("Loading", "2024-03-12 22:00", "2024-03-13 01:30")]
+
+
+def test_key_value_lines_with_a_date_and_time_are_events():
+    page = (
+        "STATEMENT OF FACTS\n"
+        "Vessel: MV ATLAS\n"
+        "Cargo: Coal\n"
+        "Port: Rotterdam\n"
+        "NOR tendered: 12.03.2024 0700\n"
+        "Commenced loading: 12.03.2024 0800\n"
+        "Completed loading: 13.03.2024 1830\n"
+        "Documents on board: Wed 13.03.2024 at 2000 hrs\n"
+    )
+    [(rows, confidence, _)] = parse_document([page], "sof.pdf")
+    assert events(rows) == [
+        ("NOR tendered", "2024-03-12 07:00", ""),
+        ("Commenced loading", "2024-03-12 08:00", ""),
+        ("Completed loading", "2024-03-13 18:30", ""),
+        ("Documents on board", "2024-03-13 20:00", ""),
+    ]
+    assert all(row["ship_cargo"] == "MV ATLAS / Coal" for row in rows)
+    assert confidence == 1.0
+
+
+def test_key_value_time_uses_the_current_date():
+    [(rows, _, _)] = parse_document(["Date: 01/02/2024\nNOR accepted: 1100\nLoading: 1200-1500\n"])
+    assert events(rows) == [
+        ("NOR accepted", "2024-02-01 11:00", ""),
+        ("Loading", "2024-02-01 12:00", "2024-02-01 15:00"),
+    ]
+
+
+def test_unknown_key_without_a_time_is_unparsed():
+    parser = SoFParser()
+    assert parser.parse_line("Remarks: vessel waited for berth") == ("unparsed", None)
+    assert parser.parse_line("Port: Rotterdam") == ("context", None)
+
+
+def test_page_without_event_lines_goes_below_the_threshold():
+    [(rows, confidence, _)] = parse_document(["Vessel: MV ATLAS\nPort: Rotterdam\nRemarks: none\n"])
+    assert rows == []
+    assert confidence < 0.5
+
+
+def test_page_of_only_context_scores_zero_and_blank_page_one():
+    results = parse_document(["STATEMENT OF FACTS\nVessel: MV ATLAS\n", "\n  \n"])
+    assert [confidence for _, confidence, _ in results] == [0.0, 1.0]
+
+
+def test_context_carries_to_later_pages():
+    results = parse_document(["Vessel: MV ATLAS\n12/03/2024\n0800 Pilot on board\n", "0900 All fast"])
+    rows, confidence, note = results[1]
+    assert events(rows) == [("All fast", "2024-03-12 09:00", "")]
+    assert rows[0]["ship_cargo"] == "MV ATLAS"
+    assert "2024-03-12" in note and "MV ATLAS" in note
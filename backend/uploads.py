@@ -0,0 +1,70 @@
+import hashlib
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+import aiofiles
+from fastapi import UploadFile
+
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class FileTooLargeError(Exception):
+    """Raised while streaming an upload that exceeds the size limit"""
+
+    def __init__(self, filename: str, max_bytes: int):
+        super().__init__(f"File too large: {filename}. Max size is {max_bytes // (1024 * 1024)}MB per file.")
+        self.filename = filename
+
+
+@dataclass
+class StagedFile:
+    """An uploaded file spooled to the job's staging directory"""
+    path: str
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+
+
+def job_staging_dir(uploads_dir: Path, job_id: str) -> Path:
+    return Path(uploads_dir) / job_id
+
+
+async def stage_upload(file: UploadFile, directory: Path, index: int, max_bytes: int) -> StagedFile:
+    """Copy an upload to ``directory`` in fixed-size chunks, hashing it on the way.
+
+    The size limit is enforced on the bytes actually received, so it also
+    holds when the client did not send a Content-Length for the part.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    # Never use the client's filename as a path component
+    suffix = os.path.splitext(file.filename or "")[1][:16]
+    path = directory / f"{index:02d}{suffix}"
+
+    digest = hashlib.sha256()
+    size = 0
+    async with aiofiles.open(path, "wb") as out:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise FileTooLargeError(file.filename, max_bytes)
+            digest.update(chunk)
+            await out.write(chunk)
+
+    return StagedFile(
+        path=str(path),
+        filename=file.filename,
+        content_type=file.content_type or "",
+        size=size,
+        sha256=digest.hexdigest(),
+    )
+
+
+def remove_staging_dir(directory: Path):
+    shutil.rmtree(directory, ignore_errors=True)
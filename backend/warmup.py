@@ -0,0 +1,57 @@
+import asyncio
+import os
+import signal
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def ignore_interrupts():
+    """CPU worker process initializer: Ctrl-C is handled by the parent, which shuts the pool down"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def load_parsers() -> int:
+    """Import the document parsers (python-docx, pypdf, Pillow) in this process; returns its PID.
+
+    Submitted to every CPU worker process on startup so the first job does
+    not pay for spawning the workers and importing the parsers in them.
+    """
+    import sof_parser  # noqa: F401
+    for module in ("docx", "pypdf", "PIL.Image", "PIL.ImageOps"):
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+    return os.getpid()
+
+
+class WarmUp:
+    """Runs named warm-up steps one after another and records how long each took.
+
+    A failing step is logged and recorded; the remaining steps still run.
+    """
+
+    def __init__(self):
+        self.status = "pending"
+        self.seconds: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    async def run(self, steps: List[Tuple[str, Callable[[], Awaitable]]]):
+        self.status = "running"
+        started = time.perf_counter()
+        for name, step in steps:
+            step_started = time.perf_counter()
+            try:
+                await step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warm-up step {name} failed: {str(e)}")
+                self.errors[name] = str(e)
+            self.steps[name] = round(time.perf_counter() - step_started, 3)
+        self.seconds = round(time.perf_counter() - started, 3)
+        self.status = "done"
+
+    def state(self) -> dict:
+        return {"status": self.status, "seconds": self.seconds, "steps": self.steps, "errors": self.errors}
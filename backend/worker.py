@@ -0,0 +1,100 @@
+"""Standalone job workers.
+
+Runs N processes that claim jobs from the queue in the job database and
+process them, so extraction scales separately from the API. Start it from
+the backend directory (staged uploads and results are relative paths)::
+
+    python worker.py --processes 4
+
+and run the API with EMBEDDED_WORKERS=0 to leave all jobs to these workers.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+def serve_metrics(port: int):
+    """Serve this process's Prometheus metrics on ``port`` from a background thread"""
+    from metrics import CONTENT_TYPE, REGISTRY
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Serving worker metrics on port {port}")
+
+
+def run_worker(metrics_port: Optional[int] = None):
+    import app
+
+    if metrics_port:
+        serve_metrics(metrics_port)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+
+    async def serve():
+        # SIGTERM/SIGINT cancel the worker, which hands its current job back to the queue
+        task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, task.cancel)
+        await app.start_warm_up()
+        try:
+            await app.worker_loop(worker_id)
+        except asyncio.CancelledError:
+            print(f"Worker {worker_id} stopping")
+        finally:
+            await app.close_clients()
+
+    asyncio.run(serve())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SoF extraction job workers")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("WORKER_PROCESSES", "1")),
+                        help="number of worker processes (default: WORKER_PROCESSES or 1)")
+    parser.add_argument("--metrics-port", type=int, default=int(os.getenv("WORKER_METRICS_PORT", "0")),
+                        help="serve Prometheus metrics from this port, one port per process counting up "
+                             "(default: WORKER_METRICS_PORT, off)")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker(args.metrics_port)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(args.metrics_port + i if args.metrics_port else None,), name=f"worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def stop(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
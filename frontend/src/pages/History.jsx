@@ -12,8 +12,13 @@ import {
 } from '@heroicons/react/24/outline';
 import { useNavigate } from 'react-router-dom';
 
+const PAGE_SIZE = 50;
+
 const History = () => {
   const [jobs, setJobs] = useState([]);
+  const [counts, setCounts] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const navigate = useNavigate();
@@ -27,11 +32,14 @@ const History = () => {
     try {
       setLoading(true);
       const response = await axios.get(`${API_BASE_URL}/api/jobs`, {
+        params: { limit: PAGE_SIZE, include_counts: true },
         headers: {
           'Authorization': `Bearer ${token}`
         }
       });
       setJobs(response.data.jobs || []);
+      setCounts(response.data.counts || null);
+      setNextCursor(response.data.next_cursor || null);
     } catch (err) {
       setError('Failed to fetch processing history');
       console.error('Error fetching history:', err);
@@ -40,6 +48,25 @@ const History = () => {
     }
   };
 
+  const fetchMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(`${API_BASE_URL}/api/jobs`, {
+        params: { limit: PAGE_SIZE, cursor: nextCursor },
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      });
+      setJobs(prev => [...prev, ...(response.data.jobs || [])]);
+      setNextCursor(response.data.next_cursor || null);
+    } catch (err) {
+      console.error('Error fetching more history:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getStatusIcon = (status) => {
     switch (status) {
       case 'processing':
@@ -157,25 +184,25 @@ const History = () => {
       <div className="grid grid-cols-1 sm:grid-cols-4 gap-4">
         <div className="card text-center">
           <div className="text-2xl font-bold text-maritime-navy">
-            {jobs.length}
+            {counts ? counts.total_jobs : jobs.length}
           </div>
           <div className="text-sm text-maritime-gray-600">Total Jobs</div>
         </div>
         <div className="card text-center">
           <div className="text-2xl font-bold text-blue-600">
-            {jobs.reduce((total, job) => total + (job.total_files || 1), 0)}
+            {counts ? counts.total_files : jobs.reduce((total, job) => total + (job.total_files || 1), 0)}
           </div>
           <div className="text-sm text-maritime-gray-600">Files Processed</div>
         </div>
         <div className="card text-center">
           <div className="text-2xl font-bold text-green-600">
-            {jobs.filter(job => job.status === 'completed').length}
+            {counts ? (counts.by_status.completed || 0) : jobs.filter(job => job.status === 'completed').length}
           </div>
           <div className="text-sm text-maritime-gray-600">Completed</div>
         </div>
         <div className="card text-center">
           <div className="text-2xl font-bold text-red-600">
-            {jobs.filter(job => job.status === 'failed').length}
+            {counts ? (counts.by_status.failed || 0) : jobs.filter(job => job.status === 'failed').length}
           </div>
           <div className="text-sm text-maritime-gray-600">Failed</div>
         </div>
@@ -283,8 +310,17 @@ const History = () => {
         </div>
       </div>
 
-      {/* Refresh Button */}
-      <div className="text-center">
+      {/* Refresh / Load More Buttons */}
+      <div className="text-center space-x-4">
+        {nextCursor && (
+          <button
+            onClick={fetchMore}
+            disabled={loadingMore}
+            className="btn-primary"
+          >
+            {loadingMore ? 'Loading...' : 'Load More'}
+          </button>
+        )}
         <button
           onClick={fetchHistory}
           className="btn-secondary"
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import toast from 'react-hot-toast';
@@ -26,6 +26,9 @@ const Results = () => {
   const [showTimeline, setShowTimeline] = useState(false);
   const [retryCount, setRetryCount] = useState(0);
   const [manualEvents, setManualEvents] = useState([]);
+  const [streaming, setStreaming] = useState(false);
+  // Files whose events have been fetched; progress events only trigger a refetch when this changes
+  const filesDone = useRef(null);
 
   const maxRetries = 30; // 30 retries * 2 seconds = 1 minute max wait
 
@@ -110,12 +113,50 @@ const Results = () => {
     }
   }, [jobId, token, retryCount, maxRetries]);
 
-  // Polling effect - simplified and reliable
+  // Progress push via Server-Sent Events; falls back to polling if unavailable
+  useEffect(() => {
+    if (job?.status !== 'processing' || !window.EventSource) return;
+
+    const source = new EventSource(`${API_BASE_URL}/api/progress/${jobId}`);
+    setStreaming(true);
+    filesDone.current = job?.files_done ?? null;
+
+    source.addEventListener('progress', (e) => {
+      const update = JSON.parse(e.data);
+      if (update.status === 'completed' || update.status === 'failed') {
+        source.close();
+        setStreaming(false);
+        fetchResults();
+      } else {
+        setJob(prev => prev ? { ...prev, progress: update.progress, message: update.message } : prev);
+        // Pick up the events of files that finished since the last fetch
+        if (update.files_done != null && update.files_done !== filesDone.current) {
+          filesDone.current = update.files_done;
+          fetchResults();
+        }
+      }
+    });
+
+    source.onerror = () => {
+      // Stream unavailable or dropped: resume polling
+      source.close();
+      setStreaming(false);
+    };
+
+    return () => {
+      source.close();
+      setStreaming(false);
+    };
+    // fetchResults changes with retryCount; the stream should only follow the job status
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [job?.status, jobId]);
+
+  // Polling effect - used when progress cannot be streamed
   useEffect(() => {
     let timer;
     
-    // Only poll if job is processing and we haven't exceeded max retries
-    if (job?.status === 'processing' && retryCount < maxRetries) {
+    // Only poll if job is processing, not streaming, and we haven't exceeded max retries
+    if (job?.status === 'processing' && !streaming && retryCount < maxRetries) {
       // Use shorter polling interval when we've been polling for a while
       const pollInterval = retryCount > 10 ? 1000 : 2000; // 1 second after 20 seconds of polling
       
@@ -124,7 +165,7 @@ const Results = () => {
         setRetryCount(prev => prev + 1);
         fetchResults();
       }, pollInterval);
-    } else if (job?.status === 'processing' && retryCount >= maxRetries) {
+    } else if (job?.status === 'processing' && !streaming && retryCount >= maxRetries) {
       // Stop polling and show error when max retries reached
       setError('Processing is taking longer than expected. Please check back later.');
       setLoading(false);
@@ -133,7 +174,7 @@ const Results = () => {
     return () => {
       if (timer) clearTimeout(timer);
     };
-  }, [job?.status, retryCount, maxRetries, fetchResults]);
+  }, [job?.status, streaming, retryCount, maxRetries, fetchResults]);
 
   // Initial fetch effect - only run once when component mounts
   useEffect(() => {
@@ -641,20 +682,47 @@ const Results = () => {
             <div
               className="bg-blue-300 h-2 rounded-full transition-all duration-500"
               style={{
-                width: `${Math.min(90, retryCount * 5)}%`,
-                animation: retryCount > 10 ? 'none' : 'pulse'
+                width: `${streaming ? job.progress || 0 : Math.min(90, retryCount * 5)}%`,
+                animation: streaming || retryCount > 10 ? 'none' : 'pulse'
               }}
             ></div>
           </div>
-          <p className="text-sm text-white/60 mt-2">
-            Attempt {retryCount + 1} of {maxRetries}
-            {retryCount > 10 && <span className="text-yellow-300"> - Almost done!</span>}
-          </p>
+          {streaming ? (
+            <p className="text-sm text-white/60 mt-2">
+              {job.message || 'Processing...'} ({job.progress || 0}%)
+            </p>
+          ) : (
+            <p className="text-sm text-white/60 mt-2">
+              Attempt {retryCount + 1} of {maxRetries}
+              {retryCount > 10 && <span className="text-yellow-300"> - Almost done!</span>}
+            </p>
+          )}
           {job.total_files > 1 && (
             <p className="text-sm text-white/60 mt-2">
               Processing multiple files may take longer
             </p>
           )}
+          {job.events?.length > 0 && (
+            <div className="mt-6 text-left max-w-3xl mx-auto">
+              <p className="text-sm text-white/80 mb-2">
+                {job.events.length} events ready from {job.files_done} of {job.total_files} files
+              </p>
+              <div className="max-h-64 overflow-y-auto rounded-xl bg-white/5">
+                <table className="w-full text-sm text-white/80">
+                  <tbody>
+                    {job.events.map((event, index) => (
+                      <tr key={index} className="border-b border-white/10">
+                        <td className="px-3 py-2">{event.event}</td>
+                        <td className="px-3 py-2 whitespace-nowrap">{event.start}</td>
+                        <td className="px-3 py-2 whitespace-nowrap">{event.end}</td>
+                        <td className="px-3 py-2 text-white/60">{event.filename}</td>
+                      </tr>
+                    ))}
+                  </tbody>
+                </table>
+              </div>
+            </div>
+          )}
         </div>
       )}
 